@@ -1,8 +1,24 @@
+import hashlib
 import os
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+import time
+from flask import Flask, Response, g, stream_with_context, render_template, request, jsonify, session, redirect, url_for
 from werkzeug.security import generate_password_hash, check_password_hash
-from models import db, User, Room, Batch, Faculty, Subject
-from scheduler_v2 import run_scheduler
+from sqlalchemy import func, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
+from database import database_uri, engine_options
+from models import (db, User, Room, Batch, Faculty, Subject, TimetableRun, ConstraintWeight, Day, Timeslot,
+                    FacultyUnavailability, RoomUnavailability)
+from constraints import CONSTRAINTS
+from snapshot import load_snapshot
+from versions import table_versions
+from bulk_io import ENTITIES, BulkImportError, read_rows, import_rows, export_rows
+from multistart import run_multistart
+from scheduler_v2 import BACKENDS, INITIALIZERS, STRATEGIES
+from metrics import registry, PhaseTimer
+from jobs import JobManager
+from result_cache import (input_fingerprint, settings_fingerprint, find_cached_run, latest_run, load_run, save_run,
+                          best_sessions, run_results, run_summary, input_grid, run_grid)
 
 # --- 1. CREATE THE FLASK APP INSTANCE ---
 app = Flask(__name__)
@@ -10,14 +26,77 @@ app = Flask(__name__)
 # --- 2. CONFIGURE THE APP (MUST HAPPEN BEFORE INITIALIZATION) ---
 # Set a secret key for session management. You should change this to a random string.
 app.config['SECRET_KEY'] = 'a-very-secure-and-random-secret-key-for-production'
-# Define the database file path
+# Database: DATABASE_URL, or the SQLite file in instance/ (see database.py for pool and SQLite settings)
 basedir = os.path.abspath(os.path.dirname(__file__))
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(basedir, 'instance', 'scheduler.db')
+app.config['SQLALCHEMY_DATABASE_URI'] = database_uri(basedir)
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Timetable generation: independent scheduler passes run in a process pool
+app.config['SCHEDULER_RUNS'] = int(os.environ.get('SCHEDULER_RUNS', 3))            # passes per Generate click
+app.config['SCHEDULER_OPTIONS'] = int(os.environ.get('SCHEDULER_OPTIONS', 3))      # best passes shown as options
+app.config['SCHEDULER_WORKERS'] = int(os.environ.get('SCHEDULER_WORKERS', os.cpu_count() or 1))
+app.config['SCHEDULER_TIME_BUDGET'] = float(os.environ.get('SCHEDULER_TIME_BUDGET', 120))  # seconds
+# Island model inside each pass (1 island = plain GA); see scheduler_v2.ISLANDS and friends
+app.config['SCHEDULER_ISLANDS'] = int(os.environ.get('SCHEDULER_ISLANDS', 1))
+app.config['SCHEDULER_MIGRATION_INTERVAL'] = int(os.environ.get('SCHEDULER_MIGRATION_INTERVAL', 10))
+app.config['SCHEDULER_MIGRANTS'] = int(os.environ.get('SCHEDULER_MIGRANTS', 2))
+# The most a request may ask for: every pass and every island is a process of its own
+app.config['SCHEDULER_MAX_RUNS'] = int(os.environ.get('SCHEDULER_MAX_RUNS',
+                                                      max(app.config['SCHEDULER_RUNS'], app.config['SCHEDULER_WORKERS'])))
+app.config['SCHEDULER_MAX_ISLANDS'] = int(os.environ.get('SCHEDULER_MAX_ISLANDS',
+                                                         max(app.config['SCHEDULER_ISLANDS'],
+                                                             app.config['SCHEDULER_WORKERS'])))
+app.config['SCHEDULER_MAX_MIGRANTS'] = int(os.environ.get('SCHEDULER_MAX_MIGRANTS', 20))  # smallest population
+# How generation 0 is seeded: 'heuristic' (greedy, near-feasible) or 'random'
+app.config['SCHEDULER_INIT'] = os.environ.get('SCHEDULER_INIT', 'heuristic')
+# Solver strategy: 'ga', 'ga+ls' (GA then local search) or 'ls'; local search has its own budget
+app.config['SCHEDULER_STRATEGY'] = os.environ.get('SCHEDULER_STRATEGY', 'ga')
+app.config['SCHEDULER_LS_TIME_LIMIT'] = float(os.environ.get('SCHEDULER_LS_TIME_LIMIT', 5))  # seconds
+# Solver backend: 'ga', or 'cpsat' (exact, needs OR-Tools; falls back to the GA) with its own time limit
+app.config['SCHEDULER_BACKEND'] = os.environ.get('SCHEDULER_BACKEND', 'ga')
+app.config['SCHEDULER_EXACT_TIME_LIMIT'] = float(os.environ.get('SCHEDULER_EXACT_TIME_LIMIT', 30))  # seconds
+# Background jobs (/api/jobs): how many generations may run at once
+app.config['SCHEDULER_JOB_WORKERS'] = int(os.environ.get('SCHEDULER_JOB_WORKERS', 2))
+# Observability: /metrics asks for "Authorization: Bearer <METRICS_TOKEN>" when one is set;
+# SCHEDULER_PROFILING=1 lets /api/jobs requests ask for a cProfile report ({"profile": true})
+app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+app.config['SCHEDULER_PROFILING'] = os.environ.get('SCHEDULER_PROFILING', '0').lower() in ('1', 'true', 'yes')
+# List APIs (/api/rooms etc.): rows per page by default and at most (?limit=)
+app.config['LIST_PAGE_SIZE'] = int(os.environ.get('LIST_PAGE_SIZE', 100))
+app.config['LIST_MAX_PAGE_SIZE'] = int(os.environ.get('LIST_MAX_PAGE_SIZE', 1000))
 
 # --- 3. INITIALIZE THE DATABASE EXTENSION WITH THE CONFIGURED APP ---
 db.init_app(app)
 
+# Generation jobs run on background threads, outside the request/response cycle
+job_manager = JobManager(max_workers=app.config['SCHEDULER_JOB_WORKERS'])
+
+
+# ======================================================================
+# --- METRICS ---
+# ======================================================================
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_time(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        registry.observe('http_request_duration_seconds', time.perf_counter() - started,
+                         method=request.method, endpoint=endpoint, status=response.status_code)
+    return response
+
+@app.route('/metrics')
+def export_metrics():
+    """Prometheus scrape endpoint: request timings, generation phases and scheduler stage timings."""
+    token = app.config['METRICS_TOKEN']
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return Response('Unauthorized\n', status=401, mimetype='text/plain')
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
 
 # ======================================================================
 # --- AUTHENTICATION & CORE PAGE ROUTES ---
@@ -79,10 +158,8 @@ def dashboard():
 def manage():
     if 'user_id' not in session:
         return redirect(url_for('index'))
-    # Pass all data to the manage page for selection dropdowns
-    subjects = Subject.query.all()
-    faculties = Faculty.query.all()
-    return render_template('manage.html', subjects=subjects, faculties=faculties)
+    # Lists and dropdowns are filled page by page from the list APIs
+    return render_template('manage.html')
 
 # ======================================================================
 # --- API FOR DATA MANAGEMENT (CRUD OPERATIONS) ---
@@ -92,6 +169,41 @@ def check_auth():
     """Helper function to check if a user is logged in."""
     return 'user_id' in session
 
+def list_page(query, model, tables, to_json, search_columns):
+    """A page of a list API: GET ?q=<search>&limit=<n>&after=<cursor>.
+
+    Keyset pagination by id: the body is the list of rows after the cursor, and the
+    cursor of the next page (if any) is in the X-Next-Cursor header. The ETag is built
+    from the version counters of tables (see versions.py) and the query string, so an
+    unchanged page is answered with 304 before any row is read.
+    """
+    digest = hashlib.sha1(request.query_string).hexdigest()[:12]
+    etag = '-'.join(str(version) for version in table_versions(*tables)) + '-' + digest
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        try:
+            limit = int(request.args.get('limit', app.config['LIST_PAGE_SIZE']))
+            after = int(request.args.get('after', 0))
+        except ValueError:
+            return jsonify({"error": "limit and after must be integers"}), 400
+        if limit < 1:
+            return jsonify({"error": "limit must be at least 1"}), 400
+        limit = min(limit, app.config['LIST_MAX_PAGE_SIZE'])
+
+        query = query.filter(model.id > after)
+        search = request.args.get('q', '').strip().lower()
+        if search:
+            query = query.filter(or_(*(func.lower(column).contains(search, autoescape=True)
+                                          for column in search_columns)))
+        rows = query.order_by(model.id).limit(limit + 1).all()
+        response = jsonify([to_json(row) for row in rows[:limit]])
+        if len(rows) > limit:
+            response.headers['X-Next-Cursor'] = str(rows[limit - 1].id)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
 # --- Rooms API ---
 @app.route('/api/rooms', methods=['GET', 'POST'])
 def handle_rooms():
@@ -104,8 +216,7 @@ def handle_rooms():
         db.session.commit()
         return jsonify({"id": new_room.id, "name": new_room.name}), 201
 
-    rooms = Room.query.all()
-    return jsonify([{"id": room.id, "name": room.name} for room in rooms])
+    return list_page(Room.query, Room, ['room'], lambda room: {"id": room.id, "name": room.name}, [Room.name])
 
 @app.route('/api/rooms/<int:room_id>', methods=['DELETE'])
 def delete_room(room_id):
@@ -125,10 +236,15 @@ def handle_batches():
         new_batch = Batch(name=data['name'])
         db.session.add(new_batch)
         db.session.commit()
-        return jsonify({"id": new_batch.id, "name": new_batch.name}), 201
+        return jsonify({"id": new_batch.id, "name": new_batch.name, "subjects": []}), 201
 
-    batches = Batch.query.all()
-    return jsonify([{"id": batch.id, "name": batch.name} for batch in batches])
+    # ?subject=<code> keeps only the batches enrolled in that subject
+    query = Batch.query.options(selectinload(Batch.subjects))
+    if request.args.get('subject'):
+        query = query.filter(Batch.subjects.any(Subject.code == request.args['subject']))
+    return list_page(query, Batch, ['batch', 'subject', 'batch_subject'],
+                     lambda b: {"id": b.id, "name": b.name, "subjects": [{"id": s.id, "code": s.code} for s in b.subjects]},
+                     [Batch.name])
 
 @app.route('/api/batches/<int:batch_id>', methods=['DELETE'])
 def delete_batch(batch_id):
@@ -150,8 +266,9 @@ def handle_subjects():
         db.session.commit()
         return jsonify({"id": new_subject.id, "name": new_subject.name, "code": new_subject.code, "hours_per_week": new_subject.hours_per_week}), 201
 
-    subjects = Subject.query.all()
-    return jsonify([{"id": s.id, "name": s.name, "code": s.code, "hours_per_week": s.hours_per_week} for s in subjects])
+    return list_page(Subject.query, Subject, ['subject'],
+                     lambda s: {"id": s.id, "name": s.name, "code": s.code, "hours_per_week": s.hours_per_week},
+                     [Subject.name, Subject.code])
 
 @app.route('/api/subjects/<int:subject_id>', methods=['DELETE'])
 def delete_subject(subject_id):
@@ -173,8 +290,13 @@ def handle_faculties():
         db.session.commit()
         return jsonify({"id": new_faculty.id, "name": new_faculty.name, "subjects": []}), 201
 
-    faculties = Faculty.query.all()
-    return jsonify([{"id": f.id, "name": f.name, "subjects": [{"id": s.id, "code": s.code} for s in f.subjects]} for f in faculties])
+    # ?subject=<code> keeps only the faculty who can teach that subject
+    query = Faculty.query.options(selectinload(Faculty.subjects))
+    if request.args.get('subject'):
+        query = query.filter(Faculty.subjects.any(Subject.code == request.args['subject']))
+    return list_page(query, Faculty, ['faculty', 'subject', 'faculty_subject'],
+                     lambda f: {"id": f.id, "name": f.name, "subjects": [{"id": s.id, "code": s.code} for s in f.subjects]},
+                     [Faculty.name])
 
 @app.route('/api/faculties/<int:faculty_id>', methods=['DELETE'])
 def delete_faculty(faculty_id):
@@ -198,6 +320,207 @@ def add_subject_to_faculty(faculty_id):
 
     return jsonify({"success": True, "faculty_name": faculty.name, "subject_code": subject.code})
 
+# --- Enrolment API (Linking Subjects to Batches) ---
+# Once a batch is enrolled in a subject, it only gets sessions for its own subjects;
+# until then it takes every subject.
+@app.route('/api/batches/<int:batch_id>/subjects', methods=['POST'])
+def enrol_batch(batch_id):
+    if not check_auth(): return jsonify({"error": "Unauthorized"}), 401
+    data = request.json
+    batch = Batch.query.get_or_404(batch_id)
+    subject = Subject.query.get_or_404(data['subject_id'])
+
+    if subject not in batch.subjects:
+        batch.subjects.append(subject)
+        db.session.commit()
+
+    return jsonify({"success": True, "batch_name": batch.name, "subject_code": subject.code})
+
+@app.route('/api/batches/<int:batch_id>/subjects/<int:subject_id>', methods=['DELETE'])
+def unenrol_batch(batch_id, subject_id):
+    if not check_auth(): return jsonify({"error": "Unauthorized"}), 401
+    batch = Batch.query.get_or_404(batch_id)
+    subject = Subject.query.get_or_404(subject_id)
+
+    if subject in batch.subjects:
+        batch.subjects.remove(subject)
+        db.session.commit()
+
+    return jsonify({"success": True})
+
+# --- Bulk import / export API ---
+# Body (or a multipart "file") in CSV or JSON, chosen by ?format= or the content type;
+# see bulk_io.ENTITIES for the columns of each entity.
+@app.route('/api/import/<entity>', methods=['POST'])
+def bulk_import(entity):
+    if not check_auth(): return jsonify({"error": "Unauthorized"}), 401
+    if entity not in ENTITIES:
+        return jsonify({"error": f"Unknown entity '{entity}'"}), 404
+    upload = request.files.get('file')
+    stream = upload.stream if upload else request.stream
+    mimetype = upload.mimetype if upload else request.mimetype
+    fmt = request.args.get('format') or ('csv' if 'csv' in (mimetype or '') or (upload and upload.filename.endswith('.csv')) else 'json')
+
+    try:
+        summary, errors = import_rows(entity, read_rows(stream, fmt))
+    except BulkImportError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"status": "error", "message": "The data changed during the import; nothing was saved. Please retry."}), 409
+    if errors:
+        return jsonify({"status": "error", "message": "Nothing was imported.", "errors": errors}), 400
+    return jsonify(dict(summary, status="success"))
+
+@app.route('/api/export/<entity>', methods=['GET'])
+def bulk_export(entity):
+    if not check_auth(): return jsonify({"error": "Unauthorized"}), 401
+    if entity not in ENTITIES:
+        return jsonify({"error": f"Unknown entity '{entity}'"}), 404
+    fmt = request.args.get('format', 'csv')
+    if fmt not in ('csv', 'json'):
+        return jsonify({"error": "format must be csv or json"}), 400
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/json'
+    return Response(stream_with_context(export_rows(entity, fmt)), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename={entity}.{fmt}'})
+
+# --- Constraint weights API ---
+def constraint_json(constraint, weights):
+    return {
+        "name": constraint.name,
+        "description": constraint.description,
+        "hard": constraint.hard,
+        "default_weight": constraint.weight,
+        "weight": weights.get(constraint.name, constraint.weight),
+    }
+
+@app.route('/api/constraints', methods=['GET'])
+def list_constraints():
+    if not check_auth(): return jsonify({"error": "Unauthorized"}), 401
+    weights = {w.name: w.weight for w in ConstraintWeight.query.all()}
+    return jsonify([constraint_json(c, weights) for c in CONSTRAINTS.values()])
+
+@app.route('/api/constraints/<name>', methods=['PUT', 'DELETE'])
+def update_constraint(name):
+    """PUT {"weight": n} sets this institution's weight for a rule (0 turns it off); DELETE restores the default."""
+    if not check_auth(): return jsonify({"error": "Unauthorized"}), 401
+    if name not in CONSTRAINTS:
+        return jsonify({"error": f"Unknown constraint '{name}'"}), 404
+    row = ConstraintWeight.query.filter_by(name=name).first()
+
+    if request.method == 'DELETE':
+        if row:
+            db.session.delete(row)
+            db.session.commit()
+        return jsonify(constraint_json(CONSTRAINTS[name], {}))
+
+    weight = (request.json or {}).get('weight')
+    if not isinstance(weight, int) or isinstance(weight, bool) or weight < 0:
+        return jsonify({"error": "weight must be a non-negative integer"}), 400
+    if row:
+        row.weight = weight
+    else:
+        db.session.add(ConstraintWeight(name=name, weight=weight))
+    db.session.commit()
+    return jsonify(constraint_json(CONSTRAINTS[name], {name: weight}))
+
+# --- Time grid API ---
+# Days and timeslots in teaching order: new ones go last unless a "position" is given.
+# While either table is empty the scheduler uses the default grid for it.
+def grid_entry_json(entry):
+    return {"id": entry.id, "name": entry.name, "position": entry.position}
+
+def handle_grid(model):
+    if request.method == 'POST':
+        data = request.json or {}
+        name = str(data.get('name') or '').strip()
+        position = data.get('position')
+        if not name:
+            return jsonify({"error": "name is required"}), 400
+        if position is not None and (not isinstance(position, int) or isinstance(position, bool)):
+            return jsonify({"error": "position must be an integer"}), 400
+        if model.query.filter_by(name=name).first():
+            return jsonify({"error": f"'{name}' already exists"}), 409
+        if position is None:
+            position = (db.session.query(func.max(model.position)).scalar() or 0) + 1
+        entry = model(name=name, position=position)
+        db.session.add(entry)
+        db.session.commit()
+        return jsonify(grid_entry_json(entry)), 201
+
+    return jsonify([grid_entry_json(entry) for entry in model.query.order_by(model.position, model.id)])
+
+def delete_grid_entry(model, entry_id):
+    """Also deletes the unavailable times that refer to it."""
+    entry = model.query.get_or_404(entry_id)
+    db.session.delete(entry)
+    db.session.commit()
+    return jsonify({"success": True})
+
+@app.route('/api/days', methods=['GET', 'POST'])
+def handle_days():
+    if not check_auth(): return jsonify({"error": "Unauthorized"}), 401
+    return handle_grid(Day)
+
+@app.route('/api/days/<int:day_id>', methods=['DELETE'])
+def delete_day(day_id):
+    if not check_auth(): return jsonify({"error": "Unauthorized"}), 401
+    return delete_grid_entry(Day, day_id)
+
+@app.route('/api/timeslots', methods=['GET', 'POST'])
+def handle_timeslots():
+    if not check_auth(): return jsonify({"error": "Unauthorized"}), 401
+    return handle_grid(Timeslot)
+
+@app.route('/api/timeslots/<int:timeslot_id>', methods=['DELETE'])
+def delete_timeslot(timeslot_id):
+    if not check_auth(): return jsonify({"error": "Unauthorized"}), 401
+    return delete_grid_entry(Timeslot, timeslot_id)
+
+# --- Unavailability API ---
+# Times a faculty member or room can't be used. POST {"day_id", "timeslot_id"}; leave out
+# timeslot_id for the whole day. The scheduler treats these as hard constraints.
+def unavailability_json(entry):
+    return {"id": entry.id, "day": entry.day.name, "timeslot": entry.timeslot.name if entry.timeslot else None}
+
+def handle_unavailability(owner, model):
+    if request.method == 'POST':
+        data = request.json or {}
+        day = Day.query.get_or_404(data.get('day_id'))
+        timeslot = Timeslot.query.get_or_404(data['timeslot_id']) if data.get('timeslot_id') is not None else None
+        entry = model(day_id=day.id, timeslot_id=timeslot.id if timeslot else None)
+        owner.unavailable.append(entry)
+        db.session.commit()
+        return jsonify(unavailability_json(entry)), 201
+
+    return jsonify([unavailability_json(entry) for entry in owner.unavailable])
+
+@app.route('/api/faculties/<int:faculty_id>/unavailable', methods=['GET', 'POST'])
+def handle_faculty_unavailability(faculty_id):
+    if not check_auth(): return jsonify({"error": "Unauthorized"}), 401
+    return handle_unavailability(Faculty.query.get_or_404(faculty_id), FacultyUnavailability)
+
+@app.route('/api/faculties/<int:faculty_id>/unavailable/<int:entry_id>', methods=['DELETE'])
+def delete_faculty_unavailability(faculty_id, entry_id):
+    if not check_auth(): return jsonify({"error": "Unauthorized"}), 401
+    entry = FacultyUnavailability.query.filter_by(id=entry_id, faculty_id=faculty_id).first_or_404()
+    db.session.delete(entry)
+    db.session.commit()
+    return jsonify({"success": True})
+
+@app.route('/api/rooms/<int:room_id>/unavailable', methods=['GET', 'POST'])
+def handle_room_unavailability(room_id):
+    if not check_auth(): return jsonify({"error": "Unauthorized"}), 401
+    return handle_unavailability(Room.query.get_or_404(room_id), RoomUnavailability)
+
+@app.route('/api/rooms/<int:room_id>/unavailable/<int:entry_id>', methods=['DELETE'])
+def delete_room_unavailability(room_id, entry_id):
+    if not check_auth(): return jsonify({"error": "Unauthorized"}), 401
+    entry = RoomUnavailability.query.filter_by(id=entry_id, room_id=room_id).first_or_404()
+    db.session.delete(entry)
+    db.session.commit()
+    return jsonify({"success": True})
+
 
 # ======================================================================
 # --- SCHEDULER API ---
@@ -208,79 +531,320 @@ def add_subject_to_faculty(faculty_id):
 # --- SCHEDULER API ---
 # ======================================================================
 
+def load_scheduler_input():
+    """Build the scheduler's input dict from the database.
+
+    Returns (input_data, None), or (None, (response, status)) when the data is not
+    ready for generation.
+    """
+    # Step 1: Fetch all data from the database (a fixed number of queries, see snapshot.py)
+    snapshot = load_snapshot()
+    db_rooms, db_batches, db_faculty, db_subjects = snapshot.rooms, snapshot.batches, snapshot.faculty, snapshot.subjects
+
+    # Data summary, logged at DEBUG level only
+    is_any_faculty_assigned = bool(snapshot.teaches)
+    app.logger.debug("Scheduler input: %d rooms, %d batches, %d subjects, %d faculty; subjects assigned: %s",
+                     len(db_rooms), len(db_batches), len(db_subjects), len(db_faculty), is_any_faculty_assigned)
+
+    # --- PRE-GENERATION VALIDATION ---
+    if not db_rooms:
+        return None, (jsonify({"status": "error", "message": "No rooms found. Please add at least one room."}), 400)
+    if not db_batches:
+        return None, (jsonify({"status": "error", "message": "No batches found. Please add at least one batch."}), 400)
+    if not db_subjects:
+        return None, (jsonify({"status": "error", "message": "No subjects found. Please add at least one subject."}), 400)
+    if not db_faculty:
+        return None, (jsonify({"status": "error", "message": "No faculty found. Please add at least one faculty member."}), 400)
+
+    if not is_any_faculty_assigned:
+        return None, (jsonify({"status": "error", "message": "Faculty members have not been assigned any subjects. Please assign subjects on the 'Manage Data' page."}), 400)
+    # --- END OF VALIDATION ---
+
+    # Step 2: Convert database objects into the simple dict format the algorithm expects.
+    # An enrolled batch only takes its subjects; a batch not enrolled in any yet takes every subject.
+    enrolled = {code: set(batches) for code, batches in snapshot.enrolments.items()}
+    unenrolled = set(db_batches).difference(*enrolled.values())
+    input_data = {
+        "rooms": list(db_rooms),
+        "batches": list(db_batches),
+        "faculty": {name: faculty_input(faculty_id, snapshot) for faculty_id, name in db_faculty},
+        "subjects": {code: {"name": name, "hours_per_week": hours,
+                            "batches": [batch for batch in db_batches
+                                        if batch in unenrolled or batch in enrolled.get(code, ())]}
+                     for code, name, hours in db_subjects},
+        "timeslots": snapshot.timeslots,
+        "days": snapshot.days
+    }
+    # Only institutions that changed a weight or recorded a room's unavailable times
+    # get these keys, so other inputs keep their cache fingerprint
+    if snapshot.weights:
+        input_data["constraint_weights"] = snapshot.weights
+    if snapshot.room_unavailable:
+        input_data["room_unavailable"] = snapshot.room_unavailable
+    return input_data, None
+
+def faculty_input(faculty_id, snapshot):
+    details = {"subjects": snapshot.teaches.get(faculty_id, [])}
+    if faculty_id in snapshot.faculty_unavailable:
+        details["unavailable"] = snapshot.faculty_unavailable[faculty_id]
+    return details
+
+def number_option(options, name, convert, minimum, maximum=None):
+    """options[name] (default: the SCHEDULER_<NAME> config) as an int or float between
+    minimum and maximum; raises ValueError with a message for the client otherwise."""
+    value = options.get(name, app.config['SCHEDULER_' + name.upper()])
+    message = f"'{name}' must be a {'number' if convert is float else 'whole number'}"
+    if isinstance(value, bool) or (convert is int and isinstance(value, float) and not value.is_integer()):
+        raise ValueError(message)
+    try:
+        value = convert(value)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(message) from None
+    if value != value or value < minimum: # NaN fails both comparisons
+        raise ValueError(f"'{name}' must be at least {minimum}")
+    if maximum is not None and value > maximum:
+        raise ValueError(f"'{name}' must be at most {maximum}")
+    return value
+
+def choice_option(options, name, choices):
+    """options[name] (default: the SCHEDULER_<NAME> config), which must be one of choices."""
+    value = options.get(name, app.config['SCHEDULER_' + name.upper()])
+    if not isinstance(value, str) or value not in choices:
+        raise ValueError(f"Unknown {name} '{value}'. Choose one of: {', '.join(choices)}")
+    return value
+
+def multistart_settings(options):
+    """run_multistart keyword arguments from app config, overridable by the request body.
+
+    "warm_start" may be a stored run id, or true for the latest run: the search then
+    starts from that run's best timetable and only repairs what the data edits broke.
+    Raises ValueError (answered with a 400) for an option that is malformed or unknown.
+    """
+    if not isinstance(options, dict):
+        raise ValueError("Options must be a JSON object")
+    warm_start = options.get('warm_start')
+    previous = None
+    if warm_start is True:
+        previous = best_sessions(latest_run())
+    elif warm_start not in (None, False):
+        if isinstance(warm_start, bool) or not isinstance(warm_start, (int, str)) or not str(warm_start).isdigit():
+            raise ValueError("'warm_start' must be a stored run id or true")
+        run = load_run(int(warm_start))
+        if run is None:
+            raise ValueError(f"Stored run {warm_start} not found")
+        previous = best_sessions(run)
+    seed = options.get('seed')
+    if seed is not None and (isinstance(seed, bool) or not isinstance(seed, int) or seed < 0):
+        raise ValueError("'seed' must be a whole number of at least 0")
+    time_budget = number_option(options, 'time_budget', float, 0)
+    if time_budget == 0:
+        raise ValueError("'time_budget' must be greater than 0") # No pass would get to run
+    return {
+        "runs": number_option(options, 'runs', int, 1, app.config['SCHEDULER_MAX_RUNS']),
+        "workers": app.config['SCHEDULER_WORKERS'],
+        "time_budget": time_budget,
+        "seed": seed,
+        "scheduler_options": {
+            "islands": number_option(options, 'islands', int, 1, app.config['SCHEDULER_MAX_ISLANDS']),
+            "migration_interval": number_option(options, 'migration_interval', int, 1),
+            "migrants": number_option(options, 'migrants', int, 0, app.config['SCHEDULER_MAX_MIGRANTS']),
+            "previous": previous,
+            "init": choice_option(options, 'init', INITIALIZERS),
+            "strategy": choice_option(options, 'strategy', STRATEGIES),
+            "ls_time_limit": number_option(options, 'ls_time_limit', float, 0),
+            "backend": choice_option(options, 'backend', BACKENDS),
+            "exact_time_limit": number_option(options, 'exact_time_limit', float, 0),
+        }
+    }
+
+# Request options that change how a generation is solved. A stored run is only reused
+# when none of them is given, and only if it was solved with the settings a plain
+# request gets now (runs are stored under their settings_fingerprint).
+SOLVER_OPTIONS = ('runs', 'time_budget', 'seed', 'islands', 'migration_interval', 'migrants', 'warm_start',
+                  'init', 'strategy', 'ls_time_limit', 'backend', 'exact_time_limit')
+
+def reuses_stored_run(options):
+    """Whether a request may be answered with the stored run for unchanged data."""
+    if options.get('refresh'):
+        return False
+    return all(options.get(name) is None or options.get(name) is False for name in SOLVER_OPTIONS)
+
+def format_results(results):
+    """The best results as numbered options for the frontend."""
+    results_json = []
+    for i, result in enumerate(results[:app.config['SCHEDULER_OPTIONS']]):
+        results_json.append({"option": i + 1, "fitness": result["fitness"], "seed": result["seed"], "timetable": result["timetable"]})
+    return results_json
+
 @app.route('/api/generate', methods=['POST'])
 def generate_timetable():
     if not check_auth(): return jsonify({"error": "Unauthorized"}), 401
-    
+    options = request.get_json(silent=True) or {}
+    timer = PhaseTimer() # db / solve / serialize, reported in /metrics and the Server-Timing header
     try:
-        # Step 1: Fetch all data from the database
-        db_rooms = Room.query.all()
-        db_batches = Batch.query.all()
-        db_faculty = Faculty.query.all()
-        db_subjects = Subject.query.all()
-
-        # --- NEW: DETAILED DEBUG REPORT ---
-        print("\n--- DATA VALIDATION REPORT ---")
-        print(f"Rooms found: {len(db_rooms)}")
-        print(f"Batches found: {len(db_batches)}")
-        print(f"Subjects found: {len(db_subjects)}")
-        print(f"Faculty found: {len(db_faculty)}")
-        
-        is_any_faculty_assigned = any(f.subjects for f in db_faculty)
-        print(f"Is at least one faculty assigned a subject? {is_any_faculty_assigned}")
-        print("--------------------------------\n")
-        # --- END OF REPORT ---
-
-        # --- PRE-GENERATION VALIDATION ---
-        if not db_rooms:
-            return jsonify({"status": "error", "message": "No rooms found. Please add at least one room."}), 400
-        if not db_batches:
-            return jsonify({"status": "error", "message": "No batches found. Please add at least one batch."}), 400
-        if not db_subjects:
-            return jsonify({"status": "error", "message": "No subjects found. Please add at least one subject."}), 400
-        if not db_faculty:
-            return jsonify({"status": "error", "message": "No faculty found. Please add at least one faculty member."}), 400
-
-        if not is_any_faculty_assigned:
-            return jsonify({"status": "error", "message": "Faculty members have not been assigned any subjects. Please assign subjects on the 'Manage Data' page."}), 400
-        # --- END OF VALIDATION ---
-
-        # Step 2: Convert database objects into the simple dict format the algorithm expects
-        input_data = {
-            "rooms": [r.name for r in db_rooms],
-            "batches": [b.name for b in db_batches],
-            "faculty": {f.name: {"subjects": [s.code for s in f.subjects]} for f in db_faculty},
-            "subjects": {s.code: {"name": s.name, "hours_per_week": s.hours_per_week, "batches": [b.name for b in db_batches]} for s in db_subjects},
-            "timeslots": ["9-10", "10-11", "11-12", "1-2", "2-3"],
-            "days": ["Mon", "Tue", "Wed", "Thu", "Fri"]
-        }
+        settings = multistart_settings(options)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
 
-        # Step 3: Run the scheduler algorithm multiple times to get options
-        best_timetables = []
-        for i in range(3):
-            print(f"--- Running scheduler: Pass {i+1} ---")
-            timetable = run_scheduler(input_data)
-            best_timetables.append(timetable)
-        
-        best_timetables.sort(key=lambda t: t.fitness)
-
-        # Step 4: Format the results for the frontend
-        results_json = []
-        for i, tt in enumerate(best_timetables):
-            timetable_json = []
-            for gene in tt.genes:
-                timetable_json.append({
-                    "day": gene.day, "timeslot": gene.timeslot, "room": gene.room,
-                    "batch": gene.batch, "subject": gene.subject, "faculty": gene.faculty
-                })
-            results_json.append({"option": i + 1, "fitness": tt.fitness, "timetable": timetable_json})
-
-        return jsonify({"status": "success", "results": results_json})
+    try:
+        with timer.phase('db'):
+            input_data, error = load_scheduler_input()
+        if error:
+            return error
+
+        # Unchanged data and no explicit solver options: return the stored timetables instead of solving again
+        input_hash = input_fingerprint(input_data)
+        settings_hash = settings_fingerprint(settings)
+        if reuses_stored_run(options):
+            with timer.phase('db'):
+                cached_run = find_cached_run(input_hash, settings_hash)
+            if cached_run:
+                app.logger.debug("Returning stored run %d for unchanged input", cached_run.id)
+                with timer.phase('serialize'):
+                    response = jsonify({"status": "success", "results": run_results(cached_run), "run_id": cached_run.id, "cached": True,
+                                        "grid": run_grid(cached_run)})
+                return timer.record('generate', response)
+
+        # Step 3: Run independent, seeded scheduler passes in parallel to get options.
+        # Give the connection back first: a read transaction held for the whole run would
+        # keep SQLite from checkpointing (or, without WAL, block every editor's writes)
+        db.session.close()
+        app.logger.debug("Running scheduler: %d passes", settings['runs'])
+        with timer.phase('solve'):
+            results = run_multistart(input_data, **settings)
+
+        # Step 4: Format the best results for the frontend and keep them
+        with timer.phase('serialize'):
+            results_json = format_results(results)
+        grid = input_grid(input_data)
+        run = None
+        if results_json: # An empty run is not worth keeping, let alone handing back later
+            with timer.phase('db'):
+                run = save_run(input_hash, results_json, grid, settings_hash)
+        with timer.phase('serialize'):
+            response = jsonify({"status": "success", "results": results_json, "run_id": run and run.id,
+                                "cached": False, "grid": grid})
+        return timer.record('generate', response)
     
     except Exception as e:
         print(f"Error during generation: {e}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
+# --- Background generation jobs ---
+@app.route('/api/jobs', methods=['POST'])
+def create_job():
+    """Start a generation in the background and return its id straight away.
+
+    {"profile": true} (allowed when SCHEDULER_PROFILING is on) captures a cProfile
+    report of every pass, served afterwards by /api/jobs/<id>/profile.
+    """
+    if not check_auth(): return jsonify({"error": "Unauthorized"}), 401
+    options = request.get_json(silent=True) or {}
+    try:
+        settings = multistart_settings(options)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    profile = bool(options.get('profile'))
+    if profile and not app.config['SCHEDULER_PROFILING']:
+        return jsonify({"status": "error", "message": "Profiling is disabled on this server (SCHEDULER_PROFILING)."}), 403
+    timer = PhaseTimer()
+
+    with timer.phase('db'):
+        input_data, error = load_scheduler_input()
+    if error:
+        return error
+
+    input_hash = input_fingerprint(input_data)
+    settings_hash = settings_fingerprint(settings)
+    with timer.phase('db'):
+        cached_run = (find_cached_run(input_hash, settings_hash)
+                      if reuses_stored_run(options) and not profile else None)
+    if cached_run:
+        with timer.phase('serialize'):
+            cached_results = run_results(cached_run)
+        timer.record('jobs')
+        job = job_manager.add_done(cached_results, settings['runs'], run_grid(cached_run))
+        return jsonify({"status": "accepted", "job_id": job.id, "run_id": cached_run.id, "cached": True}), 202
+
+    def run(job):
+        with timer.phase('solve'):
+            results = run_multistart(input_data, on_progress=job.report_progress,
+                                     should_stop=lambda: job.cancel_requested, profile=profile, **settings)
+        if profile:
+            job.profile = '\n'.join(f"=== Pass with seed {result['seed']} (fitness {result['fitness']}) ===\n{result['profile']}"
+                                    for result in results)
+        with timer.phase('serialize'):
+            results_json = format_results(results)
+        # Partial results of a cancelled job, or no results at all, are not worth caching
+        if results_json and not job.cancel_requested:
+            with timer.phase('db'), app.app_context():
+                save_run(input_hash, results_json, grid, settings_hash)
+        timer.record('jobs')
+        return results_json
+
+    grid = input_grid(input_data)
+    job = job_manager.submit(run, settings['runs'], grid)
+    return jsonify({"status": "accepted", "job_id": job.id, "cached": False}), 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    if not check_auth(): return jsonify({"error": "Unauthorized"}), 401
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/jobs/<job_id>/profile', methods=['GET'])
+def get_job_profile(job_id):
+    """The cProfile report of a job started with {"profile": true}, as plain text."""
+    if not check_auth(): return jsonify({"error": "Unauthorized"}), 401
+    job = job_manager.get(job_id)
+    if job is None or job.profile is None:
+        return jsonify({"error": "No profile for this job"}), 404
+    return Response(job.profile, mimetype='text/plain')
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Stop a job; passes that are already running return their best-so-far timetables."""
+    if not check_auth(): return jsonify({"error": "Unauthorized"}), 401
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    job.cancel()
+    return jsonify({"success": True, "status": job.status})
+
+@app.route('/api/jobs/<job_id>/events')
+def stream_job(job_id):
+    """Server-Sent Events stream of a job's progress."""
+    if not check_auth(): return jsonify({"error": "Unauthorized"}), 401
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return Response(job.events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+# --- Stored timetables ---
+@app.route('/api/timetables', methods=['GET'])
+def list_timetable_runs():
+    """Recent generations, newest first, flagged when they match the current data."""
+    if not check_auth(): return jsonify({"error": "Unauthorized"}), 401
+    input_data, error = load_scheduler_input()
+    current_hash = input_fingerprint(input_data) if not error else None
+    runs = (TimetableRun.query
+            .options(selectinload(TimetableRun.timetables))
+            .order_by(TimetableRun.created_at.desc(), TimetableRun.id.desc())
+            .limit(20)
+            .all())
+    return jsonify([run_summary(run, current_hash) for run in runs])
+
+@app.route('/api/timetables/<int:run_id>', methods=['GET'])
+def get_timetable_run(run_id):
+    if not check_auth(): return jsonify({"error": "Unauthorized"}), 401
+    run = load_run(run_id)
+    if run is None:
+        return jsonify({"status": "error", "message": "Timetable run not found"}), 404
+    return jsonify({"status": "success", "results": run_results(run), "run_id": run.id, "cached": True, "grid": run_grid(run)})
+
 if __name__ == '__main__':
     # This block allows you to run 'python app.py' from the terminal
-    app.run(debug=True)
+    app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,228 @@
+# benchmark.py
+# Reproducible scheduler benchmarks on synthetic institutions, written to a JSON report.
+#
+#   python benchmark.py                                  # all presets, all solvers, 3 seeds
+#   python benchmark.py --preset small --solver ga --seeds 1 2
+#   python benchmark.py --output report.json --compare baseline.json
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from scheduler_v2 import run_scheduler, Encoding
+
+# --- SYNTHETIC INSTANCES ---
+DAYS = ["Mon", "Tue", "Wed", "Thu", "Fri"]
+TIMESLOTS = ["9-10", "10-11", "11-12", "1-2", "2-3"]
+
+# name -> generate_instance() arguments
+PRESETS = {
+    "small":  dict(rooms=3,  batches=2,  subjects=4,  faculty=3,  hours=(2, 4), link_density=0.4, subjects_per_batch=3),
+    "medium": dict(rooms=6,  batches=6,  subjects=12, faculty=10, hours=(2, 4), link_density=0.25, subjects_per_batch=5),
+    "large":  dict(rooms=12, batches=12, subjects=30, faculty=24, hours=(2, 5), link_density=0.15, subjects_per_batch=6),
+}
+
+def generate_instance(rooms, batches, subjects, faculty, hours=(2, 4), link_density=0.3,
+                      subjects_per_batch=None, days=DAYS, timeslots=TIMESLOTS, seed=0):
+    """A synthetic scheduler input in the format built by app.load_scheduler_input.
+
+    link_density is the chance that a faculty member can teach a given subject; every
+    subject still gets at least one teacher so no sessions are silently dropped.
+    Each batch takes subjects_per_batch subjects (default: all of them).
+    """
+    rng = random.Random(seed)
+    room_names = [f"R{i + 1}" for i in range(rooms)]
+    batch_names = [f"B{i + 1}" for i in range(batches)]
+    subject_codes = [f"SUB{i + 1:03d}" for i in range(subjects)]
+    faculty_ids = [f"F{i + 1}" for i in range(faculty)]
+
+    taking = {code: [] for code in subject_codes}
+    for batch in batch_names:
+        count = len(subject_codes) if subjects_per_batch is None else min(subjects_per_batch, len(subject_codes))
+        for code in rng.sample(subject_codes, count):
+            taking[code].append(batch)
+
+    teaches = {fid: [] for fid in faculty_ids}
+    for code in subject_codes:
+        linked = [fid for fid in faculty_ids if rng.random() < link_density] or [rng.choice(faculty_ids)]
+        for fid in linked:
+            teaches[fid].append(code)
+
+    return {
+        "rooms": room_names,
+        "batches": batch_names,
+        "faculty": {fid: {"name": f"Faculty {fid}", "subjects": codes} for fid, codes in teaches.items()},
+        "subjects": {code: {"name": f"Subject {code}", "hours_per_week": rng.randint(*hours), "batches": taking[code]}
+                     for code in subject_codes},
+        "timeslots": list(timeslots),
+        "days": list(days),
+    }
+
+# --- SOLVERS ---
+# name -> run_scheduler() keyword arguments
+SOLVERS = {
+    "ga": dict(engine='incremental', strategy='ga'),
+    "ga-numpy": dict(engine='numpy', strategy='ga'),
+    "ga+ls": dict(engine='incremental', strategy='ga+ls'),
+    "ls": dict(strategy='ls'),
+    "cpsat": dict(backend='cpsat'),
+}
+
+def solver_available(name):
+    if name == "cpsat":
+        import cpsat_backend
+        return cpsat_backend.available()
+    if name == "ga-numpy":
+        try:
+            import numpy # noqa: F401
+        except ImportError:
+            return False
+    return True
+
+def run_case(input_data, solver_options, seed, time_limit=None, measure_memory=True):
+    """Run one seeded scheduler pass and return its measurements.
+
+    Wall time is taken from a run without tracemalloc (which slows allocation-heavy
+    code several times over); peak memory comes from a second, identical run.
+    evaluations counts the GA's fitness evaluations (new individuals it scored), and
+    stages the seconds spent per scheduler stage (see metrics.STAGES).
+    """
+    def solve():
+        return run_scheduler(input_data, time_limit=time_limit, seed=seed, **solver_options)
+
+    started = time.perf_counter()
+    timetable = solve()
+    wall_time = time.perf_counter() - started
+
+    peak_memory = None
+    if measure_memory:
+        tracemalloc.start()
+        try:
+            solve()
+            peak_memory = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    stats = timetable.stats
+    uses_ga = stats["generations"] > 0 or stats["evaluations"] > 0
+    evaluations = stats["evaluations"] if uses_ga else None
+    return {
+        "seed": seed,
+        "wall_time": round(wall_time, 4),
+        "generations": stats["generations"] if uses_ga else None,
+        "evaluations": evaluations,
+        "evaluations_per_sec": round(evaluations / wall_time, 1) if evaluations and wall_time > 0 else None,
+        "peak_memory_bytes": peak_memory,
+        "fitness": timetable.fitness,
+        "stages": {stage: round(seconds, 4) for stage, seconds in stats["stages"].items() if seconds},
+    }
+
+def summarize(cases):
+    """Median wall time / throughput / memory and best + median fitness over the seeds."""
+    def median(values):
+        values = sorted(v for v in values if v is not None)
+        if not values:
+            return None
+        middle = len(values) // 2
+        return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2
+    return {
+        "wall_time": median(c["wall_time"] for c in cases),
+        "evaluations_per_sec": median(c["evaluations_per_sec"] for c in cases),
+        "peak_memory_bytes": median(c["peak_memory_bytes"] for c in cases),
+        "fitness": median(c["fitness"] for c in cases),
+        "best_fitness": min(c["fitness"] for c in cases),
+    }
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmarks(presets, solvers, seeds, time_limit=None, measure_memory=True, instance_seed=0):
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "revision": git_revision(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "time_limit": time_limit,
+        "seeds": list(seeds),
+        "results": [],
+    }
+    for preset in presets:
+        input_data = generate_instance(**PRESETS[preset], seed=instance_seed)
+        sessions = len(Encoding(input_data))
+        for solver in solvers:
+            if not solver_available(solver):
+                print(f"Skipping {solver}: not available in this environment.")
+                continue
+            cases = []
+            for seed in seeds:
+                case = run_case(input_data, SOLVERS[solver], seed, time_limit, measure_memory)
+                print(f"{preset:>8} {solver:>9} seed {seed}: fitness {case['fitness']} in {case['wall_time']:.2f}s")
+                cases.append(case)
+            report["results"].append({
+                "preset": preset, "solver": solver, "sessions": sessions,
+                "summary": summarize(cases), "runs": cases,
+            })
+    return report
+
+def compare(report, baseline, time_tolerance=0.25, memory_tolerance=0.25, min_time_delta=0.1):
+    """Regressions of report against a baseline report: worse median fitness, or median
+    wall time / peak memory more than the tolerance above the baseline's. Wall time
+    differences under min_time_delta seconds are treated as noise."""
+    previous = {(r["preset"], r["solver"]): r["summary"] for r in baseline.get("results", [])}
+    regressions = []
+    for result in report["results"]:
+        before = previous.get((result["preset"], result["solver"]))
+        if before is None:
+            continue
+        now = result["summary"]
+        name = f"{result['preset']}/{result['solver']}"
+        if now["fitness"] > before["fitness"]:
+            regressions.append(f"{name}: median fitness {before['fitness']} -> {now['fitness']}")
+        if (now["wall_time"] > before["wall_time"] * (1 + time_tolerance)
+                and now["wall_time"] - before["wall_time"] >= min_time_delta):
+            regressions.append(f"{name}: median wall time {before['wall_time']:.2f}s -> {now['wall_time']:.2f}s")
+        if (before["peak_memory_bytes"] and now["peak_memory_bytes"]
+                and now["peak_memory_bytes"] > before["peak_memory_bytes"] * (1 + memory_tolerance)):
+            regressions.append(f"{name}: peak memory {before['peak_memory_bytes']} -> {now['peak_memory_bytes']} bytes")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the timetable scheduler on synthetic institutions.")
+    parser.add_argument("--preset", nargs="+", choices=list(PRESETS), default=list(PRESETS))
+    parser.add_argument("--solver", nargs="+", choices=list(SOLVERS), default=list(SOLVERS))
+    parser.add_argument("--seeds", nargs="+", type=int, default=[1, 2, 3])
+    parser.add_argument("--instance-seed", type=int, default=0, help="seed of the synthetic instances")
+    parser.add_argument("--time-limit", type=float, default=None, help="seconds per scheduler run")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc peak-memory runs")
+    parser.add_argument("--output", default="benchmark_report.json")
+    parser.add_argument("--compare", metavar="BASELINE", help="fail if results regress against this report")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.preset, args.solver, args.seeds, args.time_limit,
+                            not args.no_memory, args.instance_seed)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f))
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print("No regressions against the baseline.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
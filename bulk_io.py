@@ -0,0 +1,239 @@
+# bulk_io.py
+# Bulk import and streamed export of rooms, batches, subjects, faculty, their subject
+# assignments and batch enrolments, as CSV or JSON. An import is validated in full and then written with
+# one executemany per table and a single commit: it succeeds completely or not at all.
+import csv
+import io
+import json
+
+from sqlalchemy import insert
+
+from models import db, Room, Batch, Faculty, Subject, faculty_subject_association, batch_subject_association
+from versions import bump_versions
+
+EXPORT_CHUNK_ROWS = 1000 # rows fetched (and rows per streamed chunk) at a time
+MAX_REPORTED_ERRORS = 50
+
+class BulkImportError(ValueError):
+    """The upload could not be read at all (not valid CSV/JSON)."""
+
+# --- ENTITIES ---
+# name -> (model, columns in file order, key column whose existing values are skipped, or None)
+ENTITIES = {
+    'rooms': (Room, ('name',), 'name'),
+    'batches': (Batch, ('name',), 'name'),
+    'subjects': (Subject, ('code', 'name', 'hours_per_week'), 'code'),
+    # Names aren't unique in the database, but importing one that exists would make
+    # assignments by name ambiguous, so it is skipped like any other existing key
+    'faculty': (Faculty, ('name',), 'name'),
+    # Rows link a faculty member (by name) to a subject (by code); missing faculty are created
+    'faculty_subjects': (None, ('faculty', 'subject'), None),
+    # Rows enrol a batch (by name) in a subject (by code); both must exist
+    'batch_subjects': (None, ('batch', 'subject'), None),
+}
+
+def max_length(model, column):
+    return getattr(model.__table__.c[column].type, 'length', None)
+
+def clean_row(entity, row):
+    """Validated column values of one row, or raises ValueError with the reason."""
+    model, columns, _ = ENTITIES[entity]
+    values = {}
+    for column in columns:
+        value = row.get(column)
+        value = '' if value is None else str(value).strip()
+        if not value:
+            raise ValueError(f"'{column}' is required")
+        values[column] = value
+    if model is not None:
+        for column, value in values.items():
+            length = max_length(model, column)
+            if length and len(value) > length:
+                raise ValueError(f"'{column}' is longer than {length} characters")
+    if 'hours_per_week' in values:
+        try:
+            values['hours_per_week'] = int(values['hours_per_week'])
+        except ValueError:
+            raise ValueError("'hours_per_week' must be a whole number") from None
+        if values['hours_per_week'] < 1:
+            raise ValueError("'hours_per_week' must be at least 1")
+    return values
+
+# --- PARSING ---
+def read_rows(stream, fmt):
+    """Rows (dicts) of an uploaded file. CSV is read incrementally from the stream;
+    JSON must be a list of objects."""
+    if fmt == 'csv':
+        reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+        try:
+            if reader.fieldnames is None: # Empty file
+                return iter(())
+        except (csv.Error, UnicodeDecodeError) as e:
+            raise BulkImportError(f"Invalid CSV: {e}") from None
+        return reader
+    try:
+        rows = json.load(stream)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise BulkImportError(f"Invalid JSON: {e}") from None
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        raise BulkImportError("JSON imports must be a list of objects")
+    return iter(rows)
+
+# --- IMPORT ---
+def import_rows(entity, rows):
+    """Validate every row, then insert the new ones in one transaction.
+
+    Rows whose key already exists (in the database or earlier in the file) are
+    skipped, so re-importing a file is harmless. Returns (summary, errors); when
+    there are errors nothing is written.
+    """
+    model, columns, key = ENTITIES[entity]
+    valid, errors = [], []
+    try:
+        for number, row in enumerate(rows, start=1):
+            try:
+                valid.append(clean_row(entity, row))
+            except ValueError as e:
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({"row": number, "error": str(e)})
+                else:
+                    errors.append({"row": number, "error": "Too many errors, stopped checking here"})
+                    break
+    except (csv.Error, UnicodeDecodeError) as e:
+        raise BulkImportError(f"Invalid CSV: {e}") from None
+    if errors:
+        return None, errors
+
+    if entity == 'faculty_subjects':
+        return import_assignments(valid)
+    if entity == 'batch_subjects':
+        return import_enrolments(valid)
+
+    if key is None:
+        new_rows = valid
+    else:
+        seen = {value for value, in db.session.query(getattr(model, key))}
+        new_rows = []
+        for values in valid:
+            if values[key] not in seen:
+                seen.add(values[key])
+                new_rows.append(values)
+    if new_rows:
+        db.session.execute(insert(model), new_rows)
+        bump_versions(db.session.connection(), [model.__tablename__])
+    db.session.commit()
+    return {"received": len(valid), "inserted": len(new_rows), "skipped": len(valid) - len(new_rows)}, []
+
+def import_assignments(rows):
+    """faculty_subjects rows: unknown subjects are errors, unknown faculty are created
+    and existing links are skipped."""
+    subject_ids = dict(db.session.query(Subject.code, Subject.id))
+    errors = [{"row": number, "error": f"Unknown subject '{values['subject']}'"}
+              for number, values in enumerate(rows, start=1) if values['subject'] not in subject_ids]
+    if errors:
+        return None, errors[:MAX_REPORTED_ERRORS]
+
+    faculty_ids = {}
+    ambiguous = set()
+    for faculty_id, name in db.session.query(Faculty.id, Faculty.name).order_by(Faculty.id):
+        if name in faculty_ids:
+            ambiguous.add(name)
+        faculty_ids.setdefault(name, faculty_id)
+    errors = [{"row": number, "error": f"More than one faculty member is called '{values['faculty']}'"}
+              for number, values in enumerate(rows, start=1) if values['faculty'] in ambiguous]
+    if errors:
+        return None, errors[:MAX_REPORTED_ERRORS]
+
+    new_faculty = sorted({values['faculty'] for values in rows} - faculty_ids.keys())
+    if new_faculty:
+        db.session.execute(insert(Faculty), [{"name": name} for name in new_faculty])
+        faculty_ids.update(db.session.query(Faculty.name, Faculty.id).filter(Faculty.name.in_(new_faculty)))
+
+    links = faculty_subject_association.c
+    existing = set(db.session.query(links.faculty_id, links.subject_id))
+    new_links = []
+    for values in rows:
+        link = (faculty_ids[values['faculty']], subject_ids[values['subject']])
+        if link not in existing:
+            existing.add(link)
+            new_links.append({"faculty_id": link[0], "subject_id": link[1]})
+    if new_links:
+        db.session.execute(faculty_subject_association.insert(), new_links)
+    if new_faculty or new_links:
+        bump_versions(db.session.connection(), [Faculty.__tablename__, faculty_subject_association.name])
+    db.session.commit()
+    return {"received": len(rows), "inserted": len(new_links), "skipped": len(rows) - len(new_links),
+            "faculty_created": len(new_faculty)}, []
+
+def import_enrolments(rows):
+    """batch_subjects rows: unknown batches or subjects are errors and existing enrolments are skipped."""
+    subject_ids = dict(db.session.query(Subject.code, Subject.id))
+    batch_ids = dict(db.session.query(Batch.name, Batch.id))
+    errors = []
+    for number, values in enumerate(rows, start=1):
+        if values['batch'] not in batch_ids:
+            errors.append({"row": number, "error": f"Unknown batch '{values['batch']}'"})
+        elif values['subject'] not in subject_ids:
+            errors.append({"row": number, "error": f"Unknown subject '{values['subject']}'"})
+    if errors:
+        return None, errors[:MAX_REPORTED_ERRORS]
+
+    links = batch_subject_association.c
+    existing = set(db.session.query(links.batch_id, links.subject_id))
+    new_links = []
+    for values in rows:
+        link = (batch_ids[values['batch']], subject_ids[values['subject']])
+        if link not in existing:
+            existing.add(link)
+            new_links.append({"batch_id": link[0], "subject_id": link[1]})
+    if new_links:
+        db.session.execute(batch_subject_association.insert(), new_links)
+        bump_versions(db.session.connection(), [Batch.__tablename__, batch_subject_association.name])
+    db.session.commit()
+    return {"received": len(rows), "inserted": len(new_links), "skipped": len(rows) - len(new_links)}, []
+
+# --- EXPORT ---
+def export_query(entity):
+    model, columns, _ = ENTITIES[entity]
+    if entity == 'faculty_subjects':
+        links = faculty_subject_association.c
+        return (db.session.query(Faculty.name, Subject.code)
+                .select_from(faculty_subject_association)
+                .join(Faculty, Faculty.id == links.faculty_id)
+                .join(Subject, Subject.id == links.subject_id)
+                .order_by(links.faculty_id, links.subject_id))
+    if entity == 'batch_subjects':
+        links = batch_subject_association.c
+        return (db.session.query(Batch.name, Subject.code)
+                .select_from(batch_subject_association)
+                .join(Batch, Batch.id == links.batch_id)
+                .join(Subject, Subject.id == links.subject_id)
+                .order_by(links.batch_id, links.subject_id))
+    return db.session.query(*(getattr(model, column) for column in columns)).order_by(model.id)
+
+def export_rows(entity, fmt):
+    """The entity's rows as a stream of CSV or JSON text chunks, in the import format,
+    fetched EXPORT_CHUNK_ROWS at a time instead of all at once."""
+    columns = ENTITIES[entity][1]
+    rows = export_query(entity).yield_per(EXPORT_CHUNK_ROWS)
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        for number, row in enumerate(rows, start=1):
+            writer.writerow(row)
+            if number % EXPORT_CHUNK_ROWS == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+        return
+
+    yield '['
+    chunk = []
+    for number, row in enumerate(rows):
+        chunk.append((',' if number else '') + json.dumps(dict(zip(columns, row))))
+        if len(chunk) == EXPORT_CHUNK_ROWS:
+            yield ''.join(chunk)
+            chunk = []
+    yield ''.join(chunk) + ']'
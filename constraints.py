@@ -0,0 +1,218 @@
+# constraints.py
+# Registry of the rules a timetable is scored on, with their default weights.
+#
+# Every rule declares which gene fields it reads. Rules that score one class on its
+# own (unavailability, preferred rooms, room capacity, ...) only supply a cost
+# table over those fields. Encoding sums all of them into at most six fused lookup
+# tables, so Occupancy, the numpy evaluator and CP-SAT do a fixed number of lookups
+# per class however many of these rules are registered. Rules about how classes
+# interact (clashes, consecutive classes, gaps, daily load) are evaluated by the
+# count-based kernels in Occupancy; the registry gives them a name and a weight.
+
+# Every hard clash (teacher, room or batch double-booked) costs this much by default.
+HARD_CONSTRAINT_PENALTY = 10
+
+# Gene fields a rule can read: the session's own batch and subject (fixed per
+# session), and the slot (day * len(timeslots) + timeslot), room and faculty chosen for it
+SESSION_FIELDS = ('batch', 'subject')
+RESOURCE_FIELDS = ('slot', 'room', 'faculty')
+FIELDS = SESSION_FIELDS + RESOURCE_FIELDS
+
+class Constraint:
+    """A named scheduling rule. Subclass, fill in the attributes and @register it.
+
+    weight is the default cost of one violation; the input's "constraint_weights"
+    (stored per institution in the ConstraintWeight table) overrides it, and 0
+    switches the rule off. hard only marks rules that should never be traded away.
+    """
+    name = None
+    description = ''
+    hard = False
+    weight = 1
+    fields = ()
+
+    def table(self, encoding):
+        """Unary rules: the cost of every combination of `fields`, as nested lists indexed
+        by their ids in that order (e.g. table[faculty][slot]), or None when this input
+        gives the rule nothing to check. Rules evaluated by Occupancy's kernels keep None.
+        """
+        return None
+
+CONSTRAINTS = {}
+
+def register(cls):
+    """Class decorator adding a Constraint to the registry."""
+    if cls.name in CONSTRAINTS:
+        raise ValueError(f"Constraint '{cls.name}' is already registered.")
+    fields = cls.fields
+    if (len(fields) not in (1, 2) or any(field not in FIELDS for field in fields)
+            or not any(field in RESOURCE_FIELDS for field in fields)
+            or sum(field in SESSION_FIELDS for field in fields) > 1):
+        raise ValueError(f"Constraint '{cls.name}' must read one or two fields, at least one of "
+                         f"{', '.join(RESOURCE_FIELDS)} and at most one of {', '.join(SESSION_FIELDS)}.")
+    CONSTRAINTS[cls.name] = cls()
+    return cls
+
+def constraint_weights(overrides=None):
+    """Every registered rule's weight, with overrides (name -> weight) applied; unknown names are ignored."""
+    overrides = overrides or {}
+    return {name: int(overrides.get(name, constraint.weight)) for name, constraint in CONSTRAINTS.items()}
+
+# Positions in the (slot, room, faculty, session index) tuple Occupancy looks costs up with
+VALUE_INDEX = {'slot': 0, 'room': 1, 'faculty': 2, 'session': 3}
+# Orientation of the fused resource-pair tables
+PAIR_ORDER = ('room', 'faculty', 'slot')
+
+def transpose(table):
+    return [list(column) for column in zip(*table)]
+
+def fuse_unary_costs(encoding, weights):
+    """Sum every active unary rule's weighted table into at most six lookup tables.
+
+    Returns a list of (a, b, table) with cost = table[value[a]][value[b]], value being
+    (slot, room, faculty, session index); see VALUE_INDEX. Rules reading a batch or
+    subject become per-session rows (shared between the sessions of one batch and
+    subject); rules reading two resources are summed per resource pair.
+    """
+    session_rows = {} # resource -> {(batch, subject): summed row}
+    pairs = {}        # (resource, resource) in PAIR_ORDER -> summed table
+    sizes = {'slot': encoding.n_slots, 'room': len(encoding.rooms), 'faculty': len(encoding.faculty)}
+    kinds = sorted(set(zip(encoding.session_batch, encoding.session_subject)))
+
+    for name, constraint in CONSTRAINTS.items():
+        weight = weights.get(name, 0)
+        table = constraint.table(encoding) if weight else None
+        if table is None:
+            continue
+        fields = constraint.fields
+        resources = [field for field in fields if field in RESOURCE_FIELDS]
+        if len(resources) == 2:
+            if PAIR_ORDER.index(fields[0]) > PAIR_ORDER.index(fields[1]):
+                table, fields = transpose(table), fields[::-1]
+            summed = pairs.setdefault(fields, [[0] * sizes[fields[1]] for _ in range(sizes[fields[0]])])
+            for row, costs in zip(summed, table):
+                for k, cost in enumerate(costs):
+                    row[k] += weight * cost
+            continue
+
+        resource = resources[0]
+        if len(fields) == 2 and fields[0] == resource: # Make the session field come first
+            table, fields = transpose(table), fields[::-1]
+        rows = session_rows.setdefault(resource, {kind: [0] * sizes[resource] for kind in kinds})
+        for (batch, subject), row in rows.items():
+            if len(fields) == 1:
+                costs = table
+            else:
+                costs = table[batch if fields[0] == 'batch' else subject]
+            for k, cost in enumerate(costs):
+                row[k] += weight * cost
+
+    fused = []
+    for resource, rows in session_rows.items():
+        per_session = [rows[kind] for kind in zip(encoding.session_batch, encoding.session_subject)]
+        fused.append((VALUE_INDEX['session'], VALUE_INDEX[resource], per_session))
+    for (first, second), table in pairs.items():
+        fused.append((VALUE_INDEX[first], VALUE_INDEX[second], table))
+    return fused
+
+# --- BUILT-IN RULES EVALUATED BY OCCUPANCY ---
+@register
+class TeacherClash(Constraint):
+    name = 'teacher_clash'
+    description = 'A faculty member has two classes in the same slot.'
+    hard = True
+    weight = HARD_CONSTRAINT_PENALTY
+    fields = ('faculty', 'slot')
+
+@register
+class RoomClash(Constraint):
+    name = 'room_clash'
+    description = 'A room holds two classes in the same slot.'
+    hard = True
+    weight = HARD_CONSTRAINT_PENALTY
+    fields = ('room', 'slot')
+
+@register
+class BatchClash(Constraint):
+    name = 'batch_clash'
+    description = 'A batch has two classes in the same slot.'
+    hard = True
+    weight = HARD_CONSTRAINT_PENALTY
+    fields = ('batch', 'slot')
+
+@register
+class Consecutive(Constraint):
+    name = 'consecutive'
+    description = "A class extends a batch's run of back-to-back classes beyond 2."
+    fields = ('batch', 'slot')
+
+@register
+class Gaps(Constraint):
+    name = 'gaps'
+    description = "A free timeslot between a batch's first and last class of a day."
+    weight = 0
+    fields = ('batch', 'slot')
+
+@register
+class FacultyOverload(Constraint):
+    name = 'faculty_overload'
+    description = "An hour a faculty member teaches beyond their max_hours_per_day."
+    fields = ('faculty', 'slot')
+
+# --- BUILT-IN UNARY RULES ---
+@register
+class RoomCapacity(Constraint):
+    name = 'room_capacity'
+    description = 'A class is held in a room smaller than its batch (room_capacity / batch_size).'
+    fields = ('batch', 'room')
+
+    def table(self, encoding):
+        everywhere = (1 << len(encoding.rooms)) - 1
+        if all(mask == everywhere for mask in encoding.room_fits):
+            return None
+        return [[0 if mask >> r & 1 else 1 for r in range(len(encoding.rooms))] for mask in encoding.room_fits]
+
+@register
+class FacultyUnavailable(Constraint):
+    name = 'faculty_unavailable'
+    description = "A faculty member teaches in a slot listed in their 'unavailable' times."
+    hard = True
+    weight = HARD_CONSTRAINT_PENALTY
+    fields = ('faculty', 'slot')
+
+    def table(self, encoding):
+        return unavailability_table(encoding, encoding.faculty_available)
+
+@register
+class RoomUnavailable(Constraint):
+    name = 'room_unavailable'
+    description = "A class is held in a room at a time listed in its room_unavailable times."
+    hard = True
+    weight = HARD_CONSTRAINT_PENALTY
+    fields = ('room', 'slot')
+
+    def table(self, encoding):
+        return unavailability_table(encoding, encoding.room_available)
+
+def unavailability_table(encoding, available):
+    """table[resource][slot] = 1 where the resource's availability bitset (see Encoding) lacks the slot."""
+    if all(mask == encoding.all_slots for mask in available):
+        return None
+    return [[0 if mask >> slot & 1 else 1 for slot in range(encoding.n_slots)] for mask in available]
+
+@register
+class PreferredRooms(Constraint):
+    name = 'preferred_rooms'
+    description = "A class is held outside its subject's preferred_rooms."
+    fields = ('subject', 'room')
+
+    def table(self, encoding):
+        table = None
+        for s, code in enumerate(encoding.subjects):
+            preferred = encoding.config['subjects'][code].get('preferred_rooms')
+            if not preferred:
+                continue
+            if table is None:
+                table = [[0] * len(encoding.rooms) for _ in encoding.subjects]
+            table[s] = [0 if room in preferred else 1 for room in encoding.rooms]
+        return table
@@ -0,0 +1,238 @@
+# cpsat_backend.py
+# Exact scheduler backend on OR-Tools CP-SAT (backend='cpsat' in run_scheduler).
+import threading
+import time
+from array import array
+
+try:
+    from ortools.sat.python import cp_model
+except ImportError: # OR-Tools is optional; run_scheduler falls back to the GA without it
+    cp_model = None
+
+from constraints import VALUE_INDEX
+from scheduler_v2 import Timetable
+
+# --- CONFIGURATION ---
+CPSAT_TIME_LIMIT = 30.0 # seconds
+CPSAT_WORKERS = 8       # CP-SAT search threads
+STOP_POLL_INTERVAL = 0.1 # seconds between should_stop checks while CP-SAT searches
+
+def available():
+    return cp_model is not None
+
+def solve_cpsat(encoding, time_limit=CPSAT_TIME_LIMIT, workers=CPSAT_WORKERS, should_stop=None, seed=None):
+    """Solve the timetable exactly. Returns (Timetable or None, status name).
+
+    Models the same rules as Occupancy: a faculty member, a batch and a room hold at
+    most one session per slot (always as hard constraints, whatever their weights),
+    and every other weighted rule of the Encoding is minimized. With the hard rules
+    enforced, the consecutive-class penalty is one per three occupied back-to-back
+    slots of a batch on a day (not spanning a break).
+
+    Rooms are not variables: the room rule reduces to "at most len(rooms) sessions per
+    slot" (only the rooms available in the slot while room_unavailable is on), and room capacity to "per slot and batch size, no more sessions of batches
+    that large than rooms that fit them" (the excess is the capacity penalty). After
+    solving, each slot's sessions get the cheapest distinct rooms under the unary
+    room rules (capacity, preferred rooms, ...).
+
+    Status is 'OPTIMAL' or 'FEASIBLE' with a timetable; 'INFEASIBLE' (proven: no
+    clash-free timetable exists) or 'UNKNOWN' (time ran out, or stopped) without one.
+    time_limit covers building the model as well as searching, and should_stop is
+    polled throughout the search, not only when a solution is found.
+    """
+    if cp_model is None:
+        return None, 'UNAVAILABLE'
+    started = time.monotonic()
+
+    n = len(encoding)
+    n_slots = encoding.n_slots
+    n_timeslots = len(encoding.timeslots)
+    model = cp_model.CpModel()
+
+    # x[i][(slot, faculty)]: session i is taught by faculty in slot
+    x = []
+    by_teacher_slot, by_batch_slot, by_slot = {}, {}, {}
+    for i in range(n):
+        choices = {}
+        batch = encoding.session_batch[i]
+        for slot in range(n_slots):
+            for f in encoding.session_faculty_options[i]:
+                var = model.NewBoolVar(f"x{i}_{slot}_{f}")
+                choices[(slot, f)] = var
+                by_teacher_slot.setdefault((f, slot), []).append(var)
+                by_batch_slot.setdefault((batch, slot), []).append(var)
+                by_slot.setdefault(slot, []).append(var)
+        model.AddExactlyOne(choices.values())
+        x.append(choices)
+
+    # Unary rules that don't depend on the room are a cost on each (session, slot, faculty) choice
+    penalties = []
+    room = VALUE_INDEX['room']
+    placement_tables = [(a, b, table) for a, b, table in encoding.unary_costs if room not in (a, b)]
+    if placement_tables:
+        for i, choices in enumerate(x):
+            for (slot, f), var in choices.items():
+                values = (slot, None, f, i)
+                cost = sum(table[values[a]][values[b]] for a, b, table in placement_tables)
+                if cost:
+                    penalties.append(cost * var)
+
+    # --- HARD CONSTRAINTS ---
+    for group in by_teacher_slot.values():
+        model.AddAtMostOne(group)
+    for group in by_batch_slot.values():
+        model.AddAtMostOne(group)
+    rooms_per_slot = [len(encoding.rooms)] * n_slots
+    if encoding.weights['room_unavailable']:
+        rooms_per_slot = [bin(mask).count('1') for mask in encoding.slot_rooms]
+    for slot, group in by_slot.items():
+        model.Add(sum(group) <= rooms_per_slot[slot])
+
+    # Identical sessions (same batch and subject) are interchangeable: fix their order
+    slot_of = [sum(slot * var for (slot, _), var in choices.items()) for choices in x]
+    for i in range(1, n):
+        if (encoding.session_batch[i] == encoding.session_batch[i - 1]
+                and encoding.session_subject[i] == encoding.session_subject[i - 1]):
+            model.Add(slot_of[i - 1] < slot_of[i])
+
+    # --- SOFT CONSTRAINTS (weighted like Occupancy) ---
+    run_starts = encoding.run_starts
+    for batch in range(len(encoding.batches)):
+        for day in range(len(encoding.days)):
+            occupied = [sum(by_batch_slot.get((batch, day * n_timeslots + t), [])) for t in range(n_timeslots)]
+            # More than 2 consecutive classes
+            if encoding.consecutive_weight:
+                for t in range(2, n_timeslots):
+                    if run_starts[t - 1] or run_starts[t]:
+                        continue
+                    p = model.NewBoolVar(f"p{batch}_{day}_{t}")
+                    model.Add(occupied[t - 2] + occupied[t - 1] + occupied[t] - 2 <= p)
+                    penalties.append(encoding.consecutive_weight * p)
+            # Free timeslots between the first and last class
+            if encoding.gap_weight and n_timeslots > 2:
+                occ = [model.NewBoolVar(f"o{batch}_{day}_{t}") for t in range(n_timeslots)]
+                for var, expr in zip(occ, occupied):
+                    model.Add(var == expr)
+                for t in range(1, n_timeslots - 1):
+                    before = model.NewBoolVar(f"before{batch}_{day}_{t}")
+                    after = model.NewBoolVar(f"after{batch}_{day}_{t}")
+                    model.AddMaxEquality(before, occ[:t])
+                    model.AddMaxEquality(after, occ[t + 1:])
+                    gap = model.NewBoolVar(f"g{batch}_{day}_{t}")
+                    model.Add(before + after - occ[t] - 1 <= gap)
+                    penalties.append(encoding.gap_weight * gap)
+
+    # Hours a teacher teaches beyond their daily limit
+    if encoding.overload_weight:
+        for f, limit in enumerate(encoding.faculty_max_hours):
+            if not limit:
+                continue
+            for day in range(len(encoding.days)):
+                hours = sum(sum(by_teacher_slot.get((f, day * n_timeslots + t), [])) for t in range(n_timeslots))
+                over = model.NewIntVar(0, n_timeslots, f"over{f}_{day}")
+                model.Add(hours - limit <= over)
+                penalties.append(encoding.overload_weight * over)
+
+    # Classes that can't get a room big enough: rooms fitting a batch of size L are exactly
+    # those with capacity >= L, so per slot the fewest misfits is the largest excess over the sizes
+    room_capacity, batch_size = room_sizes(encoding)
+    sizes = sorted({size for size in batch_size if size > min(room_capacity)})
+    capacity_weight = encoding.weights['room_capacity']
+    if capacity_weight and sizes:
+        for slot in range(n_slots):
+            misfits = model.NewIntVar(0, n, f"misfit{slot}")
+            for size in sizes:
+                demand = sum(var for batch in range(len(encoding.batches)) if batch_size[batch] >= size
+                             for var in by_batch_slot.get((batch, slot), []))
+                supply = sum(1 for capacity in room_capacity if capacity >= size)
+                model.Add(demand - supply <= misfits)
+            penalties.append(capacity_weight * misfits)
+
+    model.Minimize(sum(penalties))
+
+    # Whatever building the model used comes out of the search's budget
+    if time_limit is not None:
+        time_limit -= time.monotonic() - started
+        if time_limit <= 0:
+            return None, 'UNKNOWN'
+    if should_stop is not None and should_stop():
+        return None, 'UNKNOWN'
+    solver = cp_model.CpSolver()
+    if time_limit is not None:
+        solver.parameters.max_time_in_seconds = time_limit
+    solver.parameters.num_search_workers = workers
+    if seed is not None:
+        solver.parameters.random_seed = seed % 2**31
+    status = solve_until_stopped(solver, model, should_stop)
+    status_name = solver.StatusName(status)
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return None, status_name
+
+    slots, rooms, faculty = array('i', [0] * n), array('i', [0] * n), array('i', [0] * n)
+    sessions_in_slot = [[] for _ in range(n_slots)]
+    for i, choices in enumerate(x):
+        for (slot, f), var in choices.items():
+            if solver.BooleanValue(var):
+                slots[i], faculty[i] = slot, f
+                sessions_in_slot[slot].append(i)
+                break
+    room_tables = [(a, b, table) for a, b, table in encoding.unary_costs if room in (a, b)]
+    for slot, sessions in enumerate(sessions_in_slot):
+        for i, r in zip(sessions, assign_rooms(encoding, sessions, slot, faculty, room_tables)):
+            rooms[i] = r
+    return Timetable(encoding, slots, rooms, faculty), status_name
+
+def solve_until_stopped(solver, model, should_stop=None):
+    """solver.Solve(model), with a watcher thread calling StopSearch once should_stop()
+    is true, so a cancel takes effect even while no new solution turns up."""
+    if should_stop is None:
+        return solver.Solve(model)
+    finished = threading.Event()
+
+    def watch():
+        while not finished.wait(STOP_POLL_INTERVAL):
+            if should_stop():
+                solver.StopSearch()
+                return
+
+    watcher = threading.Thread(target=watch, daemon=True)
+    watcher.start()
+    try:
+        return solver.Solve(model)
+    finally:
+        finished.set()
+        watcher.join()
+
+def assign_rooms(encoding, sessions, slot, faculty, room_tables):
+    """Distinct rooms for the sessions sharing one slot, cheapest under the room-dependent unary rules."""
+    n_rooms = len(encoding.rooms)
+    costs = []
+    for i in sessions:
+        row = []
+        for r in range(n_rooms):
+            values = (slot, r, faculty[i], i)
+            row.append(sum(table[values[a]][values[b]] for a, b, table in room_tables))
+        costs.append(row)
+    if not any(any(row) for row in costs):
+        return list(range(len(sessions)))
+
+    # A small assignment problem per slot
+    model = cp_model.CpModel()
+    y = [[model.NewBoolVar(f"y{k}_{r}") for r in range(n_rooms)] for k in range(len(sessions))]
+    for row in y:
+        model.AddExactlyOne(row)
+    for r in range(n_rooms):
+        model.AddAtMostOne(row[r] for row in y)
+    model.Minimize(sum(cost * var for cost_row, row in zip(costs, y) for cost, var in zip(cost_row, row) if cost))
+    solver = cp_model.CpSolver()
+    solver.parameters.num_search_workers = 1
+    solver.Solve(model)
+    return [next(r for r in range(n_rooms) if solver.BooleanValue(row[r])) for row in y]
+
+def room_sizes(encoding):
+    """Room capacities and batch sizes by id; a room without a capacity fits any batch."""
+    capacity = encoding.config.get('room_capacity', {})
+    batch_size = encoding.config.get('batch_size', {})
+    unlimited = float('inf')
+    return ([capacity.get(room) or unlimited for room in encoding.rooms],
+            [batch_size.get(batch) or 0 for batch in encoding.batches])
@@ -1,7 +1,9 @@
 # database_setup.py
 import os
 from app import app, db
-from models import User
+from database import create_missing_columns, create_missing_indexes
+from models import User, Day, Timeslot
+from snapshot import DEFAULT_DAYS, DEFAULT_TIMESLOTS
 from werkzeug.security import generate_password_hash
 
 def create_database():
@@ -21,6 +23,11 @@ def create_database():
         print("Creating database tables...")
         db.create_all()
         print("Tables created.")
+        # Databases created by an older version get the columns and indexes added since
+        for name in create_missing_columns(db):
+            print(f"Added column {name}.")
+        for name in create_missing_indexes(db):
+            print(f"Created index {name}.")
 
         # Check if the admin user already exists to avoid duplicates
         if not User.query.filter_by(username='admin').first():
@@ -36,6 +43,13 @@ def create_database():
         else:
             print("Admin user already exists.")
 
+        # Store the default time grid so it can be edited on the 'Manage Data' page
+        for model, names in ((Day, DEFAULT_DAYS), (Timeslot, DEFAULT_TIMESLOTS)):
+            if not model.query.first():
+                db.session.add_all(model(name=name, position=position) for position, name in enumerate(names, start=1))
+                db.session.commit()
+                print(f"Created the default {model.__tablename__}s.")
+
 if __name__ == '__main__':
     # This block allows you to run 'python database_setup.py' from the terminal
     create_database()
\ No newline at end of file
@@ -0,0 +1,125 @@
+# islands.py
+# Island-model GA: subpopulations evolve in separate processes and periodically
+# send their elite timetables to the next island in a ring.
+import logging
+import multiprocessing as mp
+import queue
+import random
+import time
+from array import array
+
+from metrics import new_run_stats, merge_stats
+from scheduler_v2 import GeneticAlgorithm, Timetable, evolve
+
+logger = logging.getLogger(__name__)
+
+def pack(timetable):
+    """Compact, picklable form of a chromosome for sending between processes."""
+    return timetable.slots.tobytes(), timetable.rooms.tobytes(), timetable.faculty.tobytes()
+
+def unpack(encoding, packed, track=True):
+    columns = []
+    for data in packed:
+        column = array('i')
+        column.frombytes(data)
+        columns.append(column)
+    return Timetable(encoding, *columns, track=track)
+
+def island_worker(index, encoding, seed, inbox, outbox, results, stop, settings):
+    # Migrants still in flight when a neighbour has already finished may be dropped
+    outbox.cancel_join_thread()
+    migration_interval = settings['migration_interval']
+    migrants = settings['migrants']
+
+    ga = GeneticAlgorithm(encoding, settings['population_size'], settings['mutation_rate'], settings['engine'],
+                          settings['previous'], settings['init'], random.Random(seed), settings['adaptive'])
+    last_report = {'fitness': None, 'time': 0.0}
+
+    def on_generation(ga):
+        if stop.is_set():
+            return True
+        # Progress shares the results queue; only report improvements or every half second
+        now = time.monotonic()
+        if ga.best.fitness != last_report['fitness'] or now - last_report['time'] >= 0.5:
+            results.put(('progress', index, ga.generation, ga.best.fitness))
+            last_report.update(fitness=ga.best.fitness, time=now)
+        if ga.generation and ga.generation % migration_interval == 0:
+            outbox.put([pack(t) for t in ga.elites(migrants)])
+            arrivals = []
+            while True:
+                try:
+                    arrivals.extend(inbox.get_nowait())
+                except queue.Empty:
+                    break
+            ga.immigrate([unpack(encoding, packed, ga.track) for packed in arrivals])
+        return False
+
+    logger.debug("Island %d started", index + 1)
+    best = evolve(ga, settings['max_generations'], settings['stagnation_limit'], settings['time_limit'], on_generation,
+                  settings['min_improvement'])
+    if best.fitness == 0:
+        stop.set() # A perfect timetable ends the search on every island
+    results.put(('progress', index, ga.generation, best.fitness))
+    results.put(('result', index, best.fitness, pack(best), ga.stats))
+
+def run_islands(encoding, islands, migration_interval, migrants, engine='incremental', time_limit=None,
+                population_size=None, max_generations=None, mutation_rate=None, stagnation_limit=None,
+                min_improvement=None, adaptive=True, previous=None, init='heuristic', rng=random, on_progress=None, should_stop=None):
+    """Evolve `islands` populations in parallel processes and return the best timetable of any island.
+
+    Each island gets its own random.Random, seeded from rng. The returned timetable's
+    .stats add up the work of every island that reported back.
+
+    on_progress(generation, best_fitness) receives the furthest generation and best
+    fitness across islands; should_stop() is polled to stop every island early.
+    """
+    settings = {
+        'migration_interval': max(1, migration_interval), 'migrants': migrants, 'engine': engine,
+        'time_limit': time_limit, 'population_size': population_size, 'max_generations': max_generations,
+        'mutation_rate': mutation_rate, 'stagnation_limit': stagnation_limit, 'previous': previous,
+        'init': init, 'min_improvement': min_improvement, 'adaptive': adaptive,
+    }
+    inboxes = [mp.Queue() for _ in range(islands)]
+    results = mp.Queue()
+    stop = mp.Event()
+    processes = [
+        mp.Process(
+            target=island_worker,
+            args=(i, encoding, rng.randrange(2**32), inboxes[i], inboxes[(i + 1) % islands], results, stop, settings),
+            daemon=True
+        )
+        for i in range(islands)
+    ]
+    for process in processes:
+        process.start()
+
+    # Collect one result per island; give up on islands that died without reporting
+    collected = []
+    progress = {}
+    while len(collected) < islands:
+        if should_stop is not None and should_stop():
+            stop.set()
+        try:
+            message = results.get(timeout=0.5)
+        except queue.Empty:
+            if not any(process.is_alive() for process in processes):
+                break
+            continue
+        if message[0] == 'result':
+            collected.append(message[1:])
+        elif on_progress is not None:
+            _, index, generation, fitness = message
+            progress[index] = (generation, fitness)
+            on_progress(max(g for g, _ in progress.values()), min(f for _, f in progress.values()))
+    stop.set()
+    for process in processes:
+        process.join(timeout=5)
+
+    if not collected:
+        raise RuntimeError("All scheduler islands exited without a result.")
+    _, _, packed, _ = min(collected, key=lambda result: result[1])
+    best = unpack(encoding, packed)
+    best.stats = new_run_stats()
+    for result in collected:
+        merge_stats(best.stats, result[3])
+    return best
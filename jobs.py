@@ -0,0 +1,138 @@
+# jobs.py
+# Background scheduler jobs: run off the request thread, report progress, can be cancelled.
+import json
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+class Job:
+    """State of one background generation, shared between its worker thread and HTTP readers."""
+    def __init__(self, runs, grid=None):
+        self.id = uuid.uuid4().hex
+        self.status = 'queued' # queued -> running -> done | failed | cancelled
+        self.created_at = time.time()
+        self.runs = runs
+        self.run_progress = {} # run index -> (generation, best fitness)
+        self.results = None
+        self.grid = grid # The days and timeslots the results are laid out on
+        self.message = None
+        self.profile = None # cProfile report text, for jobs started with profiling on
+        self.version = 0 # Bumped on every change so streams know when to send an event
+        self._cancel_requested = threading.Event()
+        self._changed = threading.Condition()
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed', 'cancelled')
+
+    @property
+    def cancel_requested(self):
+        return self._cancel_requested.is_set()
+
+    def cancel(self):
+        self._cancel_requested.set()
+        if self.status == 'queued':
+            self.update(status='cancelled')
+
+    def update(self, **fields):
+        with self._changed:
+            for name, value in fields.items():
+                setattr(self, name, value)
+            self.version += 1
+            self._changed.notify_all()
+
+    def report_progress(self, run_index, generation, best_fitness):
+        with self._changed:
+            self.run_progress[run_index] = (generation, best_fitness)
+            self.version += 1
+            self._changed.notify_all()
+
+    def wait_for_change(self, seen_version, timeout):
+        with self._changed:
+            self._changed.wait_for(lambda: self.version != seen_version, timeout=timeout)
+            return self.version
+
+    def to_dict(self):
+        with self._changed:
+            progress = list(self.run_progress.values())
+            data = {
+                "id": self.id,
+                "status": self.status,
+                "runs": self.runs,
+                "runs_started": len(progress),
+                "generation": max((g for g, _ in progress), default=0),
+                "best_fitness": min((f for _, f in progress), default=None),
+            }
+            if self.message:
+                data["message"] = self.message
+            if self.results is not None:
+                data["results"] = self.results
+                if self.grid is not None:
+                    data["grid"] = self.grid
+            return data
+
+    def events(self, heartbeat=15):
+        """Server-Sent Events: a 'progress' event per change, then one final 'done' event."""
+        version = -1
+        while True:
+            new_version = self.wait_for_change(version, timeout=heartbeat)
+            if new_version == version:
+                yield ": keep-alive\n\n"
+                continue
+            version = new_version
+            state = self.to_dict()
+            state.pop("results", None) # Fetched once from GET /api/jobs/<id> when finished
+            state.pop("grid", None)
+            if self.finished:
+                yield f"event: done\ndata: {json.dumps(state)}\n\n"
+                return
+            yield f"event: progress\ndata: {json.dumps(state)}\n\n"
+
+class JobManager:
+    """Runs jobs on a small thread pool so Flask workers stay free; keeps the latest ones in memory."""
+    def __init__(self, max_workers=2, keep=50):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='scheduler-job')
+        self.keep = keep
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def submit(self, target, runs, grid=None):
+        """Queue target(job), which returns the job's results; returns the Job immediately."""
+        job = self._add(Job(runs, grid))
+        self.executor.submit(self._run, job, target)
+        return job
+
+    def add_done(self, results, runs, grid=None):
+        """A job that already has its results (a stored run), done without waiting for a worker."""
+        job = Job(runs, grid)
+        job.status = 'done'
+        job.results = results
+        return self._add(job)
+
+    def _add(self, job):
+        with self.lock:
+            self.jobs[job.id] = job
+            finished = [j for j in self.jobs.values() if j.finished]
+            for old in sorted(finished, key=lambda j: j.created_at)[:max(0, len(self.jobs) - self.keep)]:
+                del self.jobs[old.id]
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def _run(self, job, target):
+        if job.cancel_requested:
+            return
+        job.update(status='running')
+        try:
+            results = target(job)
+        except Exception as e:
+            logger.exception("Error during job %s", job.id)
+            job.update(status='failed', message=str(e))
+            return
+        job.update(status='cancelled' if job.cancel_requested else 'done', results=results)
@@ -0,0 +1,118 @@
+# local_search.py
+# Simulated-annealing / tabu refinement of a single timetable using the incremental
+# (Occupancy) fitness, so every move costs O(1) to evaluate and to undo.
+import logging
+import math
+import random
+import time
+
+from scheduler_v2 import available_faculty, available_rooms, conflicted_sessions, least_booked, random_slot
+
+# --- CONFIGURATION (defaults; overridable per refine() call) ---
+LOCAL_SEARCH_TIME_LIMIT = 5.0 # seconds
+INITIAL_TEMPERATURE = 2.0
+COOLING_RATE = 0.9995         # temperature multiplier per move
+MIN_TEMPERATURE = 0.05        # reheat to INITIAL_TEMPERATURE below this
+TABU_TENURE = 50              # moves during which a session may not return to a slot it just left
+CONFLICT_MOVE_PROBABILITY = 0.8 # how often a clashing session is moved rather than any session
+SWAP_PROBABILITY = 0.3        # share of moves that swap two sessions of a batch instead of relocating one
+
+logger = logging.getLogger(__name__)
+
+def relocate_move(timetable, index, rng=random):
+    """New (slot, room, faculty) for one session: a random slot one of its teachers is
+    available in, with its least-booked available room and teacher."""
+    encoding = timetable.encoding
+    occupancy = timetable.occupancy
+    options = encoding.session_faculty_options[index]
+    slot = random_slot(encoding, options, rng)
+    room = least_booked(occupancy.room_slots, available_rooms(encoding, slot, range(len(encoding.rooms))), slot, rng)
+    teacher = least_booked(occupancy.teacher_slots, available_faculty(encoding, slot, options), slot, rng)
+    return [(index, slot, room, teacher)]
+
+def swap_move(timetable, index, sessions_by_batch, rng=random):
+    """Exchange the slot and room of two sessions of the same batch (a two-session Kempe swap).
+
+    The batch's bookings are unchanged, so only teacher clashes and soft penalties move.
+    """
+    batch = timetable.encoding.session_batch[index]
+    other = rng.choice(sessions_by_batch[batch])
+    if other == index:
+        return None
+    return [(index, timetable.slots[other], timetable.rooms[other], timetable.faculty[index]),
+            (other, timetable.slots[index], timetable.rooms[index], timetable.faculty[other])]
+
+def refine(timetable, time_limit=LOCAL_SEARCH_TIME_LIMIT, max_iterations=None,
+           initial_temperature=INITIAL_TEMPERATURE, cooling_rate=COOLING_RATE, tabu_tenure=TABU_TENURE,
+           rng=random, on_progress=None, should_stop=None):
+    """Improve a timetable by annealing over relocate and swap moves; returns the best one seen.
+
+    Moves are conflict-directed: most of the time a session that currently clashes is
+    moved. A short tabu list stops a session from bouncing straight back to a slot it
+    just left (unless that would give a new best). The input timetable is not modified.
+    """
+    current = timetable.copy()
+    if current.occupancy is None: # Came from the batched (numpy) engine; track it from here on
+        current.calculate_fitness()
+        current.fitness = current.occupancy.fitness
+    best = current.copy()
+    n = len(current.slots)
+    if n == 0 or best.fitness == 0:
+        return best
+
+    sessions_by_batch = current.encoding.sessions_by_batch
+    started = time.monotonic()
+    temperature = initial_temperature
+    tabu = {} # (session, slot) -> iteration until which the move back is forbidden
+    conflicted = conflicted_sessions(current)
+    iteration = 0
+    while max_iterations is None or iteration < max_iterations:
+        iteration += 1
+        if iteration % 64 == 0:
+            if time_limit is not None and time.monotonic() - started >= time_limit:
+                break
+            if should_stop is not None and should_stop():
+                break
+        if iteration % 500 == 0 or not conflicted:
+            conflicted = conflicted_sessions(current)
+
+        if conflicted and rng.random() < CONFLICT_MOVE_PROBABILITY:
+            index = rng.choice(conflicted)
+        else:
+            index = rng.randrange(n)
+        if rng.random() < SWAP_PROBABILITY:
+            move = swap_move(current, index, sessions_by_batch, rng)
+        else:
+            move = relocate_move(current, index, rng)
+        if not move:
+            continue
+
+        before = current.fitness
+        undo = [(i, current.slots[i], current.rooms[i], current.faculty[i]) for i, _, _, _ in move]
+        for change in move:
+            current.assign(*change)
+        delta = current.fitness - before
+
+        is_tabu = any(tabu.get((i, slot), 0) > iteration for i, slot, _, _ in move)
+        new_best = current.fitness < best.fitness
+        if (is_tabu and not new_best) or (delta > 0 and rng.random() >= math.exp(-delta / temperature)):
+            for change in reversed(undo):
+                current.assign(*change)
+        else:
+            for i, old_slot, _, _ in undo:
+                tabu[(i, old_slot)] = iteration + tabu_tenure
+            if new_best:
+                best = current.copy()
+                if on_progress is not None:
+                    on_progress(best.fitness)
+                if best.fitness == 0:
+                    break
+
+        temperature *= cooling_rate
+        if temperature < MIN_TEMPERATURE:
+            temperature = initial_temperature
+        if len(tabu) > 20 * tabu_tenure:
+            tabu = {key: until for key, until in tabu.items() if until > iteration}
+
+    logger.debug("Local search: %d moves, fitness %s -> %s", iteration, timetable.fitness, best.fitness)
+    return best
@@ -0,0 +1,127 @@
+# metrics.py
+# In-process counters and timings, rendered in the Prometheus text format by /metrics,
+# plus the per-run statistics the scheduler collects and an optional cProfile capture.
+import cProfile
+import io
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+# --- SCHEDULER RUN STATISTICS ---
+# Seconds a run spends per stage. With the incremental engine a child's fitness is
+# updated inside crossover/mutation (only for the genes that change), so 'evaluation'
+# only covers the batched numpy evaluator.
+STAGES = ('init', 'selection', 'crossover', 'mutation', 'evaluation', 'local_search', 'cpsat')
+
+def new_run_stats():
+    """Empty statistics for one scheduler run (plain dicts, so they pickle across processes)."""
+    return {"stages": dict.fromkeys(STAGES, 0.0), "evaluations": 0, "generations": 0, "seconds": 0.0}
+
+def merge_stats(total, stats):
+    """Add stats into total (e.g. the GA's into its run's, or every island's)."""
+    for stage, seconds in stats["stages"].items():
+        total["stages"][stage] += seconds
+    for key in ("evaluations", "generations", "seconds"):
+        total[key] += stats[key]
+    return total
+
+# --- REGISTRY ---
+# name -> (type, help); counters only grow, summaries keep a count and a sum
+DEFINITIONS = {
+    'scheduler_runs_total': ('counter', 'Scheduler passes completed.'),
+    'scheduler_run_seconds': ('summary', 'Wall time of a scheduler pass.'),
+    'scheduler_stage_seconds_total': ('counter', 'Time spent in each scheduler stage.'),
+    'scheduler_evaluations_total': ('counter', 'Timetable fitness evaluations by the GA.'),
+    'scheduler_generations_total': ('counter', 'GA generations bred.'),
+    'http_request_duration_seconds': ('summary', 'Time to build each HTTP response.'),
+    'generate_phase_seconds': ('summary', 'Time a generation request spends loading data, solving and serializing.'),
+}
+
+class Registry:
+    """Thread-safe metric values keyed by name and label set."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {name: {} for name in DEFINITIONS}
+
+    def inc(self, name, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            series = self.values[name]
+            series[key] = series.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            count, total = self.values[name].get(key, (0, 0.0))
+            self.values[name][key] = (count + 1, total + value)
+
+    def render(self):
+        """Every metric in the Prometheus text exposition format."""
+        lines = []
+        with self.lock:
+            for name, (kind, help_text) in DEFINITIONS.items():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for key, value in sorted(self.values[name].items()):
+                    labels = format_labels(key)
+                    if kind == 'summary':
+                        lines.append(f"{name}_count{labels} {value[0]}")
+                        lines.append(f"{name}_sum{labels} {value[1]:.6f}")
+                    else:
+                        lines.append(f"{name}{labels} {value if isinstance(value, int) else f'{value:.6f}'}")
+        return '\n'.join(lines) + '\n'
+
+def format_labels(key):
+    if not key:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in key)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(key, escaped)) + '}'
+
+registry = Registry()
+
+def record_run(stats, backend='ga', strategy='ga'):
+    """Add one finished scheduler pass (its stats from run_scheduler) to the registry."""
+    registry.inc('scheduler_runs_total', backend=backend, strategy=strategy)
+    registry.observe('scheduler_run_seconds', stats["seconds"], backend=backend, strategy=strategy)
+    for stage, seconds in stats["stages"].items():
+        if seconds:
+            registry.inc('scheduler_stage_seconds_total', seconds, stage=stage)
+    registry.inc('scheduler_evaluations_total', stats["evaluations"])
+    registry.inc('scheduler_generations_total', stats["generations"])
+
+class PhaseTimer:
+    """Wall time of the phases of one request (db, solve, serialize, ...); repeated phases add up."""
+    def __init__(self):
+        self.seconds = {}
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] = self.seconds.get(name, 0.0) + time.perf_counter() - started
+
+    def record(self, endpoint, response=None):
+        """Add the phases to the registry, and to response's Server-Timing header if given."""
+        for name, seconds in self.seconds.items():
+            registry.observe('generate_phase_seconds', seconds, endpoint=endpoint, phase=name)
+        if response is not None:
+            response.headers['Server-Timing'] = ', '.join(f'{name};dur={seconds * 1000:.1f}'
+                                                          for name, seconds in self.seconds.items())
+        return response
+
+# --- PROFILING ---
+PROFILE_LINES = 40 # functions listed per profile, by cumulative time
+
+def profile_call(func, *args, **kwargs):
+    """Run func under cProfile; returns (its result, a text report of the hottest functions).
+
+    Only this process is profiled: island subprocesses run unprofiled.
+    """
+    profiler = cProfile.Profile()
+    result = profiler.runcall(func, *args, **kwargs)
+    report = io.StringIO()
+    pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(PROFILE_LINES)
+    return result, report.getvalue()
@@ -1,4 +1,5 @@
 # models.py
+from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
 
 db = SQLAlchemy()
@@ -6,7 +7,17 @@ db = SQLAlchemy()
 # Association table for the many-to-many relationship between Faculty and Subjects
 faculty_subject_association = db.Table('faculty_subject',
     db.Column('faculty_id', db.Integer, db.ForeignKey('faculty.id'), primary_key=True),
-    db.Column('subject_id', db.Integer, db.ForeignKey('subject.id'), primary_key=True)
+    db.Column('subject_id', db.Integer, db.ForeignKey('subject.id'), primary_key=True),
+    # The primary key covers lookups by faculty; this one covers "who teaches this subject"
+    db.Index('ix_faculty_subject_subject_id', 'subject_id')
+)
+
+# Association table for the subjects each batch takes (its enrolments). A batch with
+# no rows here takes every subject, as before enrolments were recorded.
+batch_subject_association = db.Table('batch_subject',
+    db.Column('batch_id', db.Integer, db.ForeignKey('batch.id'), primary_key=True),
+    db.Column('subject_id', db.Integer, db.ForeignKey('subject.id'), primary_key=True),
+    db.Index('ix_batch_subject_subject_id', 'subject_id')
 )
 
 class User(db.Model):
@@ -18,16 +29,20 @@ class User(db.Model):
 class Room(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), unique=True, nullable=False)
+    unavailable = db.relationship('RoomUnavailability', backref='room', cascade='all, delete-orphan')
 
 class Batch(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), unique=True, nullable=False)
+    # The subjects this batch is enrolled in; only these get sessions in its timetable
+    subjects = db.relationship('Subject', secondary=batch_subject_association, back_populates='batches')
 
 class Faculty(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False)
+    name = db.Column(db.String(100), nullable=False, index=True)
     # The 'subjects' relationship will link a faculty to the subjects they can teach
     subjects = db.relationship('Subject', secondary=faculty_subject_association, back_populates='faculties')
+    unavailable = db.relationship('FacultyUnavailability', backref='faculty', cascade='all, delete-orphan')
 
 class Subject(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -36,6 +51,85 @@ class Subject(db.Model):
     hours_per_week = db.Column(db.Integer, nullable=False)
     # The 'faculties' relationship links a subject back to the faculty who can teach it
     faculties = db.relationship('Faculty', secondary=faculty_subject_association, back_populates='subjects')
+    # The batches enrolled in this subject
+    batches = db.relationship('Batch', secondary=batch_subject_association, back_populates='subjects')
+
+# --- Time grid ---
+# The institution's teaching days and timeslots, in `position` order. While a table is
+# empty the scheduler uses snapshot.DEFAULT_DAYS / DEFAULT_TIMESLOTS.
+
+class Day(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(20), unique=True, nullable=False)
+    position = db.Column(db.Integer, nullable=False, default=0)
+    faculty_unavailable = db.relationship('FacultyUnavailability', backref='day', cascade='all, delete-orphan')
+    room_unavailable = db.relationship('RoomUnavailability', backref='day', cascade='all, delete-orphan')
+
+class Timeslot(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(20), unique=True, nullable=False)
+    position = db.Column(db.Integer, nullable=False, default=0)
+    faculty_unavailable = db.relationship('FacultyUnavailability', backref='timeslot', cascade='all, delete-orphan')
+    room_unavailable = db.relationship('RoomUnavailability', backref='timeslot', cascade='all, delete-orphan')
+
+class FacultyUnavailability(db.Model):
+    """A time a faculty member can't teach: one timeslot of a day, or the whole day when timeslot_id is null."""
+    id = db.Column(db.Integer, primary_key=True)
+    faculty_id = db.Column(db.Integer, db.ForeignKey('faculty.id'), nullable=False, index=True)
+    day_id = db.Column(db.Integer, db.ForeignKey('day.id'), nullable=False)
+    timeslot_id = db.Column(db.Integer, db.ForeignKey('timeslot.id'))
+
+class RoomUnavailability(db.Model):
+    """A time a room can't be used: one timeslot of a day, or the whole day when timeslot_id is null."""
+    id = db.Column(db.Integer, primary_key=True)
+    room_id = db.Column(db.Integer, db.ForeignKey('room.id'), nullable=False, index=True)
+    day_id = db.Column(db.Integer, db.ForeignKey('day.id'), nullable=False)
+    timeslot_id = db.Column(db.Integer, db.ForeignKey('timeslot.id'))
 
-# This could be another model if you want to assign subjects to batches dynamically
-# For now, we assume all subjects are for all batches for simplicity in the algorithm
\ No newline at end of file
+class ConstraintWeight(db.Model):
+    """This institution's weight for one scheduling rule (see constraints.CONSTRAINTS); rules without a row use their default."""
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), unique=True, nullable=False)
+    weight = db.Column(db.Integer, nullable=False)
+
+class TableVersion(db.Model):
+    """A counter per table, bumped by every write to it (see versions.py); the list APIs' ETags."""
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+
+# --- Generated timetables ---
+# Results are stored as plain names rather than foreign keys so a saved timetable
+# still renders after the rooms, faculty etc. it used are edited or deleted.
+
+class TimetableRun(db.Model):
+    """One generation: the fingerprint of the input it solved and the options it produced."""
+    id = db.Column(db.Integer, primary_key=True)
+    input_hash = db.Column(db.String(64), nullable=False, index=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    # {"days", "timeslots"} it was solved on; None for runs stored before this was recorded
+    grid = db.Column(db.JSON)
+    # Fingerprint of the solver settings it was produced with (result_cache.settings_fingerprint);
+    # None for runs stored before this was recorded, which are never reused
+    settings_hash = db.Column(db.String(64))
+    timetables = db.relationship('GeneratedTimetable', backref='run', cascade='all, delete-orphan',
+                                 order_by='GeneratedTimetable.option')
+
+class GeneratedTimetable(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    run_id = db.Column(db.Integer, db.ForeignKey('timetable_run.id'), nullable=False, index=True)
+    option = db.Column(db.Integer, nullable=False)
+    fitness = db.Column(db.Integer, nullable=False)
+    seed = db.Column(db.BigInteger)
+    sessions = db.relationship('TimetableSession', backref='timetable', cascade='all, delete-orphan',
+                               order_by='TimetableSession.id')
+
+class TimetableSession(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    timetable_id = db.Column(db.Integer, db.ForeignKey('generated_timetable.id'), nullable=False, index=True)
+    day = db.Column(db.String(20), nullable=False)
+    timeslot = db.Column(db.String(20), nullable=False)
+    room = db.Column(db.String(50), nullable=False)
+    batch = db.Column(db.String(50), nullable=False)
+    subject = db.Column(db.String(20), nullable=False)
+    faculty = db.Column(db.String(100), nullable=False)
@@ -0,0 +1,133 @@
+# multistart.py
+# Runs several independent scheduler passes in a process pool and ranks the results.
+import multiprocessing as mp
+import os
+import queue
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+
+from metrics import profile_call, record_run
+from scheduler_v2 import run_scheduler, BACKEND, STRATEGY
+
+# Set in each pool worker by init_worker: where to report progress and how to hear about cancellation
+_progress_queue = None
+_cancel_event = None
+
+def init_worker(progress_queue, cancel_event):
+    global _progress_queue, _cancel_event
+    _progress_queue = progress_queue
+    _cancel_event = cancel_event
+
+def timetable_rows(timetable):
+    """Format a Timetable as the list of session dicts the frontend renders."""
+    return [{
+        "day": gene.day, "timeslot": gene.timeslot, "room": gene.room,
+        "batch": gene.batch, "subject": gene.subject, "faculty": gene.faculty
+    } for gene in timetable.genes]
+
+def solve_once(input_data, seed, deadline=None, scheduler_options=None, run_index=0, on_progress=None, should_stop=None,
+               profile=False):
+    """One seeded scheduler pass, safe to run in a worker process.
+
+    deadline is an absolute time.time() value shared by every pass of a request,
+    so passes that start late in the queue get correspondingly less time.
+    scheduler_options are passed through to run_scheduler (engine, islands, ...).
+    In a pool worker, progress and cancellation go through the queue/event from init_worker.
+    The result carries the run's stats, and with profile=True a cProfile report of it.
+    """
+    if deadline is not None and time.time() >= deadline:
+        return None # Queued behind other passes until the budget was gone
+    if _cancel_event is not None:
+        should_stop = _cancel_event.is_set
+    if should_stop is not None and should_stop():
+        return None
+    if _progress_queue is not None:
+        last_report = {'fitness': None, 'time': 0.0}
+
+        def on_progress(generation, best_fitness):
+            # Only ship improvements, or a heartbeat every half second, across the process boundary
+            now = time.monotonic()
+            if best_fitness != last_report['fitness'] or now - last_report['time'] >= 0.5:
+                _progress_queue.put((run_index, generation, best_fitness))
+                last_report.update(fitness=best_fitness, time=now)
+    elif on_progress is not None:
+        report = on_progress
+        on_progress = lambda generation, best_fitness: report(run_index, generation, best_fitness)
+
+    time_limit = None if deadline is None else max(0.0, deadline - time.time())
+    kwargs = dict(time_limit=time_limit, seed=seed, on_progress=on_progress, should_stop=should_stop,
+                  **(scheduler_options or {}))
+    profile_report = None
+    if profile:
+        timetable, profile_report = profile_call(run_scheduler, input_data, **kwargs)
+    else:
+        timetable = run_scheduler(input_data, **kwargs)
+    result = {"seed": timetable.seed, "fitness": timetable.fitness, "timetable": timetable_rows(timetable),
+              "stats": timetable.stats}
+    if profile_report is not None:
+        result["profile"] = profile_report
+    return result
+
+def run_multistart(input_data, runs=3, workers=None, time_budget=None, seed=None, scheduler_options=None,
+                   on_progress=None, should_stop=None, profile=False):
+    """Run `runs` independently seeded passes and return their results, best fitness first.
+
+    Passes are spread over `workers` processes (default: one per CPU). After
+    `time_budget` seconds every running pass returns its best-so-far timetable and
+    passes that never got a worker are dropped. on_progress(run_index, generation,
+    best_fitness) reports each pass as it evolves; once should_stop() returns True
+    every pass stops and hands back its best-so-far result.
+    Each pass's stats are added to this process's metrics registry; profile=True
+    also attaches a cProfile report to each result (see solve_once).
+    """
+    if seed is None:
+        seed = random.SystemRandom().randrange(2**32)
+    seeds = [(seed + i) % 2**32 for i in range(runs)]
+    deadline = None if time_budget is None else time.time() + time_budget
+    workers = min(workers or os.cpu_count() or 1, runs)
+
+    if workers <= 1:
+        results = []
+        for run_index, run_seed in enumerate(seeds):
+            if results and deadline is not None and time.time() >= deadline:
+                break
+            result = solve_once(input_data, run_seed, deadline, scheduler_options, run_index, on_progress, should_stop,
+                                profile)
+            if result is not None:
+                results.append(result)
+    else:
+        progress_queue = mp.Queue()
+        cancel_event = mp.Event()
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                       initargs=(progress_queue, cancel_event))
+        try:
+            futures = [executor.submit(solve_once, input_data, run_seed, deadline, scheduler_options, run_index,
+                                       profile=profile)
+                       for run_index, run_seed in enumerate(seeds)]
+            # Give running passes a moment past the deadline to hand back their best-so-far
+            give_up_at = None if deadline is None else deadline + 5
+            while True:
+                done, pending = wait(futures, timeout=0.25)
+                while True:
+                    try:
+                        update = progress_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if on_progress is not None:
+                        on_progress(*update)
+                if not pending or (give_up_at is not None and time.time() >= give_up_at):
+                    break
+                if should_stop is not None and should_stop():
+                    cancel_event.set()
+            results = [f.result() for f in futures if f in done and f.result() is not None]
+        finally:
+            # Passes still running past give_up_at must stop too, not keep a worker busy after we return
+            cancel_event.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    options = scheduler_options or {}
+    for result in results:
+        record_run(result["stats"], options.get('backend', BACKEND), options.get('strategy', STRATEGY))
+    results.sort(key=lambda r: r["fitness"])
+    return results
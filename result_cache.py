@@ -0,0 +1,94 @@
+# result_cache.py
+# Stores generated timetables and finds them again by a fingerprint of the scheduler input.
+import hashlib
+import json
+
+from sqlalchemy import insert
+from sqlalchemy.orm import selectinload
+
+from models import db, TimetableRun, GeneratedTimetable, TimetableSession
+from snapshot import DEFAULT_DAYS, DEFAULT_TIMESLOTS
+
+SESSION_FIELDS = ('day', 'timeslot', 'room', 'batch', 'subject', 'faculty')
+
+def input_fingerprint(input_data):
+    """Canonical SHA-256 of the scheduler input: same data -> same hash, whatever the dict order."""
+    canonical = json.dumps(input_data, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+def settings_fingerprint(settings):
+    """Fingerprint of the solver settings (app.multistart_settings) a run is produced with."""
+    return input_fingerprint(settings)
+
+def input_grid(input_data):
+    """The days and timeslots a scheduler input is laid out on."""
+    return {"days": list(input_data["days"]), "timeslots": list(input_data["timeslots"])}
+
+def run_grid(run):
+    """The grid a stored run was solved on. Runs stored before grids were recorded
+    were all solved on the fixed default week."""
+    return run.grid or {"days": list(DEFAULT_DAYS), "timeslots": list(DEFAULT_TIMESLOTS)}
+
+def save_run(input_hash, results, grid=None, settings_hash=None):
+    """Persist formatted results (as returned by app.format_results), with the grid and
+    the settings they were solved with (see input_grid and settings_fingerprint), and
+    return the new run."""
+    run = TimetableRun(input_hash=input_hash, grid=grid, settings_hash=settings_hash)
+    db.session.add(run)
+    for result in results:
+        timetable = GeneratedTimetable(option=result["option"], fitness=result["fitness"], seed=result.get("seed"))
+        run.timetables.append(timetable)
+    db.session.flush()
+
+    # One executemany for all sessions instead of an ORM object per row
+    rows = [dict({field: entry[field] for field in SESSION_FIELDS}, timetable_id=timetable.id)
+            for timetable, result in zip(run.timetables, results)
+            for entry in result["timetable"]]
+    if rows:
+        db.session.execute(insert(TimetableSession), rows)
+    db.session.commit()
+    return run
+
+def load_run(run_id):
+    return (TimetableRun.query
+            .options(selectinload(TimetableRun.timetables).selectinload(GeneratedTimetable.sessions))
+            .filter_by(id=run_id)
+            .first())
+
+def find_cached_run(input_hash, settings_hash):
+    """The most recent stored run for exactly this input, solved with exactly these settings, if any."""
+    run = (TimetableRun.query
+           .filter_by(input_hash=input_hash, settings_hash=settings_hash)
+           .order_by(TimetableRun.created_at.desc(), TimetableRun.id.desc())
+           .first())
+    return load_run(run.id) if run else None
+
+def latest_run():
+    run = TimetableRun.query.order_by(TimetableRun.created_at.desc(), TimetableRun.id.desc()).first()
+    return load_run(run.id) if run else None
+
+def best_sessions(run):
+    """The sessions of a run's best option, the starting point for a warm-started generation."""
+    if not run or not run.timetables:
+        return None
+    best = min(run.timetables, key=lambda t: t.fitness)
+    return [{field: getattr(session, field) for field in SESSION_FIELDS} for session in best.sessions]
+
+def run_results(run):
+    """A stored run in the same format as the generate API's results list."""
+    return [{
+        "option": timetable.option,
+        "fitness": timetable.fitness,
+        "seed": timetable.seed,
+        "timetable": [{field: getattr(session, field) for field in SESSION_FIELDS} for session in timetable.sessions]
+    } for timetable in run.timetables]
+
+def run_summary(run, current_hash=None):
+    return {
+        "id": run.id,
+        "created_at": run.created_at.isoformat(),
+        "input_hash": run.input_hash,
+        "matches_current_data": run.input_hash == current_hash,
+        "options": len(run.timetables),
+        "best_fitness": min((t.fitness for t in run.timetables), default=None),
+    }
@@ -0,0 +1,107 @@
+# scheduler_numpy.py
+# Vectorized, population-wide fitness evaluation for scheduler_v2 (engine='numpy').
+import numpy as np
+
+from constraints import VALUE_INDEX
+
+def population_matrices(population):
+    """Stack the population's chromosomes into (individuals x sessions) int64 matrices."""
+    def stack(column):
+        return np.stack([np.frombuffer(getattr(t, column), dtype=np.int32) for t in population]).astype(np.int64)
+    return stack('slots'), stack('rooms'), stack('faculty')
+
+def count_clashes(keys):
+    """Per row, the number of entries minus the number of distinct keys.
+
+    That is sum(n - 1) over every key booked n > 1 times, i.e. the clash count of
+    the incremental evaluator for that resource.
+    """
+    keys = np.sort(keys, axis=1)
+    distinct = 1 + np.count_nonzero(keys[:, 1:] != keys[:, :-1], axis=1)
+    return keys.shape[1] - distinct
+
+def day_penalties(slot_counts, run_starts, consecutive_weight=1, gap_weight=0):
+    """Vectorized batch_day_penalty over the last axis of a (..., timeslots) count array."""
+    run = np.zeros(slot_counts.shape[:-1], dtype=np.int64)
+    consecutive = np.zeros_like(run)
+    for t in range(slot_counts.shape[-1]):
+        counts = slot_counts[..., t]
+        occupied = counts > 0
+        first = np.where(run_starts[t], 1, run + 1)
+        consecutive += occupied & (first > 2)
+        run = np.where(occupied, np.where(counts > 1, 1, first), 0)
+    penalty = consecutive * consecutive_weight
+    if gap_weight:
+        # Free timeslots between the first and the last class of the day
+        occupied = slot_counts > 0
+        n_timeslots = slot_counts.shape[-1]
+        first_class = occupied.argmax(axis=-1)
+        last_class = n_timeslots - 1 - occupied[..., ::-1].argmax(axis=-1)
+        span = np.where(occupied.any(axis=-1), last_class - first_class + 1, 0)
+        penalty += (span - occupied.sum(axis=-1)) * gap_weight
+    return penalty
+
+def unary_tables(encoding):
+    """encoding.unary_costs as numpy arrays, converted once per Encoding."""
+    tables = getattr(encoding, 'numpy_unary_costs', None)
+    if tables is None:
+        tables = [(a, b, np.array(table, dtype=np.int64)) for a, b, table in encoding.unary_costs]
+        encoding.numpy_unary_costs = tables
+    return tables
+
+def evaluate_population(encoding, population):
+    """Score every timetable in one pass and store the result on each `fitness`.
+
+    Produces exactly the same values as Timetable.calculate_fitness().
+    """
+    if not population:
+        return []
+    n_sessions = len(encoding)
+    if n_sessions == 0:
+        for timetable in population:
+            timetable.fitness = 0
+        return [0] * len(population)
+
+    slots, rooms, faculty = population_matrices(population)
+    batch = np.frombuffer(encoding.session_batch, dtype=np.int32).astype(np.int64)
+    n_slots = encoding.n_slots
+    n_batches = len(encoding.batches)
+    n_days, n_timeslots = len(encoding.days), len(encoding.timeslots)
+    n_individuals = len(population)
+
+    # --- HARD CONSTRAINTS: teacher, room and batch keys combined with the slot ---
+    teacher_weight, room_weight, batch_weight = encoding.clash_weights
+    hard = (count_clashes(faculty * n_slots + slots) * teacher_weight
+            + count_clashes(rooms * n_slots + slots) * room_weight
+            + count_clashes(batch * n_slots + slots) * batch_weight)
+
+    # --- SOFT CONSTRAINTS: per individual/batch/day timeslot counts in one bincount ---
+    rows = np.arange(n_individuals, dtype=np.int64)[:, None]
+    keys = (rows * n_batches + batch) * n_slots + slots
+    counts = np.bincount(keys.ravel(), minlength=n_individuals * n_batches * n_slots)
+    counts = counts.reshape(n_individuals, n_batches, n_days, n_timeslots)
+    run_starts = np.array(encoding.run_starts, dtype=bool)
+    soft = day_penalties(counts, run_starts, encoding.consecutive_weight, encoding.gap_weight).sum(axis=(1, 2))
+
+    limits = np.frombuffer(encoding.faculty_max_hours, dtype=np.int32).astype(np.int64)
+    if encoding.overload_weight and limits.any():
+        n_faculty = len(encoding.faculty)
+        keys = (rows * n_faculty + faculty) * n_days + slots // n_timeslots
+        hours = np.bincount(keys.ravel(), minlength=n_individuals * n_faculty * n_days)
+        hours = hours.reshape(n_individuals, n_faculty, n_days)
+        overload = np.where(limits[:, None] > 0, np.maximum(hours - limits[:, None], 0), 0)
+        soft += overload.sum(axis=(1, 2)) * encoding.overload_weight
+
+    # Unary rules: one gather per fused cost table
+    if encoding.unary_costs:
+        sessions = np.broadcast_to(np.arange(n_sessions, dtype=np.int64), slots.shape)
+        values = [None] * len(VALUE_INDEX)
+        values[VALUE_INDEX['slot']], values[VALUE_INDEX['room']] = slots, rooms
+        values[VALUE_INDEX['faculty']], values[VALUE_INDEX['session']] = faculty, sessions
+        for a, b, table in unary_tables(encoding):
+            soft += table[values[a], values[b]].sum(axis=1)
+
+    fitness = (hard + soft).tolist()
+    for timetable, value in zip(population, fitness):
+        timetable.fitness = value
+    return fitness
@@ -1,8 +1,21 @@
 # scheduler_v2.py
+import logging
+import math
 import random
-from collections import defaultdict
+import re
+import time
+from array import array
+from collections import Counter
+from itertools import islice
+from operator import attrgetter
 
-# --- (The Gene and Timetable classes remain exactly the same as before) ---
+from constraints import constraint_weights, fuse_unary_costs
+from metrics import new_run_stats, merge_stats
+
+# Progress messages are logged at DEBUG level, so a normal run does no formatting or I/O for them
+logger = logging.getLogger(__name__)
+
+# --- Gene and Timetable classes ---
 class Gene:
     def __init__(self, day, timeslot, room, batch, subject, faculty):
         self.day = day
@@ -15,154 +28,1082 @@ class Gene:
     def __repr__(self):
         return f"({self.day}, {self.timeslot}, {self.room}, {self.batch}, {self.subject}, {self.faculty})"
 
-class Timetable:
-    def __init__(self, genes, config):
-        self.genes = genes
+TIMESLOT_PATTERN = re.compile(r'^\s*(\d{1,2})(?::(\d{2}))?\s*-\s*(\d{1,2})(?::(\d{2}))?\s*$')
+
+def parse_timeslot(label):
+    """(start, end) in minutes after midnight for a label like "9-10" or "13:30-14:30", else None.
+
+    Hours are on a 12-hour clock without am/pm, as in the default "1-2": anything
+    before 8 is taken to be afternoon.
+    """
+    match = TIMESLOT_PATTERN.match(label)
+    if not match:
+        return None
+    start_hour, start_minute, end_hour, end_minute = match.groups()
+
+    def minutes(hour, minute):
+        hour = int(hour)
+        if hour < 8:
+            hour += 12
+        return hour * 60 + int(minute or 0)
+    return minutes(start_hour, start_minute), minutes(end_hour, end_minute)
+
+def timeslot_run_starts(timeslots):
+    """Per timeslot, whether it does NOT directly follow the previous one (day start, lunch break).
+
+    With labels that can't all be parsed every timeslot is assumed back-to-back.
+    """
+    times = [parse_timeslot(label) for label in timeslots]
+    if None in times:
+        return tuple(t == 0 for t in range(len(timeslots)))
+    return tuple(t == 0 or times[t - 1][1] != times[t][0] for t in range(len(timeslots)))
+
+def batch_day_penalty(slot_counts, run_starts, consecutive_weight=1, gap_weight=0):
+    """Weighted soft penalty for one batch on one day, from how many classes sit in each timeslot.
+
+    Consecutive: 1 for every class that extends a run of more than 2 back-to-back
+    slots; a double-booked slot or a break in the day (see timeslot_run_starts)
+    ends the run. Gaps: 1 for every free timeslot between the first and last class.
+    Both are counted in the same single scan.
+    """
+    consecutive = 0
+    gaps = 0
+    run = 0
+    free = -1 # Free timeslots since the last class; -1 until the first class
+    for count, starts_run in zip(slot_counts, run_starts):
+        if starts_run:
+            run = 0
+        if count == 0:
+            run = 0
+            if free >= 0:
+                free += 1
+            continue
+        if free > 0:
+            gaps += free
+        free = 0
+        first = run + 1
+        if first > 2:
+            consecutive += 1
+        run = 1 if count > 1 else first
+    return consecutive * consecutive_weight + gaps * gap_weight
+
+class Encoding:
+    """Integer encoding of one scheduler input, built once per run.
+
+    Days, timeslots, rooms, batches, subjects and faculty are interned into ids, and
+    the class sessions to place are fixed up front: session i always belongs to
+    session_batch[i] / session_subject[i]. A chromosome therefore only stores, per
+    session, a slot id (day * len(timeslots) + timeslot), a room id and a faculty id.
+
+    Everything the fitness needs beyond that is precomputed here once per run:
+    name -> id maps, where the day breaks (run_starts), each batch's sessions, the
+    constraint weights (see constraints.py, overridable by "constraint_weights"),
+    teachers' daily limits, which rooms fit each batch, when each teacher and room is
+    available (as bitsets over slot ids, from the faculty's "unavailable" times and
+    "room_unavailable") and the fused cost tables of the unary constraints.
+    """
+    def __init__(self, config):
         self.config = config
-        self.fitness = self.calculate_fitness()
+        self.days = list(config.get('days', []))
+        self.timeslots = list(config.get('timeslots', []))
+        self.rooms = list(config.get('rooms', []))
+        self.batches = list(config.get('batches', []))
+        self.subjects = list(config.get('subjects', {}))
+        self.faculty = list(config.get('faculty', {}))
+        self.n_slots = len(self.days) * len(self.timeslots)
+
+        batch_ids = {name: i for i, name in enumerate(self.batches)}
+        faculty_by_subject = {code: [] for code in self.subjects}
+        for f_id, f_name in enumerate(self.faculty):
+            for code in config['faculty'][f_name].get('subjects', []):
+                if code in faculty_by_subject:
+                    faculty_by_subject[code].append(f_id)
+
+        self.session_batch = array('i')
+        self.session_subject = array('i')
+        self.session_faculty_options = []
+        for s_id, code in enumerate(self.subjects):
+            details = config['subjects'][code]
+            possible_faculty = tuple(faculty_by_subject[code])
+            if not possible_faculty: continue
+            for batch in details.get('batches', []):
+                if batch not in batch_ids:
+                    batch_ids[batch] = len(self.batches)
+                    self.batches.append(batch)
+                for _ in range(details.get('hours_per_week', 0)):
+                    self.session_batch.append(batch_ids[batch])
+                    self.session_subject.append(s_id)
+                    self.session_faculty_options.append(possible_faculty)
+
+        self.day_ids = {name: i for i, name in enumerate(self.days)}
+        self.timeslot_ids = {name: i for i, name in enumerate(self.timeslots)}
+        self.room_ids = {name: i for i, name in enumerate(self.rooms)}
+        self.faculty_ids = {name: i for i, name in enumerate(self.faculty)}
+        self.batch_ids = batch_ids
+        self.run_starts = timeslot_run_starts(self.timeslots)
+        self.sessions_by_batch = [[] for _ in self.batches]
+        for i, batch in enumerate(self.session_batch):
+            self.sessions_by_batch[batch].append(i)
+
+        # --- AVAILABILITY ---
+        # Bitsets over slot ids (bit s = slot s) of when each teacher and room can be
+        # used, and per slot a bitset of its usable rooms (bit r = room r). Checking a
+        # placement is then a shift and an AND, whatever the size of the time grid.
+        self.all_slots = (1 << self.n_slots) - 1
+        self.faculty_available = [self.all_slots & ~self.slot_mask(config['faculty'][name].get('unavailable', []))
+                                  for name in self.faculty]
+        room_unavailable = config.get('room_unavailable', {})
+        self.room_available = [self.all_slots & ~self.slot_mask(room_unavailable.get(room, [])) for room in self.rooms]
+        self.fully_available = all(mask == self.all_slots for mask in self.faculty_available + self.room_available)
+        all_rooms = (1 << len(self.rooms)) - 1
+        self.slot_rooms = [all_rooms] * self.n_slots
+        if not self.fully_available:
+            for r, mask in enumerate(self.room_available):
+                for slot in range(self.n_slots):
+                    if not mask >> slot & 1:
+                        self.slot_rooms[slot] &= ~(1 << r)
+
+        # --- CONSTRAINT DATA ---
+        self.weights = constraint_weights(config.get('constraint_weights'))
+        self.clash_weights = (self.weights['teacher_clash'], self.weights['room_clash'], self.weights['batch_clash'])
+        self.consecutive_weight = self.weights['consecutive']
+        self.gap_weight = self.weights['gaps']
+        self.overload_weight = self.weights['faculty_overload']
+        # 0 = no daily limit
+        self.faculty_max_hours = array('i', (int(config['faculty'][name].get('max_hours_per_day') or 0)
+                                             for name in self.faculty))
+        # Per batch, a bitmask of the rooms it fits in (rooms or batches without a size fit everywhere)
+        capacity = config.get('room_capacity', {})
+        batch_size = config.get('batch_size', {})
+        self.room_fits = []
+        for batch in self.batches:
+            size = batch_size.get(batch) or 0
+            mask = 0
+            for r, room in enumerate(self.rooms):
+                if not capacity.get(room) or capacity[room] >= size:
+                    mask |= 1 << r
+            self.room_fits.append(mask)
+        self.unary_costs = fuse_unary_costs(self, self.weights)
+
+    def __len__(self):
+        return len(self.session_batch)
+
+    def slot_mask(self, entries):
+        """Bitset of the slots in a list of {"day", "timeslot"} entries; an entry without a
+        timeslot covers the whole day. Days or timeslots not in this input are ignored."""
+        n_timeslots = len(self.timeslots)
+        whole_day = (1 << n_timeslots) - 1
+        mask = 0
+        for entry in entries:
+            day = self.day_ids.get(entry.get('day'))
+            if day is None:
+                continue
+            if entry.get('timeslot') is None:
+                mask |= whole_day << (day * n_timeslots)
+            elif entry['timeslot'] in self.timeslot_ids:
+                mask |= 1 << (day * n_timeslots + self.timeslot_ids[entry['timeslot']])
+        return mask
+
+    def day_penalty(self, slot_counts):
+        """batch_day_penalty for one batch's timeslot counts on one day, with this input's weights."""
+        return batch_day_penalty(slot_counts, self.run_starts, self.consecutive_weight, self.gap_weight)
+
+    def gene(self, index, slot, room, faculty):
+        """Decode one session back into a named Gene view."""
+        day, timeslot = divmod(slot, len(self.timeslots))
+        return Gene(
+            day=self.days[day],
+            timeslot=self.timeslots[timeslot],
+            room=self.rooms[room],
+            batch=self.batches[self.session_batch[index]],
+            subject=self.subjects[self.session_subject[index]],
+            faculty=self.faculty[faculty]
+        )
+
+class Occupancy:
+    """Booking counts for one timetable, kept in sync with its chromosome.
+
+    Counts are kept per resource as one int array row per teacher, room and batch,
+    indexed by slot (teacher_slots[faculty][slot], ...). Adding or removing a session
+    updates the hard and soft penalty in O(1): the soft checks only rescan the
+    timeslots of the one batch/day and teacher/day it touches, so a mutation or
+    crossover no longer has to rebuild everything from scratch.
+
+    Rows are copy-on-write: copy() shares every row with the clone and a row is only
+    duplicated the first time either side writes to it, so a child differing from
+    its parent in a few sessions only owns the few rows those sessions touch.
+    """
+    def __init__(self, encoding):
+        self.encoding = encoding
+        # Every row starts out as the same all-zero array, unshared on first write like any other.
+        # Counts are int16: rows are small, so halving them matters more than headroom.
+        empty_slots = array('h', bytes(2 * encoding.n_slots))
+        self.teacher_slots = [empty_slots] * len(encoding.faculty)
+        self.room_slots = [empty_slots] * len(encoding.rooms)
+        # batch_slots[batch] doubles as the per batch/day timeslot counts
+        self.batch_slots = [empty_slots] * len(encoding.batches)
+        # Weighted, so kept as full ints
+        self.batch_day_penalty = [array('i', bytes(4 * len(encoding.days)))] * len(encoding.batches)
+        self.clashes = 0      # Double bookings, unweighted
+        self.hard_penalty = 0 # The clashes, weighted by kind
+        self.soft_penalty = 0 # Every other rule, weighted
+        self._owned = 0 # Bit k set = row k is private (rows numbered teacher, room, batch, penalty)
+
+    @classmethod
+    def from_chromosome(cls, encoding, slots, rooms, faculty):
+        occupancy = cls(encoding)
+        for i in range(len(slots)):
+            occupancy.add(i, slots[i], rooms[i], faculty[i])
+        return occupancy
+
+    @property
+    def fitness(self):
+        return self.hard_penalty + self.soft_penalty
+
+    def copy(self):
+        clone = Occupancy.__new__(Occupancy)
+        clone.encoding = self.encoding
+        clone.teacher_slots = self.teacher_slots[:]
+        clone.room_slots = self.room_slots[:]
+        clone.batch_slots = self.batch_slots[:]
+        clone.batch_day_penalty = self.batch_day_penalty[:]
+        clone.clashes = self.clashes
+        clone.hard_penalty = self.hard_penalty
+        clone.soft_penalty = self.soft_penalty
+        # From now on every row is shared, so both sides copy before their next write
+        self._owned = clone._owned = 0
+        return clone
+
+    def add(self, index, slot, room, faculty):
+        self._book(index, slot, room, faculty, 1)
+
+    def remove(self, index, slot, room, faculty):
+        self._book(index, slot, room, faculty, -1)
+
+    def _book(self, index, slot, room, faculty, step):
+        encoding = self.encoding
+        batch = encoding.session_batch[index]
+        n_faculty = len(self.teacher_slots)
+        n_rooms = len(self.room_slots)
+        owned = self._owned
+        teacher_weight, room_weight, batch_weight = encoding.clash_weights
+        for table, i, bit, weight in ((self.teacher_slots, faculty, faculty, teacher_weight),
+                                      (self.room_slots, room, n_faculty + room, room_weight),
+                                      (self.batch_slots, batch, n_faculty + n_rooms + batch, batch_weight)):
+            row = table[i]
+            if not owned >> bit & 1: # Copy-on-write
+                row = table[i] = row[:]
+                owned |= 1 << bit
+            count = row[slot]
+            # A slot holding n classes contributes n - 1 clashes
+            if step > 0 and count >= 1:
+                self.clashes += 1
+                self.hard_penalty += weight
+            elif step < 0 and count >= 2:
+                self.clashes -= 1
+                self.hard_penalty -= weight
+            row[slot] = count + step
+
+        n_timeslots = len(encoding.timeslots)
+        day = slot // n_timeslots
+        start = day * n_timeslots
+
+        # Unary rules (see constraints.fuse_unary_costs): a few table lookups, however many rules there are
+        if encoding.unary_costs:
+            values = (slot, room, faculty, index)
+            cost = 0
+            for a, b, table in encoding.unary_costs:
+                cost += table[values[a]][values[b]]
+            self.soft_penalty += step * cost
+
+        # Teacher over their daily limit: a cost per extra hour that day
+        limit = encoding.faculty_max_hours[faculty]
+        if limit and encoding.overload_weight:
+            hours = sum(self.teacher_slots[faculty][start:start + n_timeslots])
+            before = hours - step
+            self.soft_penalty += encoding.overload_weight * (max(0, hours - limit) - max(0, before - limit))
+
+        penalty = encoding.day_penalty(self.batch_slots[batch][start:start + n_timeslots])
+        row = self.batch_day_penalty[batch]
+        if penalty != row[day]:
+            self.soft_penalty += penalty - row[day]
+            bit = n_faculty + n_rooms + len(self.batch_slots) + batch
+            if not owned >> bit & 1:
+                row = self.batch_day_penalty[batch] = row[:]
+                owned |= 1 << bit
+            row[day] = penalty
+        self._owned = owned
+
+class Timetable:
+    """One chromosome: per-session slot, room and faculty ids as compact int arrays.
+
+    Gene objects are only materialised through the `genes` property, when a result
+    is handed back to the caller. With track=False no Occupancy is kept and fitness
+    stays None until a batched evaluator (see scheduler_numpy) fills it in.
+
+    copy() is copy-on-write: the clone shares the parent's arrays (and Occupancy rows)
+    until one of them is changed through assign(), which is the only place a
+    chromosome is ever modified. A timetable can therefore never alter another one
+    behind its back, and its cached fitness always matches its own genes.
+    """
+    def __init__(self, encoding, slots, rooms, faculty, occupancy=None, track=True):
+        self.encoding = encoding
+        self.config = encoding.config
+        self.slots = slots
+        self.rooms = rooms
+        self.faculty = faculty
+        self._shared = False # True while slots/rooms/faculty may be referenced by a copy
+        if track and occupancy is None:
+            occupancy = Occupancy.from_chromosome(encoding, slots, rooms, faculty)
+        self.occupancy = occupancy
+        self.fitness = occupancy.fitness if occupancy is not None else None
+        self.seed = None # Set by run_scheduler on the timetable it returns
+        self.stats = None # Likewise: where the run spent its time (see metrics.new_run_stats)
+
+    @classmethod
+    def empty(cls, encoding):
+        return cls(encoding, array('i'), array('i'), array('i'))
+
+    @property
+    def genes(self):
+        return [self.encoding.gene(i, self.slots[i], self.rooms[i], self.faculty[i])
+                for i in range(len(self.slots))]
+
+    def copy(self):
+        occupancy = None if self.occupancy is None else self.occupancy.copy()
+        clone = Timetable(self.encoding, self.slots, self.rooms, self.faculty, occupancy, track=False)
+        clone.fitness = self.fitness
+        self._shared = clone._shared = True
+        return clone
 
     def calculate_fitness(self):
-        conflicts = 0
-        
-        # --- HARD CONSTRAINTS (High penalty) ---
-        teacher_slots = defaultdict(int)
-        room_slots = defaultdict(int)
-        batch_slots = defaultdict(int)
-
-        for gene in self.genes:
-            teacher_slots[(gene.day, gene.timeslot, gene.faculty)] += 1
-            room_slots[(gene.day, gene.timeslot, gene.room)] += 1
-            batch_slots[(gene.day, gene.timeslot, gene.batch)] += 1
-
-        conflicts += sum(v - 1 for v in teacher_slots.values() if v > 1) * 10
-        conflicts += sum(v - 1 for v in room_slots.values() if v > 1) * 10
-        conflicts += sum(v - 1 for v in batch_slots.values() if v > 1) * 10
-
-        # --- SOFT CONSTRAINTS (Lower penalty) ---
-        for batch in self.config['batches']:
-            for day in self.config['days']:
-                day_classes = sorted([g for g in self.genes if g.batch == batch and g.day == day], 
-                                     key=lambda g: self.config['timeslots'].index(g.timeslot))
-                
-                consecutive_count = 1
-                for i in range(1, len(day_classes)):
-                    current_slot_index = self.config['timeslots'].index(day_classes[i].timeslot)
-                    prev_slot_index = self.config['timeslots'].index(day_classes[i-1].timeslot)
-                    if current_slot_index == prev_slot_index + 1:
-                        consecutive_count += 1
-                    else:
-                        consecutive_count = 1
-                    
-                    if consecutive_count > 2:
-                        conflicts += 1
-
-        return conflicts
-
-# --- (The helper functions like create_individual, selection, crossover, mutate also remain the same) ---
-def create_individual(config):
-    genes = []
-    if not config.get('subjects') or not config.get('rooms'):
-        return Timetable([], config) # Return empty timetable if no subjects/rooms
-
-    for subject_code, details in config['subjects'].items():
-        for batch in details.get('batches', []):
-            for _ in range(details.get('hours_per_week', 0)):
-                possible_faculty = [f_name for f_name, f_details in config['faculty'].items() if subject_code in f_details.get('subjects', [])]
-                if not possible_faculty: continue
-                
-                gene = Gene(
-                    day=random.choice(config['days']),
-                    timeslot=random.choice(config['timeslots']),
-                    room=random.choice(config['rooms']),
-                    batch=batch,
-                    subject=subject_code,
-                    faculty=random.choice(possible_faculty)
-                )
-                genes.append(gene)
-    return Timetable(genes, config)
-
-def run_scheduler(input_data):
-    # --- CONFIGURATION ---
-    POPULATION_SIZE = 100
-    MAX_GENERATIONS = 300
-    MUTATION_RATE = 0.1
-    # --- NEW: STAGNATION CONFIGURATION ---
-    # Stop if the best score doesn't improve for this many generations
-    STAGNATION_LIMIT = 50 
+        """Full recompute from the chromosome; the incremental updates must always agree with this."""
+        self.occupancy = Occupancy.from_chromosome(self.encoding, self.slots, self.rooms, self.faculty)
+        return self.occupancy.fitness
+
+    def assign(self, index, slot, room, faculty):
+        """Move one session, updating occupancy and fitness incrementally."""
+        old = (self.slots[index], self.rooms[index], self.faculty[index])
+        if old == (slot, room, faculty):
+            return
+        if self._shared:
+            # The columns are a few hundred ints each; copying them whole keeps reads plain array indexing
+            self.slots, self.rooms, self.faculty = self.slots[:], self.rooms[:], self.faculty[:]
+            self._shared = False
+        self.slots[index] = slot
+        self.rooms[index] = room
+        self.faculty[index] = faculty
+        if self.occupancy is None:
+            self.fitness = None # Left for the batched evaluator
+            return
+        self.occupancy.remove(index, *old)
+        self.occupancy.add(index, slot, room, faculty)
+        self.fitness = self.occupancy.fitness
+
+# --- Helper functions: create_individual, selection, crossover, mutate ---
+# Every randomized helper takes an `rng` (a random.Random, or the random module
+# itself by default) so a seeded run never touches the global generator.
+def create_individual(encoding, track=True, rng=random):
+    if not encoding.subjects or not encoding.rooms:
+        return Timetable.empty(encoding) # Return empty timetable if no subjects/rooms
+
+    n = len(encoding)
+    if encoding.fully_available:
+        slots = array('i', (rng.randrange(encoding.n_slots) for _ in range(n)))
+        rooms = array('i', (rng.randrange(len(encoding.rooms)) for _ in range(n)))
+        faculty = array('i', (rng.choice(options) for options in encoding.session_faculty_options))
+    else: # Only draw times and rooms that are available
+        faculty = array('i', (rng.choice(options) for options in encoding.session_faculty_options))
+        slots = array('i', (random_slot(encoding, (f,), rng) for f in faculty))
+        rooms = array('i', (random_room(encoding, s, rng) for s in slots))
+    return Timetable(encoding, slots, rooms, faculty, track=track)
+
+def random_bit(mask, rng=random):
+    """Index of a random set bit of a non-zero int bitmask.
+
+    Dense masks (the usual case) are sampled by a few random probes, so the cost does
+    not grow with the number of bits; sparse ones fall back to listing the set bits.
+    """
+    width = mask.bit_length()
+    for _ in range(4):
+        k = rng.randrange(width)
+        if mask >> k & 1:
+            return k
+    bits = []
+    k = 0
+    while mask:
+        if mask & 1:
+            bits.append(k)
+        mask >>= 1
+        k += 1
+    return rng.choice(bits)
+
+def construct_individual(encoding, track=True, rng=random):
+    """Randomized greedy construction of a near-feasible timetable.
+
+    Sessions with the fewest qualified faculty go first (random order among equals).
+    Each goes into a random slot where its batch, one of its faculty and some room
+    are all still free. Availability is kept as int bitmasks (bit k = slot k; per
+    slot, bit r = room r), so finding those slots is a handful of AND/OR operations.
+    When no slot is fully free the one clashing on the fewest resources is used.
+    Rooms big enough for the batch are preferred among the free ones.
+    """
+    if not encoding.subjects or not encoding.rooms:
+        return Timetable.empty(encoding)
+
+    n = len(encoding)
+    n_slots = encoding.n_slots
+    n_rooms = len(encoding.rooms)
+    all_slots = (1 << n_slots) - 1
+    all_rooms = (1 << n_rooms) - 1
+    batch_busy = [0] * len(encoding.batches) # slots each batch is already in class
+    # Unavailable teachers and rooms start out booked, so they are avoided like clashes
+    teacher_busy = [all_slots & ~mask for mask in encoding.faculty_available] # slots each faculty member can't teach
+    rooms_busy = [all_rooms & ~mask for mask in encoding.slot_rooms]          # rooms taken in each slot
+    full_slots = 0                                                            # slots with every room taken
+    for s, busy in enumerate(rooms_busy):
+        if busy == all_rooms:
+            full_slots |= 1 << s
+
+    slots, rooms, faculty = array('i', [0] * n), array('i', [0] * n), array('i', [0] * n)
+    options = encoding.session_faculty_options
+    order = sorted(range(n), key=lambda i: (len(options[i]), rng.random()))
+    for i in order:
+        batch = encoding.session_batch[i]
+        batch_free = ~batch_busy[batch] & all_slots
+        teacher_free = 0
+        for f in options[i]:
+            teacher_free |= ~teacher_busy[f]
+        teacher_free &= all_slots
+        room_free = ~full_slots & all_slots
+
+        # Fully free if possible, else give up one resource at a time
+        for mask in (batch_free & teacher_free & room_free,
+                     batch_free & room_free, batch_free & teacher_free, teacher_free & room_free,
+                     batch_free, teacher_free, room_free, all_slots):
+            if mask:
+                break
+        s = random_bit(mask, rng)
+        f = rng.choice([f for f in options[i] if not teacher_busy[f] >> s & 1] or options[i])
+        free_rooms = ~rooms_busy[s] & all_rooms
+        fitting_rooms = free_rooms & encoding.room_fits[batch]
+        r = random_bit(fitting_rooms or free_rooms, rng) if free_rooms else rng.randrange(n_rooms)
+
+        slots[i], rooms[i], faculty[i] = s, r, f
+        batch_busy[batch] |= 1 << s
+        teacher_busy[f] |= 1 << s
+        rooms_busy[s] |= 1 << r
+        if rooms_busy[s] == all_rooms:
+            full_slots |= 1 << s
+
+    return Timetable(encoding, slots, rooms, faculty, track=track)
+
+def random_slot(encoding, faculty_options, rng=random):
+    """A random slot in which at least one of faculty_options is available (any slot if none is)."""
+    if encoding.fully_available:
+        return rng.randrange(encoding.n_slots)
+    mask = 0
+    for f in faculty_options:
+        mask |= encoding.faculty_available[f]
+    return random_bit(mask or encoding.all_slots, rng)
+
+def random_room(encoding, slot, rng=random):
+    """A random room available in slot (any room if none is)."""
+    mask = encoding.slot_rooms[slot]
+    if encoding.fully_available or not mask:
+        return rng.randrange(len(encoding.rooms))
+    return random_bit(mask, rng)
+
+def available_rooms(encoding, slot, rooms):
+    """The candidate rooms usable in slot, or all of them if none is."""
+    if encoding.fully_available:
+        return rooms
+    mask = encoding.slot_rooms[slot]
+    return [r for r in rooms if mask >> r & 1] or rooms
+
+def available_faculty(encoding, slot, faculty_options):
+    """The candidate teachers available in slot, or all of them if none is."""
+    if encoding.fully_available:
+        return faculty_options
+    available = encoding.faculty_available
+    return [f for f in faculty_options if available[f] >> slot & 1] or faculty_options
+
+# How run_scheduler builds generation 0:
+# - 'random': uniform random day/timeslot/room per session (create_individual)
+# - 'heuristic': randomized most-constrained-first construction (construct_individual)
+INITIALIZERS = {'random': create_individual, 'heuristic': construct_individual}
+
+def cheapest_placement(occupancy, index, slot=None, room=None, faculty=None, rng=random):
+    """Slot, room and faculty for session `index` that add the fewest clashes to occupancy.
+
+    Any of slot/room/faculty that is given is kept fixed; ties are broken at random.
+    """
+    encoding = occupancy.encoding
+    n_slots = encoding.n_slots
+    batch = encoding.session_batch[index]
+    rooms = range(len(encoding.rooms)) if room is None else (room,)
+    faculty_options = encoding.session_faculty_options[index] if faculty is None else (faculty,)
+    if slot is not None:
+        slots = (slot,)
+    elif encoding.fully_available:
+        slots = range(n_slots)
+    else: # Only slots in which one of the teachers is available
+        mask = 0
+        for f in faculty_options:
+            mask |= encoding.faculty_available[f]
+        slots = [s for s in range(n_slots) if mask >> s & 1] or range(n_slots)
+
+    room_rows = [occupancy.room_slots[r] for r in rooms]
+    teacher_rows = [occupancy.teacher_slots[f] for f in faculty_options]
+    batch_row = occupancy.batch_slots[batch]
+    best_cost, best = None, []
+    for s in slots:
+        room_cost = min(row[s] for row in room_rows)
+        teacher_cost = min(row[s] for row in teacher_rows)
+        cost = batch_row[s] + room_cost + teacher_cost
+        if best_cost is None or cost < best_cost:
+            best_cost, best = cost, [s]
+        elif cost == best_cost:
+            best.append(s)
+    s = rng.choice(best)
+    return (s, least_booked(occupancy.room_slots, available_rooms(encoding, s, rooms), s, rng),
+            least_booked(occupancy.teacher_slots, available_faculty(encoding, s, faculty_options), s, rng))
+
+def conflicted_sessions(timetable):
+    """Indices of sessions sharing their slot's teacher, room or batch with another session."""
+    occupancy = timetable.occupancy
+    teacher_slots, room_slots, batch_slots = occupancy.teacher_slots, occupancy.room_slots, occupancy.batch_slots
+    session_batch = timetable.encoding.session_batch
+    slots, rooms, faculty = timetable.slots, timetable.rooms, timetable.faculty
+    return [i for i in range(len(slots))
+            if teacher_slots[faculty[i]][slots[i]] > 1 or room_slots[rooms[i]][slots[i]] > 1
+            or batch_slots[session_batch[i]][slots[i]] > 1]
+
+def least_booked(rows, candidates, slot, rng=random):
+    """A random candidate resource among those with the fewest bookings in slot (rows: per-resource counts)."""
+    bookings = [rows[c][slot] for c in candidates]
+    fewest = min(bookings)
+    return rng.choice([c for c, booked in zip(candidates, bookings) if booked == fewest])
+
+def warm_start_individual(encoding, previous, track=True, rng=random):
+    """Rebuild a previous timetable (a list of session dicts) against the current input.
+
+    Sessions are matched to the new input by batch and subject. Whatever is still
+    valid is kept as-is; a room, faculty member or timeslot that no longer exists
+    is re-chosen greedily, and sessions with no previous placement are placed at
+    their cheapest slot. Returns (timetable, number of sessions repaired).
+    """
+    day_ids, timeslot_ids = encoding.day_ids, encoding.timeslot_ids
+    room_ids, faculty_ids = encoding.room_ids, encoding.faculty_ids
+    n_timeslots = len(encoding.timeslots)
+
+    placements = {}
+    for entry in previous:
+        placements.setdefault((entry['batch'], entry['subject']), []).append(entry)
+
+    n = len(encoding)
+    slots, rooms, faculty = array('i', [0] * n), array('i', [0] * n), array('i', [0] * n)
+    occupancy = Occupancy(encoding)
+    to_repair = []
+    for i in range(n):
+        key = (encoding.batches[encoding.session_batch[i]], encoding.subjects[encoding.session_subject[i]])
+        entry = placements[key].pop() if placements.get(key) else {}
+        slot = None
+        if entry.get('day') in day_ids and entry.get('timeslot') in timeslot_ids:
+            slot = day_ids[entry['day']] * n_timeslots + timeslot_ids[entry['timeslot']]
+        room = room_ids.get(entry.get('room'))
+        teacher = faculty_ids.get(entry.get('faculty'))
+        if teacher not in encoding.session_faculty_options[i]:
+            teacher = None
+        if slot is None or room is None or teacher is None:
+            to_repair.append((i, slot, room, teacher))
+            continue
+        slots[i], rooms[i], faculty[i] = slot, room, teacher
+        occupancy.add(i, slot, room, teacher)
+
+    # Repair after every intact session is booked, so repairs avoid them
+    for i, slot, room, teacher in to_repair:
+        slots[i], rooms[i], faculty[i] = cheapest_placement(occupancy, i, slot, room, teacher, rng)
+        occupancy.add(i, slots[i], rooms[i], faculty[i])
+
+    timetable = Timetable(encoding, slots, rooms, faculty, occupancy if track else None, track=track)
+    return timetable, len(to_repair)
+
+# Fitness engines run_scheduler can use:
+# - 'incremental': every timetable keeps an Occupancy and is re-scored per gene touched
+# - 'numpy': each new generation is scored in one batch by scheduler_numpy.evaluate_population
+ENGINES = ('incremental', 'numpy')
+
+# --- CONFIGURATION (defaults; every value can be overridden per run_scheduler call) ---
+# None sizes the population from the number of sessions (see population_size_for)
+POPULATION_SIZE = None
+MIN_POPULATION_SIZE = 20
+MAX_POPULATION_SIZE = 200
+# Only a backstop: runs end on the time limit or when improvement stalls (below)
+MAX_GENERATIONS = 1000
+# Starting values; with ADAPTIVE they follow the population's diversity every generation
+MUTATION_RATE = 0.1
+TOURNAMENT_SIZE = 5
+ADAPTIVE = True
+# Diversity = share of sessions placed differently from the best timetable (sampled
+# among the fittest).
+# Below DIVERSITY_LOW the search explores more (higher mutation rate, smaller
+# tournaments); above DIVERSITY_HIGH it exploits more. Each stays within its range.
+DIVERSITY_LOW = 0.15
+DIVERSITY_HIGH = 0.4
+DIVERSITY_SAMPLE = 8
+MUTATION_RATE_RANGE = (0.02, 0.6)
+TOURNAMENT_SIZE_RANGE = (2, 8)
+# Share of mutations that move a clashing session (to its cheapest placement) when there is one
+CONFLICT_MUTATION_PROBABILITY = 0.8
+# Stop once the best score improved by less than MIN_IMPROVEMENT (a fraction of it)
+# over the last STAGNATION_LIMIT generations; 0 = stop only when it stopped improving
+STAGNATION_LIMIT = 50
+MIN_IMPROVEMENT = 0.01
+# How generation 0 is seeded, see INITIALIZERS
+INITIALIZATION = 'heuristic'
+# Share of sessions moved at random in each perturbed copy of a warm-start timetable
+WARM_START_PERTURBATION = 0.05
+# Solver strategies run_scheduler can use:
+# - 'ga': the genetic algorithm alone
+# - 'ga+ls': the GA, then local_search.refine on its best timetable
+# - 'ls': local search alone, from one constructed (or warm-started) timetable
+STRATEGIES = ('ga', 'ga+ls', 'ls')
+STRATEGY = 'ga'
+# Solver backends:
+# - 'ga': the metaheuristic strategies above
+# - 'cpsat': exact OR-Tools CP-SAT model (cpsat_backend.py); falls back to 'ga' when OR-Tools
+#   is missing or no timetable is found within its time limit
+BACKENDS = ('ga', 'cpsat')
+BACKEND = 'ga'
+# --- ISLAND MODEL: subpopulations evolving in separate processes (see islands.py) ---
+ISLANDS = 1              # 1 = a single population in this process
+MIGRATION_INTERVAL = 10  # generations between elite exchanges
+MIGRANTS = 2             # elites each island sends to its neighbour per exchange
+
+def population_size_for(n_sessions):
+    """Population size for an instance: grows with the square root of its sessions."""
+    return max(MIN_POPULATION_SIZE, min(MAX_POPULATION_SIZE, round(8 * math.sqrt(n_sessions))))
+
+fitness_of = attrgetter('fitness')
+
+class Population:
+    """One generation's timetables in breeding order, never sorted.
+
+    The best timetable is tracked as members are added, and the elites or the
+    survivors of an immigration are picked by a counting selection over the
+    (integer) fitness values in O(n), so no generation pays for an O(n log n) sort.
+    Members must already have a fitness.
+    """
+    def __init__(self, members=()):
+        self.members = list(members)
+        self.best = min(self.members, key=fitness_of, default=None) # The first of any tied best
+
+    def add(self, timetable):
+        self.members.append(timetable)
+        if self.best is None or timetable.fitness < self.best.fitness:
+            self.best = timetable
+
+    def __len__(self):
+        return len(self.members)
+
+    def __iter__(self):
+        return iter(self.members)
+
+    def smallest(self, count):
+        """The `count` fittest members, in breeding order (so are ties among them)."""
+        members = self.members
+        if count <= 0:
+            return []
+        if count == 1:
+            return [self.best]
+        if count >= len(members):
+            return list(members)
+        # Find the fitness of the count-th best ("nth element"), then take everything
+        # fitter and as many as needed of those tied at that fitness
+        counts = Counter(map(fitness_of, members))
+        remaining = count
+        for cutoff in sorted(counts):
+            if counts[cutoff] >= remaining:
+                break
+            remaining -= counts[cutoff]
+        chosen = [t for t in members if t.fitness < cutoff]
+        chosen.extend(islice((t for t in members if t.fitness == cutoff), remaining))
+        return chosen
+
+class GeneticAlgorithm:
+    """One evolving population (see Population).
+
+    run_scheduler drives a single instance; the island model drives one per process
+    and moves elites between them with elites() / immigrate(). Passing `previous`
+    (a list of session dicts) warm-starts the population from that timetable.
+    All randomness comes from `rng` (a random.Random; a fresh unseeded one by default),
+    so populations in the same process never disturb each other's sequence.
+    With adaptive=True the mutation rate and tournament size are retuned from the
+    population's diversity before every generation (see adapt()).
+    """
+    def __init__(self, encoding, population_size=POPULATION_SIZE, mutation_rate=MUTATION_RATE, engine='incremental',
+                 previous=None, init=INITIALIZATION, rng=None, adaptive=ADAPTIVE, tournament_size=TOURNAMENT_SIZE):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown fitness engine '{engine}'. Choose one of: {', '.join(ENGINES)}")
+        if init not in INITIALIZERS:
+            raise ValueError(f"Unknown initialization '{init}'. Choose one of: {', '.join(INITIALIZERS)}")
+        self.encoding = encoding
+        self.population_size = population_size if population_size is not None else population_size_for(len(encoding))
+        population_size = self.population_size
+        self.mutation_rate = mutation_rate
+        self.tournament_size = tournament_size
+        self.adaptive = adaptive
+        self.diversity = None # Of the last generation, when adaptive
+        self.rng = rng if rng is not None else random.Random()
+        self.track = engine == 'incremental'
+        self.evaluate_population = None
+        if not self.track:
+            from scheduler_numpy import evaluate_population
+            self.evaluate_population = evaluate_population
+
+        self.stats = new_run_stats() # Time per stage, evaluations and generations of this population
+        started = time.perf_counter()
+        if previous:
+            self.population = self.warm_start_population(previous)
+        else:
+            self.population = [INITIALIZERS[init](encoding, self.track, self.rng) for _ in range(population_size)]
+        self.stats["stages"]["init"] += time.perf_counter() - started
+        self._evaluate(self.population)
+        self.stats["evaluations"] += len(self.population)
+        self.population = Population(self.population)
+        self.generation = 0
+
+    @property
+    def best(self):
+        return self.population.best
+
+    def warm_start_population(self, previous):
+        """The repaired previous timetable plus lightly perturbed copies of it."""
+        rng = self.rng
+        seed, repaired = warm_start_individual(self.encoding, previous, self.track, rng)
+        logger.debug("Warm start: reused %d sessions, repaired %d.", len(seed.slots) - repaired, repaired)
+        population = [seed]
+        n = len(seed.slots)
+        moves = max(1, int(n * WARM_START_PERTURBATION))
+        while len(population) < self.population_size:
+            copy = seed.copy()
+            for _ in range(rng.randint(1, moves)):
+                index = rng.randrange(n)
+                slot = random_slot(self.encoding, (copy.faculty[index],), rng)
+                copy.assign(index, slot, random_room(self.encoding, slot, rng), copy.faculty[index])
+            population.append(copy)
+        return population
+
+    def _evaluate(self, timetables):
+        if self.evaluate_population is not None:
+            started = time.perf_counter()
+            self.evaluate_population(self.encoding, [t for t in timetables if t.fitness is None])
+            self.stats["stages"]["evaluation"] += time.perf_counter() - started
 
     # --- Helper functions ---
-    def create_population(size, config):
-        return [create_individual(config) for _ in range(size)]
+    def selection(self):
+        # Contestants are drawn with replacement: rng.choices is far cheaper than
+        # rng.sample on large populations, and min() needs no sort
+        return min(self.rng.choices(self.population.members, k=self.tournament_size), key=fitness_of)
+
+    def measure_diversity(self):
+        """Mean share of sessions whose slot differs from the best timetable's, over the
+        next DIVERSITY_SAMPLE fittest timetables (no randomness consumed). Sampling the
+        fittest keeps the measure about the individuals selection actually favours."""
+        best = self.population.best
+        n = len(best.slots)
+        others = [t for t in self.population.smallest(DIVERSITY_SAMPLE + 1) if t is not best][:DIVERSITY_SAMPLE]
+        if not n or not others:
+            return 0.0
+        best_slots = best.slots
+        differing = 0
+        for other in others:
+            if other.slots is not best_slots: # Unchanged copies share their columns
+                differing += sum(a != b for a, b in zip(best_slots, other.slots))
+        return differing / (n * len(others))
 
-    def selection(population):
-        tournament = random.sample(population, 5)
-        return sorted(tournament, key=lambda x: x.fitness)[0]
+    def adapt(self):
+        """Explore when the population has converged, exploit while it is diverse."""
+        self.diversity = self.measure_diversity()
+        low_rate, high_rate = MUTATION_RATE_RANGE
+        small, large = TOURNAMENT_SIZE_RANGE
+        if self.diversity < DIVERSITY_LOW:
+            self.mutation_rate = min(high_rate, self.mutation_rate * 1.5)
+            self.tournament_size = max(small, self.tournament_size - 1)
+        elif self.diversity > DIVERSITY_HIGH:
+            self.mutation_rate = max(low_rate, self.mutation_rate / 1.5)
+            self.tournament_size = min(large, self.tournament_size + 1)
 
-    def crossover(parent1, parent2):
+    def crossover(self, parent1, parent2):
         # Gracefully handle cases with very few classes
-        if not parent1.genes or not parent2.genes or len(parent1.genes) <= 1:
-            return Timetable(parent1.genes, parent1.config), Timetable(parent2.genes, parent2.config)
-        
-        crossover_point = random.randint(1, len(parent1.genes) - 1)
-        child1_genes = parent1.genes[:crossover_point] + parent2.genes[crossover_point:]
-        child2_genes = parent2.genes[:crossover_point] + parent1.genes[crossover_point:]
-        return Timetable(child1_genes, parent1.config), Timetable(child2_genes, parent2.config)
-
-    def mutate(timetable):
-        if random.random() < MUTATION_RATE and timetable.genes:
-            gene_to_mutate = random.choice(timetable.genes)
-            gene_to_mutate.day = random.choice(timetable.config['days'])
-            gene_to_mutate.timeslot = random.choice(timetable.config['timeslots'])
-            gene_to_mutate.room = random.choice(timetable.config['rooms'])
-        timetable.fitness = timetable.calculate_fitness()
+        if len(parent1.slots) <= 1:
+            return parent1.copy(), parent2.copy()
+
+        crossover_point = self.rng.randint(1, len(parent1.slots) - 1)
+        if not self.track:
+            return (Timetable(parent1.encoding,
+                              parent1.slots[:crossover_point] + parent2.slots[crossover_point:],
+                              parent1.rooms[:crossover_point] + parent2.rooms[crossover_point:],
+                              parent1.faculty[:crossover_point] + parent2.faculty[crossover_point:],
+                              track=False),
+                    Timetable(parent2.encoding,
+                              parent2.slots[:crossover_point] + parent1.slots[crossover_point:],
+                              parent2.rooms[:crossover_point] + parent1.rooms[crossover_point:],
+                              parent2.faculty[:crossover_point] + parent1.faculty[crossover_point:],
+                              track=False))
+        return (self.splice(parent1, parent2, crossover_point),
+                self.splice(parent2, parent1, crossover_point))
+
+    @staticmethod
+    def splice(head, tail, crossover_point):
+        # Start from whichever parent contributes more genes and patch in the rest,
+        # so only the smaller side (and only sessions that actually differ) is re-booked.
+        n = len(head.slots)
+        if crossover_point * 2 >= n:
+            base, donor, indices = head, tail, range(crossover_point, n)
+        else:
+            base, donor, indices = tail, head, range(crossover_point)
+        child = base.copy()
+        for i in indices:
+            child.assign(i, donor.slots[i], donor.rooms[i], donor.faculty[i])
+        return child
+
+    def mutate(self, timetable):
+        """Usually move a clashing session to its cheapest placement; otherwise (or when
+        nothing clashes, or without an Occupancy to find clashes) move a random one anywhere."""
+        # Fitness is maintained incrementally, so an untouched timetable needs no work
+        rng = self.rng
+        if rng.random() < self.mutation_rate and len(timetable.slots):
+            if timetable.occupancy is not None and rng.random() < CONFLICT_MUTATION_PROBABILITY:
+                conflicted = conflicted_sessions(timetable)
+                if conflicted:
+                    index = rng.choice(conflicted)
+                    timetable.assign(index, *cheapest_placement(timetable.occupancy, index, rng=rng))
+                    return timetable
+            encoding = timetable.encoding
+            index = rng.randrange(len(timetable.slots))
+            slot = random_slot(encoding, (timetable.faculty[index],), rng)
+            timetable.assign(index, slot, random_room(encoding, slot, rng), timetable.faculty[index])
         return timetable
 
-    # --- Main GA loop ---
-    population = create_population(POPULATION_SIZE, input_data)
-    if not population or not population[0].genes:
-        print("Warning: Initial population is empty. Check input data (especially faculty-subject assignments).")
-        return Timetable([], input_data) # Return an empty result immediately
+    def step(self):
+        """Breed the next generation: keep the best 10%, fill the rest from tournaments."""
+        perf = time.perf_counter # Stage timings are summed locally and stored once per generation
+        started = perf()
+        if self.adaptive:
+            self.adapt()
+        elite_count = self.population_size // 10
+        next_generation = self.population.smallest(elite_count)
+        selection_time = perf() - started
+        crossover_time = mutation_time = 0.0
+        while len(next_generation) < self.population_size:
+            started = perf()
+            p1, p2 = self.selection(), self.selection()
+            selected = perf()
+            c1, c2 = self.crossover(p1, p2)
+            crossed = perf()
+            next_generation.append(self.mutate(c1))
+            if len(next_generation) < self.population_size:
+                next_generation.append(self.mutate(c2))
+            mutation_time += perf() - crossed
+            crossover_time += crossed - selected
+            selection_time += selected - started
+
+        self._evaluate(next_generation)
+        self.population = Population(next_generation)
+        stages = self.stats["stages"]
+        stages["selection"] += selection_time
+        stages["crossover"] += crossover_time
+        stages["mutation"] += mutation_time
+        self.stats["evaluations"] += len(next_generation) - elite_count
+        self.stats["generations"] += 1
+        self.generation += 1
+
+    def elites(self, count):
+        return self.population.smallest(count)
+
+    def immigrate(self, timetables):
+        """Replace the worst individuals with incoming timetables (sharing this encoding)."""
+        if not timetables:
+            return
+        self._evaluate(timetables)
+        self.stats["evaluations"] += len(timetables)
+        keep = max(self.population_size - len(timetables), 0)
+        self.population = Population(self.population.smallest(keep) + list(timetables))
+
+def evolve(ga, max_generations=MAX_GENERATIONS, stagnation_limit=STAGNATION_LIMIT, time_limit=None, on_generation=None,
+           min_improvement=MIN_IMPROVEMENT):
+    """Main GA loop shared by run_scheduler and the island workers.
+
+    Stops on a perfect timetable, the time limit, max_generations, or when the best
+    fitness improved by less than min_improvement (a fraction of it) over the last
+    stagnation_limit generations. on_generation(ga) runs before each breeding step;
+    returning True stops the loop.
+    """
+    started = time.monotonic()
 
     # --- NEW: TRACKING VARIABLES FOR STAGNATION ---
     best_fitness_so_far = float('inf')
-    generations_without_improvement = 0
+    best_history = [] # Best fitness at each generation, for the improvement rate
 
-    for generation in range(MAX_GENERATIONS):
-        population = sorted(population, key=lambda x: x.fitness)
-        
-        current_best_fitness = population[0].fitness
+    for generation in range(max_generations):
+        current_best_fitness = ga.best.fitness
+        best_history.append(current_best_fitness)
 
         # --- NEW: STAGNATION CHECK LOGIC ---
         if current_best_fitness < best_fitness_so_far:
             best_fitness_so_far = current_best_fitness
-            generations_without_improvement = 0
-            print(f"Gen {generation}: New Best Fitness = {best_fitness_so_far}")
-        else:
-            generations_without_improvement += 1
-        
+            logger.debug("Gen %d: New Best Fitness = %s", generation, best_fitness_so_far)
+
         # --- MODIFIED EXIT CONDITIONS ---
         # 1. If we found a perfect solution, stop.
         if current_best_fitness == 0:
-            print(f"Perfect solution found in generation {generation}!")
+            logger.debug("Perfect solution found in generation %d!", generation)
             break
-        
-        # 2. If the solution hasn't improved in a while, stop.
-        if generations_without_improvement >= STAGNATION_LIMIT:
-            print(f"Stopping early due to stagnation at generation {generation}.")
+
+        # 2. If the solution has (almost) stopped improving, stop.
+        if generation >= stagnation_limit:
+            window_start = best_history[generation - stagnation_limit]
+            if window_start - current_best_fitness <= min_improvement * window_start:
+                logger.debug("Stopping early due to stagnation at generation %d.", generation)
+                break
+
+        # 3. If the caller's time budget is spent, stop with what we have.
+        if time_limit is not None and time.monotonic() - started >= time_limit:
+            logger.debug("Stopping at generation %d: time limit of %.1fs reached.", generation, time_limit)
+            break
+
+        # 4. If the caller (e.g. an island receiving a stop signal) says so, stop.
+        if on_generation is not None and on_generation(ga):
             break
         # --- END OF MODIFIED LOGIC ---
 
-        # Create the next generation
-        next_generation = population[:POPULATION_SIZE // 10]
-        while len(next_generation) < POPULATION_SIZE:
-            p1, p2 = selection(population), selection(population)
-            c1, c2 = crossover(p1, p2)
-            next_generation.append(mutate(c1))
-            if len(next_generation) < POPULATION_SIZE:
-                next_generation.append(mutate(c2))
-        
-        population = next_generation
-    
-    best_timetable = sorted(population, key=lambda x: x.fitness)[0]
-    print(f"Finished. Best timetable found has fitness: {best_timetable.fitness}")
-    return best_timetable
\ No newline at end of file
+        ga.step()
+
+    return ga.best
+
+def run_scheduler(input_data, engine='incremental', time_limit=None,
+                  population_size=POPULATION_SIZE, max_generations=MAX_GENERATIONS,
+                  mutation_rate=MUTATION_RATE, stagnation_limit=STAGNATION_LIMIT, min_improvement=MIN_IMPROVEMENT,
+                  adaptive=ADAPTIVE,
+                  islands=ISLANDS, migration_interval=MIGRATION_INTERVAL, migrants=MIGRANTS,
+                  previous=None, init=INITIALIZATION, strategy=STRATEGY, ls_time_limit=None,
+                  backend=BACKEND, exact_time_limit=None, seed=None, on_progress=None, should_stop=None):
+    """Evolve a timetable for input_data and return the best one found.
+
+    time_limit (seconds) stops the search early and returns the best-so-far result.
+    population_size=None sizes the population from the number of sessions; the GA stops
+    once the best fitness improves by less than min_improvement (a fraction) within
+    stagnation_limit generations, max_generations being only a backstop. adaptive
+    retunes mutation rate and tournament size from population diversity as it runs.
+    With islands > 1 the population is split over that many processes which swap
+    `migrants` elites every `migration_interval` generations (see islands.py).
+    on_progress(generation, best_fitness) is called every generation, and the search
+    stops with its best-so-far result as soon as should_stop() returns True.
+    previous (a list of session dicts, e.g. an earlier result) warm-starts the search:
+    sessions still valid for this input are kept and only the rest are repaired.
+    init picks how a cold start seeds generation 0: 'heuristic' (default) or 'random'.
+    strategy picks the solver (see STRATEGIES); the local-search stage gets its own
+    ls_time_limit (default local_search.LOCAL_SEARCH_TIME_LIMIT), capped by time_limit.
+    backend='cpsat' first tries the exact solver for up to exact_time_limit seconds
+    (default cpsat_backend.CPSAT_TIME_LIMIT) and only runs the strategy if it fails.
+    seed makes the run reproducible (given no time limit cuts it short); without one
+    a fresh seed is drawn. Either way it is logged (at DEBUG) and set on the returned timetable,
+    along with .stats: where the run spent its time (see metrics.new_run_stats).
+    """
+    started = time.monotonic()
+    stats = new_run_stats()
+
+    def finish(timetable):
+        timetable.seed = seed
+        stats["seconds"] = time.monotonic() - started
+        timetable.stats = stats
+        return timetable
+    if seed is None:
+        seed = random.SystemRandom().randrange(2**32)
+    rng = random.Random(seed)
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown solver strategy '{strategy}'. Choose one of: {', '.join(STRATEGIES)}")
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown solver backend '{backend}'. Choose one of: {', '.join(BACKENDS)}")
+    encoding = Encoding(input_data)
+    if not len(encoding) or not encoding.rooms or not encoding.n_slots:
+        logger.warning("Initial population is empty. Check input data (especially faculty-subject assignments).")
+        return finish(Timetable.empty(encoding)) # Return an empty result immediately
+
+    def remaining():
+        return None if time_limit is None else max(0.0, time_limit - (time.monotonic() - started))
+
+    def single_timetable():
+        """One warm-started or constructed timetable, without any search."""
+        init_started = time.perf_counter()
+        if previous:
+            timetable, _ = warm_start_individual(encoding, previous, rng=rng)
+        else:
+            timetable = INITIALIZERS[init](encoding, rng=rng)
+        stats["stages"]["init"] += time.perf_counter() - init_started
+        return timetable
+
+    if backend == 'cpsat':
+        from cpsat_backend import solve_cpsat, CPSAT_TIME_LIMIT
+        budget = CPSAT_TIME_LIMIT if exact_time_limit is None else exact_time_limit
+        if time_limit is not None:
+            budget = min(budget, remaining())
+        exact_started = time.perf_counter()
+        timetable, status = solve_cpsat(encoding, budget, should_stop=should_stop, seed=seed)
+        stats["stages"]["cpsat"] += time.perf_counter() - exact_started
+        if timetable is not None:
+            if on_progress is not None:
+                on_progress(0, timetable.fitness)
+            logger.debug("Finished. CP-SAT (%s) timetable has fitness: %s (seed %s)", status, timetable.fitness, seed)
+            return finish(timetable)
+        if remaining() == 0 or (should_stop is not None and should_stop()):
+            # No time left for the fallback to breed a population in
+            logger.debug("CP-SAT found no timetable (%s) and the run is out of time; returning a constructed one.", status)
+            timetable = single_timetable()
+            if on_progress is not None:
+                on_progress(0, timetable.fitness)
+            return finish(timetable)
+        if status == 'INFEASIBLE':
+            logger.debug("CP-SAT proved that no clash-free timetable exists; the GA will return the least-conflicted one it finds.")
+        else:
+            logger.debug("CP-SAT found no timetable (%s); falling back to the genetic algorithm.", status)
+
+    generation = 0
+    if strategy == 'ls':
+        best_timetable = single_timetable()
+    elif islands > 1:
+        from islands import run_islands
+        best_timetable = run_islands(
+            encoding, islands, migration_interval, migrants, engine=engine, time_limit=remaining(),
+            population_size=population_size, max_generations=max_generations,
+            mutation_rate=mutation_rate, stagnation_limit=stagnation_limit,
+            min_improvement=min_improvement, adaptive=adaptive, previous=previous, init=init, rng=rng, on_progress=on_progress, should_stop=should_stop
+        )
+        merge_stats(stats, best_timetable.stats)
+    else:
+        def on_generation(ga):
+            if on_progress is not None:
+                on_progress(ga.generation, ga.best.fitness)
+            return should_stop is not None and should_stop()
+
+        ga = GeneticAlgorithm(encoding, population_size, mutation_rate, engine, previous, init, rng, adaptive)
+        best_timetable = evolve(ga, max_generations, stagnation_limit, remaining(), on_generation, min_improvement)
+        merge_stats(stats, ga.stats)
+        generation = ga.generation
+        if on_progress is not None:
+            on_progress(generation, best_timetable.fitness) # The last generation is never bred, so report it here
+
+    if strategy != 'ga':
+        from local_search import refine, LOCAL_SEARCH_TIME_LIMIT
+        budget = LOCAL_SEARCH_TIME_LIMIT if ls_time_limit is None else ls_time_limit
+        if time_limit is not None:
+            budget = min(budget, remaining())
+        report = None if on_progress is None else (lambda fitness: on_progress(generation, fitness))
+        search_started = time.perf_counter()
+        best_timetable = refine(best_timetable, budget, rng=rng, on_progress=report, should_stop=should_stop)
+        stats["stages"]["local_search"] += time.perf_counter() - search_started
+
+    logger.debug("Finished. Best timetable found has fitness: %s (seed %s)", best_timetable.fitness, seed)
+    return finish(best_timetable)
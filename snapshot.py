@@ -0,0 +1,74 @@
+# snapshot.py
+# Reads everything the scheduler needs from the database in a fixed number of queries.
+from collections import namedtuple
+
+from models import (db, Room, Batch, Faculty, Subject, ConstraintWeight, Day, Timeslot,
+                    FacultyUnavailability, RoomUnavailability, faculty_subject_association,
+                    batch_subject_association)
+
+# The time grid used while no days / timeslots are stored
+DEFAULT_DAYS = ("Mon", "Tue", "Wed", "Thu", "Fri")
+DEFAULT_TIMESLOTS = ("9-10", "10-11", "11-12", "1-2", "2-3")
+
+# Plain rows, ordered by id: rooms/batches are names, faculty (id, name), subjects
+# (code, name, hours_per_week), teaches {faculty id: [subject codes]}, enrolments
+# {subject code: [batch names]}, weights {rule: weight}, days / timeslots (names, in
+# order) and unavailable times as {"day", "timeslot"} entries (timeslot None for the
+# whole day) in faculty_unavailable {faculty id: [...]} and room_unavailable {room: [...]}
+Snapshot = namedtuple('Snapshot', 'rooms batches faculty subjects teaches enrolments weights '
+                                  'days timeslots faculty_unavailable room_unavailable')
+
+def load_time_grid():
+    """(days, timeslots) names in order; the defaults for whichever table is empty."""
+    days = [name for name, in db.session.query(Day.name).order_by(Day.position, Day.id)]
+    timeslots = [name for name, in db.session.query(Timeslot.name).order_by(Timeslot.position, Timeslot.id)]
+    return days or list(DEFAULT_DAYS), timeslots or list(DEFAULT_TIMESLOTS)
+
+def load_unavailability(model, owner, *joins):
+    """{owner: [{"day", "timeslot"}]} from FacultyUnavailability or RoomUnavailability, in one query."""
+    query = db.session.query(owner, Day.name, Timeslot.name).select_from(model)
+    for target, condition in joins:
+        query = query.join(target, condition)
+    entries = {}
+    for key, day, timeslot in (query.join(Day, Day.id == model.day_id)
+                               .outerjoin(Timeslot, Timeslot.id == model.timeslot_id)
+                               .order_by(model.id)):
+        entries.setdefault(key, []).append({"day": day, "timeslot": timeslot})
+    return entries
+
+def load_snapshot():
+    """The scheduler's view of the database in eleven queries, however many rows there are.
+
+    Only the needed columns are selected, so no ORM objects are built and nothing is
+    lazy-loaded afterwards: faculty-subject links come from one join over the
+    association table rather than one SELECT per faculty member.
+    """
+    rooms = [name for name, in db.session.query(Room.name).order_by(Room.id)]
+    batches = [name for name, in db.session.query(Batch.name).order_by(Batch.id)]
+    faculty = db.session.query(Faculty.id, Faculty.name).order_by(Faculty.id).all()
+    subjects = (db.session.query(Subject.code, Subject.name, Subject.hours_per_week)
+                .order_by(Subject.id).all())
+
+    links = faculty_subject_association.c
+    teaches = {}
+    for faculty_id, code in (db.session.query(links.faculty_id, Subject.code)
+                             .join(Subject, Subject.id == links.subject_id)
+                             .order_by(links.faculty_id, links.subject_id)):
+        teaches.setdefault(faculty_id, []).append(code)
+
+    links = batch_subject_association.c
+    enrolments = {}
+    for code, batch in (db.session.query(Subject.code, Batch.name)
+                        .select_from(batch_subject_association)
+                        .join(Subject, Subject.id == links.subject_id)
+                        .join(Batch, Batch.id == links.batch_id)
+                        .order_by(links.subject_id, links.batch_id)):
+        enrolments.setdefault(code, []).append(batch)
+
+    weights = dict(db.session.query(ConstraintWeight.name, ConstraintWeight.weight))
+    days, timeslots = load_time_grid()
+    faculty_unavailable = load_unavailability(FacultyUnavailability, FacultyUnavailability.faculty_id)
+    room_unavailable = load_unavailability(RoomUnavailability, Room.name,
+                                           (Room, Room.id == RoomUnavailability.room_id))
+    return Snapshot(rooms, batches, faculty, subjects, teaches, enrolments, weights,
+                    days, timeslots, faculty_unavailable, room_unavailable)
@@ -32,6 +32,113 @@ async function fetchData(url, method = 'GET', data = null) {
     }
 }
 
+// Pages of the list APIs, kept with their ETag: an unchanged page is revalidated
+// with If-None-Match and comes back as an empty 304.
+const pageCache = new Map();
+
+async function fetchPage(url) {
+    const cached = pageCache.get(url);
+    try {
+        const response = await fetch(url, { headers: cached ? { 'If-None-Match': cached.etag } : {} });
+        if (response.status === 401) {
+            alert('Session expired or Unauthorized. Please log in again.');
+            window.location.href = '/'; // Redirect to login
+            return null;
+        }
+        if (response.status === 304 && cached) return cached.page;
+        if (!response.ok) return null;
+        const page = { items: await response.json(), next: response.headers.get('X-Next-Cursor') };
+        const etag = response.headers.get('ETag');
+        if (etag) pageCache.set(url, { etag, page });
+        return page;
+    } catch (error) {
+        console.error('Fetch error:', error);
+        return null;
+    }
+}
+
+// A searchable list filled a page at a time, with a "Load more" button while there are
+// more pages. Returns the function that reloads it from the first page.
+function pagedList(url, listElement, searchInput, emptyText, renderItem, onReset = () => {}) {
+    const pageSize = 100;
+    let nextCursor = null;
+    const moreBtn = document.createElement('button');
+    moreBtn.type = 'button';
+    moreBtn.className = 'btn btn-outline-secondary btn-sm mt-2 d-none';
+    moreBtn.textContent = 'Load more';
+    listElement.after(moreBtn);
+
+    const load = async (append) => {
+        const params = new URLSearchParams({ limit: pageSize });
+        const search = searchInput.value.trim();
+        if (search) params.set('q', search);
+        if (append && nextCursor) params.set('after', nextCursor);
+        const page = await fetchPage(`${url}?${params}`);
+        if (!page) return;
+        if (!append) {
+            listElement.innerHTML = '';
+            onReset();
+            if (page.items.length === 0) {
+                listElement.innerHTML = `<li class="list-group-item text-muted">${search ? 'No matches.' : emptyText}</li>`;
+            }
+        }
+        page.items.forEach(item => listElement.appendChild(renderItem(item)));
+        nextCursor = page.next;
+        moreBtn.classList.toggle('d-none', !nextCursor);
+    };
+
+    moreBtn.addEventListener('click', () => load(true));
+    let searchTimer = null;
+    searchInput.addEventListener('input', () => {
+        clearTimeout(searchTimer);
+        searchTimer = setTimeout(() => load(false), 250);
+    });
+    return () => load(false);
+}
+
+// A dropdown (or one optgroup of it) filled from its own lookup of a list API: the first
+// matches of its search box, independent of how far the list above it has been paged or
+// searched. Returns the function that reloads it; the current choice is kept if it still matches.
+function lookupSelect(url, target, searchInput, renderOption, placeholder = null) {
+    const lookupSize = 50;
+    const select = target.closest('select');
+    const load = async () => {
+        const params = new URLSearchParams({ limit: lookupSize });
+        const search = searchInput.value.trim();
+        if (search) params.set('q', search);
+        const page = await fetchPage(`${url}?${params}`);
+        if (!page) return;
+        const selected = select.value;
+        target.innerHTML = placeholder === null ? '' : `<option value="">${placeholder}</option>`;
+        page.items.forEach(item => target.appendChild(renderOption(item)));
+        if (page.next) {
+            const more = document.createElement('option');
+            more.disabled = true;
+            more.textContent = 'More matches: type to narrow down';
+            target.appendChild(more);
+        }
+        if ([...select.options].some(option => option.value === selected)) {
+            select.value = selected;
+        } else if (selected) {
+            select.value = '';
+            select.dispatchEvent(new Event('change'));
+        }
+    };
+    let searchTimer = null;
+    searchInput.addEventListener('input', () => {
+        clearTimeout(searchTimer);
+        searchTimer = setTimeout(load, 250);
+    });
+    return load;
+}
+
+function makeOption(value, text) {
+    const option = document.createElement('option');
+    option.value = value;
+    option.textContent = text;
+    return option;
+}
+
 
 // ======================================================================
 // --- MANAGE PAGE LOGIC ---
@@ -42,47 +149,76 @@ function initializeManagePage() {
     const addRoomForm = document.getElementById('addRoomForm');
     const roomNameInput = document.getElementById('roomName');
     const roomList = document.getElementById('roomList');
+    const roomSearch = document.getElementById('roomSearch');
     const addBatchForm = document.getElementById('addBatchForm');
     const batchNameInput = document.getElementById('batchName');
     const batchList = document.getElementById('batchList');
+    const batchSearch = document.getElementById('batchSearch');
+    const enrollSubjectForm = document.getElementById('enrollSubjectForm');
+    const enrollBatchSelect = document.getElementById('enrollBatchSelect');
+    const enrollBatchSearch = document.getElementById('enrollBatchSearch');
+    const enrollSubjectSelect = document.getElementById('enrollSubjectSelect');
+    const enrollSubjectSearch = document.getElementById('enrollSubjectSearch');
     const addSubjectForm = document.getElementById('addSubjectForm');
     const subjectNameInput = document.getElementById('subjectName');
     const subjectCodeInput = document.getElementById('subjectCode');
     const subjectHoursInput = document.getElementById('subjectHours');
     const subjectList = document.getElementById('subjectList');
+    const subjectSearch = document.getElementById('subjectSearch');
     const addFacultyForm = document.getElementById('addFacultyForm');
     const facultyNameInput = document.getElementById('facultyName');
     const facultyList = document.getElementById('facultyList');
+    const facultySearch = document.getElementById('facultySearch');
     const assignSubjectForm = document.getElementById('assignSubjectForm');
     const assignFacultySelect = document.getElementById('assignFacultySelect');
+    const assignFacultySearch = document.getElementById('assignFacultySearch');
     const assignSubjectSelect = document.getElementById('assignSubjectSelect');
+    const assignSubjectSearch = document.getElementById('assignSubjectSearch');
+    const addDayForm = document.getElementById('addDayForm');
+    const dayNameInput = document.getElementById('dayName');
+    const dayList = document.getElementById('dayList');
+    const addTimeslotForm = document.getElementById('addTimeslotForm');
+    const timeslotNameInput = document.getElementById('timeslotName');
+    const timeslotList = document.getElementById('timeslotList');
+    const unavailableForm = document.getElementById('unavailableForm');
+    const unavailableOwnerSelect = document.getElementById('unavailableOwnerSelect');
+    const unavailableOwnerSearch = document.getElementById('unavailableOwnerSearch');
+    const unavailableFacultyGroup = document.getElementById('unavailableFacultyGroup');
+    const unavailableRoomGroup = document.getElementById('unavailableRoomGroup');
+    const unavailableDaySelect = document.getElementById('unavailableDaySelect');
+    const unavailableTimeslotSelect = document.getElementById('unavailableTimeslotSelect');
+    const unavailableList = document.getElementById('unavailableList');
+
+    // --- Dropdowns: each looks up its own matches, refreshed whenever its list reloads ---
+    const subjectOption = subject => makeOption(subject.id, `${subject.name} (${subject.code})`);
+    const loadEnrollBatches = lookupSelect('/api/batches', enrollBatchSelect, enrollBatchSearch,
+                                           batch => makeOption(batch.id, batch.name), 'Select Batch');
+    const loadEnrollSubjects = lookupSelect('/api/subjects', enrollSubjectSelect, enrollSubjectSearch, subjectOption, 'Select Subject');
+    const loadAssignSubjects = lookupSelect('/api/subjects', assignSubjectSelect, assignSubjectSearch, subjectOption, 'Select Subject');
+    const loadAssignFaculty = lookupSelect('/api/faculties', assignFacultySelect, assignFacultySearch,
+                                           faculty => makeOption(faculty.id, faculty.name), 'Select Faculty');
+    const loadOwnerFaculty = lookupSelect('/api/faculties', unavailableFacultyGroup, unavailableOwnerSearch,
+                                          faculty => makeOption(`faculties/${faculty.id}`, faculty.name));
+    const loadOwnerRooms = lookupSelect('/api/rooms', unavailableRoomGroup, unavailableOwnerSearch,
+                                        room => makeOption(`rooms/${room.id}`, room.name));
 
     // --- Rooms CRUD ---
-    const loadRooms = async () => {
-        const rooms = await fetchData('/api/rooms');
-        if (!rooms) return;
-        roomList.innerHTML = '';
-        if (rooms.length === 0) {
-            roomList.innerHTML = '<li class="list-group-item text-muted">No rooms added yet.</li>';
-        } else {
-            rooms.forEach(room => {
-                const li = document.createElement('li');
-                li.className = 'list-group-item d-flex justify-content-between align-items-center';
-                li.textContent = room.name;
-                const deleteBtn = document.createElement('button');
-                deleteBtn.className = 'btn btn-danger btn-sm';
-                deleteBtn.textContent = 'Delete';
-                deleteBtn.onclick = async () => {
-                    if (confirm(`Are you sure you want to delete room "${room.name}"?`)) {
-                        await fetchData(`/api/rooms/${room.id}`, 'DELETE');
-                        loadRooms();
-                    }
-                };
-                li.appendChild(deleteBtn);
-                roomList.appendChild(li);
-            });
-        }
-    };
+    const loadRooms = pagedList('/api/rooms', roomList, roomSearch, 'No rooms added yet.', room => {
+        const li = document.createElement('li');
+        li.className = 'list-group-item d-flex justify-content-between align-items-center';
+        li.textContent = room.name;
+        const deleteBtn = document.createElement('button');
+        deleteBtn.className = 'btn btn-danger btn-sm';
+        deleteBtn.textContent = 'Delete';
+        deleteBtn.onclick = async () => {
+            if (confirm(`Are you sure you want to delete room "${room.name}"?`)) {
+                await fetchData(`/api/rooms/${room.id}`, 'DELETE');
+                loadRooms();
+            }
+        };
+        li.appendChild(deleteBtn);
+        return li;
+    }, () => loadOwnerRooms());
 
     addRoomForm.addEventListener('submit', async (e) => {
         e.preventDefault();
@@ -93,32 +229,25 @@ function initializeManagePage() {
         loadRooms();
     });
 
-    // --- Batches CRUD ---
-    const loadBatches = async () => {
-        const batches = await fetchData('/api/batches');
-        if (!batches) return;
-        batchList.innerHTML = '';
-        if (batches.length === 0) {
-            batchList.innerHTML = '<li class="list-group-item text-muted">No batches added yet.</li>';
-        } else {
-            batches.forEach(batch => {
-                const li = document.createElement('li');
-                li.className = 'list-group-item d-flex justify-content-between align-items-center';
-                li.textContent = batch.name;
-                const deleteBtn = document.createElement('button');
-                deleteBtn.className = 'btn btn-danger btn-sm';
-                deleteBtn.textContent = 'Delete';
-                deleteBtn.onclick = async () => {
-                    if (confirm(`Are you sure you want to delete batch "${batch.name}"?`)) {
-                        await fetchData(`/api/batches/${batch.id}`, 'DELETE');
-                        loadBatches();
-                    }
-                };
-                li.appendChild(deleteBtn);
-                batchList.appendChild(li);
-            });
-        }
-    };
+    // --- Batches CRUD and Subject Enrolment ---
+    const loadBatches = pagedList('/api/batches', batchList, batchSearch, 'No batches added yet.', batch => {
+        const li = document.createElement('li');
+        li.className = 'list-group-item d-flex justify-content-between align-items-center flex-wrap';
+        const batchInfo = document.createElement('span');
+        batchInfo.innerHTML = `<b>${batch.name}</b><br><small class="text-muted">Takes: ${batch.subjects.map(s => s.code).join(', ') || 'every subject (not enrolled yet)'}</small>`;
+        li.appendChild(batchInfo);
+        const deleteBtn = document.createElement('button');
+        deleteBtn.className = 'btn btn-danger btn-sm ms-auto';
+        deleteBtn.textContent = 'Delete';
+        deleteBtn.onclick = async () => {
+            if (confirm(`Are you sure you want to delete batch "${batch.name}"?`)) {
+                await fetchData(`/api/batches/${batch.id}`, 'DELETE');
+                loadBatches();
+            }
+        };
+        li.appendChild(deleteBtn);
+        return li;
+    }, () => loadEnrollBatches());
 
     addBatchForm.addEventListener('submit', async (e) => {
         e.preventDefault();
@@ -129,38 +258,42 @@ function initializeManagePage() {
         loadBatches();
     });
 
-    // --- Subjects CRUD ---
-    const loadSubjects = async () => {
-        const subjects = await fetchData('/api/subjects');
-        if (!subjects) return;
-        subjectList.innerHTML = '';
-        assignSubjectSelect.innerHTML = '<option value="">Select Subject</option>'; // Reset for dropdown
-        if (subjects.length === 0) {
-            subjectList.innerHTML = '<li class="list-group-item text-muted">No subjects added yet.</li>';
-        } else {
-            subjects.forEach(subject => {
-                const li = document.createElement('li');
-                li.className = 'list-group-item d-flex justify-content-between align-items-center';
-                li.innerHTML = `<span><b>${subject.name}</b> (${subject.code}) - ${subject.hours_per_week} hrs/week</span>`;
-                const deleteBtn = document.createElement('button');
-                deleteBtn.className = 'btn btn-danger btn-sm';
-                deleteBtn.textContent = 'Delete';
-                deleteBtn.onclick = async () => {
-                    if (confirm(`Are you sure you want to delete subject "${subject.name}"?`)) {
-                        await fetchData(`/api/subjects/${subject.id}`, 'DELETE');
-                        loadSubjects();
-                        loadFaculties();
-                    }
-                };
-                li.appendChild(deleteBtn);
-                subjectList.appendChild(li);
-                const option = document.createElement('option');
-                option.value = subject.id;
-                option.textContent = `${subject.name} (${subject.code})`;
-                assignSubjectSelect.appendChild(option);
-            });
+    enrollSubjectForm.addEventListener('submit', async (e) => {
+        e.preventDefault();
+        const batchId = enrollBatchSelect.value;
+        const subjectId = enrollSubjectSelect.value;
+        if (!batchId || !subjectId) {
+            alert('Please select both a batch and a subject.');
+            return;
         }
-    };
+        await fetchData(`/api/batches/${batchId}/subjects`, 'POST', { subject_id: subjectId });
+        enrollSubjectForm.reset(); // Also clears the dropdowns' search boxes, so look them up again
+        loadBatches();
+        loadEnrollSubjects();
+    });
+
+    // --- Subjects CRUD ---
+    const loadSubjects = pagedList('/api/subjects', subjectList, subjectSearch, 'No subjects added yet.', subject => {
+        const li = document.createElement('li');
+        li.className = 'list-group-item d-flex justify-content-between align-items-center';
+        li.innerHTML = `<span><b>${subject.name}</b> (${subject.code}) - ${subject.hours_per_week} hrs/week</span>`;
+        const deleteBtn = document.createElement('button');
+        deleteBtn.className = 'btn btn-danger btn-sm';
+        deleteBtn.textContent = 'Delete';
+        deleteBtn.onclick = async () => {
+            if (confirm(`Are you sure you want to delete subject "${subject.name}"?`)) {
+                await fetchData(`/api/subjects/${subject.id}`, 'DELETE');
+                loadSubjects();
+                loadBatches();
+                loadFaculties();
+            }
+        };
+        li.appendChild(deleteBtn);
+        return li;
+    }, () => {
+        loadAssignSubjects();
+        loadEnrollSubjects();
+    });
 
     addSubjectForm.addEventListener('submit', async (e) => {
         e.preventDefault();
@@ -178,38 +311,27 @@ function initializeManagePage() {
     });
 
     // --- Faculty CRUD and Subject Assignment ---
-    const loadFaculties = async () => {
-        const faculties = await fetchData('/api/faculties');
-        if (!faculties) return;
-        facultyList.innerHTML = '';
-        assignFacultySelect.innerHTML = '<option value="">Select Faculty</option>'; // Reset for dropdown
-        if (faculties.length === 0) {
-            facultyList.innerHTML = '<li class="list-group-item text-muted">No faculty added yet.</li>';
-        } else {
-            faculties.forEach(faculty => {
-                const li = document.createElement('li');
-                li.className = 'list-group-item d-flex justify-content-between align-items-center flex-wrap';
-                const facultyInfo = document.createElement('span');
-                facultyInfo.innerHTML = `<b>${faculty.name}</b><br><small class="text-muted">Can teach: ${faculty.subjects.map(s => s.code).join(', ') || 'None'}</small>`;
-                li.appendChild(facultyInfo);
-                const deleteBtn = document.createElement('button');
-                deleteBtn.className = 'btn btn-danger btn-sm ms-auto';
-                deleteBtn.textContent = 'Delete';
-                deleteBtn.onclick = async () => {
-                    if (confirm(`Are you sure you want to delete faculty "${faculty.name}"?`)) {
-                        await fetchData(`/api/faculties/${faculty.id}`, 'DELETE');
-                        loadFaculties();
-                    }
-                };
-                li.appendChild(deleteBtn);
-                facultyList.appendChild(li);
-                const option = document.createElement('option');
-                option.value = faculty.id;
-                option.textContent = faculty.name;
-                assignFacultySelect.appendChild(option);
-            });
-        }
-    };
+    const loadFaculties = pagedList('/api/faculties', facultyList, facultySearch, 'No faculty added yet.', faculty => {
+        const li = document.createElement('li');
+        li.className = 'list-group-item d-flex justify-content-between align-items-center flex-wrap';
+        const facultyInfo = document.createElement('span');
+        facultyInfo.innerHTML = `<b>${faculty.name}</b><br><small class="text-muted">Can teach: ${faculty.subjects.map(s => s.code).join(', ') || 'None'}</small>`;
+        li.appendChild(facultyInfo);
+        const deleteBtn = document.createElement('button');
+        deleteBtn.className = 'btn btn-danger btn-sm ms-auto';
+        deleteBtn.textContent = 'Delete';
+        deleteBtn.onclick = async () => {
+            if (confirm(`Are you sure you want to delete faculty "${faculty.name}"?`)) {
+                await fetchData(`/api/faculties/${faculty.id}`, 'DELETE');
+                loadFaculties();
+            }
+        };
+        li.appendChild(deleteBtn);
+        return li;
+    }, () => {
+        loadAssignFaculty();
+        loadOwnerFaculty();
+    });
 
     addFacultyForm.addEventListener('submit', async (e) => {
         e.preventDefault();
@@ -229,8 +351,101 @@ function initializeManagePage() {
             return;
         }
         await fetchData(`/api/faculties/${facultyId}/subjects`, 'POST', { subject_id: subjectId });
-        assignSubjectForm.reset();
+        assignSubjectForm.reset(); // Also clears the dropdowns' search boxes, so look them up again
         loadFaculties();
+        loadAssignSubjects();
+    });
+
+    // --- Time Grid and Unavailable Times ---
+    const renderGridList = (listElement, entries, url, emptyText) => {
+        listElement.innerHTML = entries.length === 0 ? `<li class="list-group-item text-muted">${emptyText}</li>` : '';
+        entries.forEach(entry => {
+            const li = document.createElement('li');
+            li.className = 'list-group-item d-flex justify-content-between align-items-center';
+            li.textContent = entry.name;
+            const deleteBtn = document.createElement('button');
+            deleteBtn.className = 'btn btn-danger btn-sm';
+            deleteBtn.textContent = 'Delete';
+            deleteBtn.onclick = async () => {
+                if (confirm(`Are you sure you want to delete "${entry.name}"? Unavailable times on it are deleted too.`)) {
+                    await fetchData(`${url}/${entry.id}`, 'DELETE');
+                    loadGrid();
+                }
+            };
+            li.appendChild(deleteBtn);
+            listElement.appendChild(li);
+        });
+    };
+
+    const fillSelect = (select, entries, placeholder) => {
+        select.innerHTML = `<option value="">${placeholder}</option>`;
+        entries.forEach(entry => {
+            const option = document.createElement('option');
+            option.value = entry.id;
+            option.textContent = entry.name;
+            select.appendChild(option);
+        });
+    };
+
+    const loadGrid = async () => {
+        const days = await fetchData('/api/days') || [];
+        const timeslots = await fetchData('/api/timeslots') || [];
+        renderGridList(dayList, days, '/api/days', 'No days stored: the default Mon-Fri week is used.');
+        renderGridList(timeslotList, timeslots, '/api/timeslots', 'No timeslots stored: the default timeslots are used.');
+        fillSelect(unavailableDaySelect, days, 'Select Day');
+        fillSelect(unavailableTimeslotSelect, timeslots, 'Whole day');
+        loadUnavailable();
+    };
+
+    // Lists the unavailable times of the faculty member or room picked in the form
+    const loadUnavailable = async () => {
+        const owner = unavailableOwnerSelect.value;
+        unavailableList.innerHTML = '';
+        if (!owner) return;
+        const entries = await fetchData(`/api/${owner}/unavailable`) || [];
+        if (entries.length === 0) {
+            unavailableList.innerHTML = '<li class="list-group-item text-muted">Always available.</li>';
+        }
+        entries.forEach(entry => {
+            const li = document.createElement('li');
+            li.className = 'list-group-item d-flex justify-content-between align-items-center';
+            li.textContent = `${entry.day}, ${entry.timeslot || 'whole day'}`;
+            const deleteBtn = document.createElement('button');
+            deleteBtn.className = 'btn btn-danger btn-sm';
+            deleteBtn.textContent = 'Delete';
+            deleteBtn.onclick = async () => {
+                await fetchData(`/api/${owner}/unavailable/${entry.id}`, 'DELETE');
+                loadUnavailable();
+            };
+            li.appendChild(deleteBtn);
+            unavailableList.appendChild(li);
+        });
+    };
+
+    const addGridEntry = (form, input, url) => form.addEventListener('submit', async (e) => {
+        e.preventDefault();
+        const name = input.value.trim();
+        if (!name) return;
+        const result = await fetchData(url, 'POST', { name });
+        if (result && result.error) alert(result.error);
+        input.value = '';
+        loadGrid();
+    });
+    addGridEntry(addDayForm, dayNameInput, '/api/days');
+    addGridEntry(addTimeslotForm, timeslotNameInput, '/api/timeslots');
+
+    unavailableOwnerSelect.addEventListener('change', loadUnavailable);
+    unavailableForm.addEventListener('submit', async (e) => {
+        e.preventDefault();
+        const owner = unavailableOwnerSelect.value;
+        const dayId = unavailableDaySelect.value;
+        if (!owner || !dayId) {
+            alert('Please select a faculty member or room, and a day.');
+            return;
+        }
+        const timeslotId = unavailableTimeslotSelect.value;
+        await fetchData(`/api/${owner}/unavailable`, 'POST', { day_id: dayId, timeslot_id: timeslotId || null });
+        loadUnavailable();
     });
 
     // --- Initial Loads for Manage Page ---
@@ -238,6 +453,7 @@ function initializeManagePage() {
     loadBatches();
     loadSubjects();
     loadFaculties();
+    loadGrid();
 }
 
 
@@ -247,31 +463,121 @@ function initializeManagePage() {
 
 function initializeDashboard() {
     const generateBtn = document.getElementById('generateBtn');
+    const cancelBtn = document.getElementById('cancelBtn');
     const statusDiv = document.getElementById('status');
     const resultsContainer = document.getElementById('results-container');
+    const previousRuns = document.getElementById('previousRuns');
+    const loadRunBtn = document.getElementById('loadRunBtn');
+    const warmStart = document.getElementById('warmStart');
+    let currentJobId = null;
+
+    const loadPreviousRuns = async () => {
+        const runs = await fetchData('/api/timetables');
+        if (!runs) return;
+        previousRuns.innerHTML = runs.length === 0 ? '<option value="">No saved runs yet</option>' : '';
+        runs.forEach(run => {
+            const option = document.createElement('option');
+            option.value = run.id;
+            const created = new Date(run.created_at).toLocaleString();
+            option.textContent = `#${run.id} - ${created} - best fitness ${run.best_fitness}${run.matches_current_data ? ' (current data)' : ''}`;
+            previousRuns.appendChild(option);
+        });
+    };
+
+    const setRunning = (running) => {
+        generateBtn.disabled = running;
+        cancelBtn.classList.toggle('d-none', !running);
+    };
+
+    const showError = (message) => {
+        statusDiv.textContent = `Error: ${message}`;
+        resultsContainer.innerHTML = `<div class="alert alert-warning mt-3">Error generating timetable: ${message}. Please ensure you have added rooms, batches, subjects (with hours), and faculty (with assigned subjects) in the "Manage Data" section.</div>`;
+    };
+
+    const showProgress = (job) => {
+        const best = job.best_fitness === null ? 'n/a' : job.best_fitness;
+        statusDiv.innerHTML = `<div class="spinner-border spinner-border-sm text-primary me-2" role="status"><span class="visually-hidden">Loading...</span></div>Generating... pass ${job.runs_started} of ${job.runs} started, generation ${job.generation}, best fitness so far: <b>${best}</b>`;
+    };
+
+    const finishJob = async (jobId) => {
+        setRunning(false);
+        currentJobId = null;
+        const job = await fetchData(`/api/jobs/${jobId}`);
+        if (!job) {
+            statusDiv.textContent = 'An unexpected error occurred during generation.';
+            return;
+        }
+        if (job.status === 'failed') {
+            showError(job.message);
+            return;
+        }
+        const results = job.results || [];
+        statusDiv.textContent = job.status === 'cancelled'
+            ? `Generation cancelled. Showing the best ${results.length} option(s) found so far.`
+            : `Generation complete! Found ${results.length} optimized options.`;
+        renderResults(results, job.grid);
+        loadPreviousRuns();
+    };
 
     generateBtn.addEventListener('click', async () => {
-        statusDiv.innerHTML = '<div class="spinner-border spinner-border-sm text-primary me-2" role="status"><span class="visually-hidden">Loading...</span></div>Generating... This may take a moment. Check the terminal for progress.';
+        statusDiv.innerHTML = '<div class="spinner-border spinner-border-sm text-primary me-2" role="status"><span class="visually-hidden">Loading...</span></div>Starting generation...';
         resultsContainer.innerHTML = '';
 
-        const data = await fetchData('/api/generate', 'POST'); // This will now work
+        const data = await fetchData('/api/jobs', 'POST', warmStart.checked ? { warm_start: true } : null);
 
         if (!data) {
             statusDiv.textContent = 'An unexpected error occurred during generation.';
             return;
         }
+        if (!data.job_id) {
+            showError(data.message);
+            return;
+        }
+
+        if (data.cached) {
+            // Nothing changed since this run was generated: the job is already done, with the stored results
+            finishJob(data.job_id);
+            return;
+        }
+
+        currentJobId = data.job_id;
+        setRunning(true);
+        // Live progress from the server; the final 'done' event triggers fetching the results
+        const events = new EventSource(`/api/jobs/${data.job_id}/events`);
+        events.addEventListener('progress', (e) => showProgress(JSON.parse(e.data)));
+        events.addEventListener('done', () => {
+            events.close();
+            finishJob(data.job_id);
+        });
+        events.onerror = () => {
+            events.close();
+            finishJob(data.job_id);
+        };
+    });
+
+    cancelBtn.addEventListener('click', async () => {
+        if (!currentJobId) return;
+        cancelBtn.disabled = true;
+        await fetchData(`/api/jobs/${currentJobId}/cancel`, 'POST');
+        cancelBtn.disabled = false;
+    });
 
-        if (data.status === 'success') {
-            statusDiv.textContent = `Generation complete! Found ${data.results.length} optimized options.`;
-            renderResults(data.results);
-        } else {
-            statusDiv.textContent = `Error: ${data.message}`;
-            resultsContainer.innerHTML = `<div class="alert alert-warning mt-3">Error generating timetable: ${data.message}. Please ensure you have added rooms, batches, subjects (with hours), and faculty (with assigned subjects) in the "Manage Data" section.</div>`;
+    loadRunBtn.addEventListener('click', async () => {
+        const runId = previousRuns.value;
+        if (!runId) return;
+        const data = await fetchData(`/api/timetables/${runId}`);
+        if (!data || data.status !== 'success') {
+            statusDiv.textContent = `Error: ${data ? data.message : 'Could not load the saved run.'}`;
+            return;
         }
+        statusDiv.textContent = `Loaded saved run #${data.run_id}.`;
+        renderResults(data.results, data.grid);
     });
+
+    loadPreviousRuns();
 }
 
-function renderResults(results) {
+function renderResults(results, grid) {
     const container = document.getElementById('results-container');
     container.innerHTML = '';
     
@@ -293,15 +599,17 @@ function renderResults(results) {
             </div>
         `;
         container.appendChild(resultDiv);
-        renderTimetable(result.timetable, `timetable-option-${result.option}`);
+        renderTimetable(result.timetable, `timetable-option-${result.option}`, grid);
     });
 }
 
-function renderTimetable(timetableData, containerId) {
+// Rows and columns follow the institution's time grid (sent with the results); days or
+// timeslots a stored timetable uses that are no longer in the grid are added at the end
+function renderTimetable(timetableData, containerId, grid = { days: [], timeslots: [] }) {
     const container = document.getElementById(containerId);
     
-    const timeslots = ["9-10", "10-11", "11-12", "1-2", "2-3"];
-    const days = ["Mon", "Tue", "Wed", "Thu", "Fri"];
+    const timeslots = [...new Set([...grid.timeslots, ...timetableData.map(g => g.timeslot)])];
+    const days = [...new Set([...grid.days, ...timetableData.map(g => g.day)])];
     const batches = [...new Set(timetableData.map(g => g.batch))].sort();
 
     let html = '';
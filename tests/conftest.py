@@ -0,0 +1,43 @@
+# tests/conftest.py
+# Flask tests run against a private in-memory SQLite database, never DATABASE_URL's.
+import os
+
+os.environ['DATABASE_URL'] = 'sqlite://' # Read when app.py is imported, so set before any test imports it
+
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+
+@pytest.fixture
+def app():
+    from app import app
+    from models import db, User
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.add(User(username='admin', password=generate_password_hash('password123'), role='admin'))
+        db.session.commit()
+        yield app
+        db.session.remove()
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'password123'})
+    return client
+
+@contextmanager
+def count_queries(engine):
+    """Collects the SQL statements run on engine inside the block."""
+    statements = []
+
+    def record(connection, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
@@ -0,0 +1,23 @@
+# tests/test_bulk_io.py
+# Bulk imports: re-importing a file is harmless, and a file with errors writes nothing.
+from models import db, Faculty, Room
+
+def import_csv(client, entity, text):
+    return client.post(f'/api/import/{entity}', data=text, content_type='text/csv')
+
+def test_reimporting_faculty_skips_existing_names(app, client):
+    first = import_csv(client, 'faculty', 'name\nAlice\nBob\nAlice\n')
+    assert (first.json['inserted'], first.json['skipped']) == (2, 1)
+    second = import_csv(client, 'faculty', 'name\nAlice\nBob\n')
+    assert (second.json['inserted'], second.json['skipped']) == (0, 2)
+    assert sorted(name for name, in db.session.query(Faculty.name)) == ['Alice', 'Bob']
+
+    import_csv(client, 'subjects', 'code,name,hours_per_week\nMA1,Maths,3\n')
+    assigned = import_csv(client, 'faculty_subjects', 'faculty,subject\nAlice,MA1\n')
+    assert assigned.status_code == 200
+    assert (assigned.json['inserted'], assigned.json['faculty_created']) == (1, 0)
+
+def test_import_with_errors_writes_nothing(app, client):
+    response = import_csv(client, 'rooms', 'name\nR1\n\nR2\n' + 'x' * 200 + '\n')
+    assert response.status_code == 400
+    assert db.session.query(Room).count() == 0
@@ -0,0 +1,29 @@
+# tests/test_enrolments.py
+# Which batches the scheduler gives sessions of each subject.
+from app import load_scheduler_input
+from models import db, Batch, Faculty, Room, Subject
+
+def populate():
+    batches = [Batch(name=name) for name in ("B1", "B2", "B3")]
+    subjects = [Subject(name=f"Subject {i}", code=f"S{i}", hours_per_week=2) for i in range(3)]
+    db.session.add_all(batches + subjects + [Room(name="R1"), Faculty(name="F1", subjects=subjects)])
+    db.session.commit()
+    return batches, subjects
+
+def subject_batches(input_data):
+    return {code: details["batches"] for code, details in input_data["subjects"].items()}
+
+def test_without_enrolments_every_batch_takes_every_subject(app):
+    populate()
+    input_data, error = load_scheduler_input()
+    assert error is None
+    assert subject_batches(input_data) == {code: ["B1", "B2", "B3"] for code in ("S0", "S1", "S2")}
+
+def test_unenrolled_batches_keep_every_subject(app):
+    batches, subjects = populate()
+    batches[0].subjects = [subjects[0]]
+    batches[2].subjects = [subjects[0], subjects[2]]
+    db.session.commit()
+    input_data, error = load_scheduler_input()
+    assert error is None
+    assert subject_batches(input_data) == {"S0": ["B1", "B2", "B3"], "S1": ["B2"], "S2": ["B2", "B3"]}
@@ -0,0 +1,64 @@
+# tests/test_generate.py
+# Generation options are checked before anything is solved, and a stored run is only
+# handed back to requests it was solved for.
+import threading
+
+import pytest
+
+from models import db, Batch, Faculty, Room, Subject, TimetableRun
+
+def populate():
+    subject = Subject(name="Maths", code="MA1", hours_per_week=2)
+    db.session.add_all([Room(name="R1"), Batch(name="B1"), subject, Faculty(name="F1", subjects=[subject])])
+    db.session.commit()
+
+@pytest.fixture
+def quick_defaults(app, monkeypatch):
+    """Plain requests (no solver options) solve one short pass."""
+    monkeypatch.setitem(app.config, 'SCHEDULER_RUNS', 1)
+    monkeypatch.setitem(app.config, 'SCHEDULER_TIME_BUDGET', 5)
+
+@pytest.mark.parametrize("name, value", [
+    ("time_budget", 0), ("time_budget", -1), ("runs", 0), ("islands", 0), ("migrants", -1),
+    ("runs", "MAX_RUNS"), ("islands", "MAX_ISLANDS"), ("migrants", "MAX_MIGRANTS"),
+])
+def test_out_of_range_option_is_rejected(app, client, name, value):
+    if isinstance(value, str):
+        value = app.config['SCHEDULER_' + value] + 1 # Just above the configured cap
+    for url in ('/api/generate', '/api/jobs'):
+        response = client.post(url, json={name: value})
+        assert response.status_code == 400
+        assert name in response.json["message"]
+
+def test_cached_job_is_done_while_job_workers_are_busy(app, client, quick_defaults):
+    from app import job_manager
+    populate()
+    generated = client.post('/api/generate').json
+    release = threading.Event()
+    for _ in range(app.config['SCHEDULER_JOB_WORKERS']):
+        job_manager.submit(lambda job: release.wait(10), 1)
+    try:
+        started = client.post('/api/jobs').json
+        assert started["cached"] is True
+        job = client.get(f'/api/jobs/{started["job_id"]}').json
+        assert job["status"] == 'done'
+        assert job["results"] == generated["results"]
+    finally:
+        release.set()
+
+def test_run_with_explicit_options_is_not_reused_by_a_plain_request(app, client, quick_defaults):
+    populate()
+    client.post('/api/generate', json={"runs": 1, "time_budget": 5, "strategy": "ls", "ls_time_limit": 0.1})
+    plain = client.post('/api/generate').json
+    assert plain["cached"] is False
+    again = client.post('/api/generate').json
+    assert again["cached"] is True
+    assert again["run_id"] == plain["run_id"]
+    assert again["results"] == plain["results"]
+
+def test_run_without_results_is_not_stored(app, client, quick_defaults, monkeypatch):
+    populate()
+    monkeypatch.setattr('app.run_multistart', lambda input_data, **settings: [])
+    generated = client.post('/api/generate').json
+    assert generated["results"] == [] and generated["run_id"] is None
+    assert TimetableRun.query.count() == 0
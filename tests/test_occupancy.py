@@ -0,0 +1,94 @@
+# tests/test_occupancy.py
+# The incremental Occupancy updates behind Timetable.assign must always agree with a
+# full recompute (Occupancy.from_chromosome) and with the batched numpy evaluator.
+import random
+
+import pytest
+
+from scheduler_v2 import Encoding, Occupancy, Timetable, construct_individual, create_individual
+from scheduler_numpy import evaluate_population
+
+DAYS = ["Mon", "Tue", "Wed", "Thu", "Fri"]
+TIMESLOTS = ["9-10", "10-11", "11-12", "1-2", "2-3"]
+
+def random_config(seed, n_batches=4, n_subjects=6, n_rooms=3, n_faculty=4):
+    """A small random input that switches on every rule: capacities, daily limits,
+    unavailable teachers and rooms, preferred rooms and a gap weight."""
+    rng = random.Random(seed)
+    batches = [f"B{b}" for b in range(n_batches)]
+    rooms = [f"R{r}" for r in range(n_rooms)]
+    subjects = {f"S{s}": {"name": f"Subject {s}", "hours_per_week": rng.randint(1, 4),
+                          "batches": rng.sample(batches, rng.randint(1, n_batches))}
+                for s in range(n_subjects)}
+    subjects["S0"]["preferred_rooms"] = rooms[:1]
+    faculty = {f"F{f}": {"subjects": rng.sample(list(subjects), 2), "max_hours_per_day": rng.choice([0, 2, 3])}
+               for f in range(n_faculty)}
+    faculty["F0"]["unavailable"] = [{"day": "Mon", "timeslot": None}, {"day": "Wed", "timeslot": "9-10"}]
+    return {
+        "days": DAYS, "timeslots": TIMESLOTS, "rooms": rooms, "batches": batches,
+        "subjects": subjects, "faculty": faculty,
+        "room_capacity": {room: rng.choice([20, 40, 60]) for room in rooms},
+        "batch_size": {batch: rng.choice([30, 50]) for batch in batches},
+        "room_unavailable": {rooms[-1]: [{"day": "Fri", "timeslot": None}]},
+        "constraint_weights": {"gaps": 2},
+    }
+
+def random_assign(timetable, rng):
+    encoding = timetable.encoding
+    index = rng.randrange(len(encoding))
+    timetable.assign(index, rng.randrange(encoding.n_slots), rng.randrange(len(encoding.rooms)),
+                     rng.choice(encoding.session_faculty_options[index]))
+
+def rows(table):
+    return [list(row) for row in table]
+
+def assert_matches_recompute(timetable):
+    encoding = timetable.encoding
+    occupancy = timetable.occupancy
+    fresh = Occupancy.from_chromosome(encoding, timetable.slots, timetable.rooms, timetable.faculty)
+    assert timetable.fitness == occupancy.fitness == fresh.fitness
+    assert (occupancy.clashes, occupancy.hard_penalty, occupancy.soft_penalty) == \
+           (fresh.clashes, fresh.hard_penalty, fresh.soft_penalty)
+    assert rows(occupancy.teacher_slots) == rows(fresh.teacher_slots)
+    assert rows(occupancy.room_slots) == rows(fresh.room_slots)
+    assert rows(occupancy.batch_slots) == rows(fresh.batch_slots)
+    assert rows(occupancy.batch_day_penalty) == rows(fresh.batch_day_penalty)
+
+@pytest.mark.parametrize("seed", range(20))
+def test_assign_on_copies_matches_full_recompute(seed):
+    rng = random.Random(seed)
+    encoding = Encoding(random_config(seed))
+    pool = [construct_individual(encoding, rng=rng), create_individual(encoding, rng=rng)]
+    for _ in range(300):
+        timetable = rng.choice(pool)
+        if rng.random() < 0.3:
+            pool.append(timetable.copy())
+        else:
+            random_assign(timetable, rng)
+    for timetable in pool:
+        assert_matches_recompute(timetable)
+
+@pytest.mark.parametrize("seed", range(20))
+def test_numpy_engine_matches_incremental_fitness(seed):
+    rng = random.Random(seed)
+    encoding = Encoding(random_config(seed))
+    population = [create_individual(encoding, rng=rng) for _ in range(10)]
+    for timetable in population:
+        for _ in range(rng.randint(0, 20)):
+            random_assign(timetable, rng)
+    untracked = [Timetable(encoding, t.slots, t.rooms, t.faculty, track=False) for t in population]
+    assert evaluate_population(encoding, untracked) == [t.fitness for t in population]
+
+def test_copy_is_isolated_from_its_parent():
+    rng = random.Random(0)
+    encoding = Encoding(random_config(0))
+    parent = construct_individual(encoding, rng=rng)
+    genes = (parent.slots.tolist(), parent.rooms.tolist(), parent.faculty.tolist())
+    fitness = parent.fitness
+    child = parent.copy()
+    for _ in range(50):
+        random_assign(child, rng)
+    assert (parent.slots.tolist(), parent.rooms.tolist(), parent.faculty.tolist()) == genes
+    assert parent.fitness == fitness
+    assert_matches_recompute(parent)
+    assert_matches_recompute(child)
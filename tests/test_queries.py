@@ -0,0 +1,56 @@
+# tests/test_queries.py
+# Loading the scheduler's input and listing faculty must take a fixed number of
+# queries, however many rows there are (no per-row lazy loads).
+import pytest
+
+from models import (db, Room, Batch, Faculty, Subject, Day, Timeslot, FacultyUnavailability,
+                    RoomUnavailability)
+from snapshot import load_snapshot
+from tests.conftest import count_queries
+
+SNAPSHOT_QUERIES = 11
+# The table versions behind the ETag, the page of faculty and one query for all their subjects
+FACULTY_LIST_QUERIES = 3
+
+def populate(n):
+    rooms = [Room(name=f"R{i}") for i in range(n)]
+    batches = [Batch(name=f"B{i}") for i in range(n)]
+    subjects = [Subject(name=f"Subject {i}", code=f"S{i}", hours_per_week=2) for i in range(n)]
+    day, timeslot = Day(name="Mon", position=1), Timeslot(name="9-10", position=1)
+    db.session.add_all(rooms + batches + subjects + [day, timeslot])
+    for i in range(n):
+        batches[i].subjects = [subjects[i], subjects[(i + 1) % n]]
+        faculty = Faculty(name=f"F{i}", subjects=[subjects[i], subjects[(i + 2) % n]])
+        faculty.unavailable.append(FacultyUnavailability(day=day))
+        rooms[i].unavailable.append(RoomUnavailability(day=day, timeslot=timeslot))
+        db.session.add(faculty)
+    db.session.commit()
+    db.session.expire_all()
+
+@pytest.mark.parametrize("n", [3, 150])
+def test_snapshot_query_count_is_fixed(app, n):
+    populate(n)
+    with count_queries(db.engine) as statements:
+        snapshot = load_snapshot()
+    assert len(statements) == SNAPSHOT_QUERIES
+    assert len(snapshot.faculty) == n
+    assert sum(len(codes) for codes in snapshot.enrolments.values()) == 2 * n
+    assert len(snapshot.faculty_unavailable) == len(snapshot.room_unavailable) == n
+
+@pytest.mark.parametrize("n", [3, 150])
+def test_faculty_list_query_count_is_fixed(app, client, n):
+    populate(n)
+    with count_queries(db.engine) as statements:
+        response = client.get('/api/faculties')
+    assert response.status_code == 200
+    assert len(response.json) == min(n, app.config['LIST_PAGE_SIZE'])
+    assert all(len(faculty["subjects"]) >= 1 for faculty in response.json)
+    assert len(statements) == FACULTY_LIST_QUERIES
+
+def test_unchanged_faculty_list_is_answered_from_its_etag(app, client):
+    populate(3)
+    etag = client.get('/api/faculties').headers['ETag']
+    with count_queries(db.engine) as statements:
+        response = client.get('/api/faculties', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert len(statements) == 1
@@ -0,0 +1,56 @@
+# tests/test_time_grid.py
+# Results are returned with the days and timeslots they were solved on, even after the
+# stored time grid has been edited.
+import time
+
+from sqlalchemy import text
+
+from database import create_missing_columns
+from models import db, Batch, Day, Faculty, Room, Subject, Timeslot, TimetableRun
+
+GRID = {"days": ["Mon", "Tue"], "timeslots": ["9-10", "10-11", "11-12"]}
+SOLVE = {"runs": 1, "time_budget": 5}
+
+def populate():
+    subject = Subject(name="Maths", code="MA1", hours_per_week=2)
+    db.session.add_all([Room(name="R1"), Batch(name="B1"), subject, Faculty(name="F1", subjects=[subject])])
+    db.session.add_all(Day(name=name, position=i) for i, name in enumerate(GRID["days"]))
+    db.session.add_all(Timeslot(name=name, position=i) for i, name in enumerate(GRID["timeslots"]))
+    db.session.commit()
+
+def test_stored_run_keeps_its_grid(app, client):
+    populate()
+    generated = client.post('/api/generate', json=SOLVE).json
+    assert generated["grid"] == GRID
+    client.post('/api/days', json={"name": "Wed"})
+
+    stored = client.get(f'/api/timetables/{generated["run_id"]}').json
+    assert stored["grid"] == GRID
+    assert stored["results"] == generated["results"]
+
+def test_job_returns_the_grid_it_was_solved_on(app, client):
+    populate()
+    job_id = client.post('/api/jobs', json=SOLVE).json["job_id"]
+    for _ in range(100):
+        job = client.get(f'/api/jobs/{job_id}').json
+        if job["status"] not in ('queued', 'running'):
+            break
+        time.sleep(0.1)
+    assert job["status"] == 'done'
+    # The grid is fixed when the job is submitted. Edit it only once the job is done: the
+    # in-memory test database is one connection, shared with the job thread's save_run
+    client.post('/api/timeslots', json={"name": "1-2"})
+    assert client.get(f'/api/jobs/{job_id}').json["grid"] == GRID
+
+def test_runs_stored_before_grids_use_the_default_week(app, client):
+    run = TimetableRun(input_hash='0' * 64)
+    db.session.add(run)
+    db.session.commit()
+    grid = client.get(f'/api/timetables/{run.id}').json["grid"]
+    assert grid == {"days": ["Mon", "Tue", "Wed", "Thu", "Fri"], "timeslots": ["9-10", "10-11", "11-12", "1-2", "2-3"]}
+
+def test_missing_grid_column_is_added(app):
+    db.session.execute(text('ALTER TABLE timetable_run DROP COLUMN grid'))
+    db.session.commit()
+    assert create_missing_columns(db) == ['timetable_run.grid']
+    assert create_missing_columns(db) == []
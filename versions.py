@@ -0,0 +1,38 @@
+# versions.py
+# A version counter per table, bumped in the same transaction as every write to it.
+# The list APIs build their ETags from these, so re-fetching an unchanged list is
+# answered with 304 Not Modified without its rows being queried.
+from itertools import chain
+
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.orm import Session
+
+from models import db, TableVersion
+
+def bump_versions(connection, tables):
+    """Increment the counters of these table names (creating missing ones) on connection."""
+    tables = sorted(set(tables))
+    if not tables:
+        return
+    table = TableVersion.__table__
+    updated = connection.execute(update(table).where(table.c.name.in_(tables))
+                                 .values(version=table.c.version + 1))
+    if updated.rowcount < len(tables):
+        existing = {name for name, in connection.execute(select(table.c.name).where(table.c.name.in_(tables)))}
+        connection.execute(insert(table), [{"name": name, "version": 1} for name in tables if name not in existing])
+
+def table_versions(*tables):
+    """Current counters of these tables, in order; 0 for a table never written through the app."""
+    versions = dict(db.session.query(TableVersion.name, TableVersion.version).filter(TableVersion.name.in_(tables)))
+    return [versions.get(name, 0) for name in tables]
+
+@event.listens_for(Session, 'after_flush')
+def record_orm_writes(session, flush_context):
+    """Bump the tables of every object an ORM flush inserted, updated or deleted.
+
+    Writes that bypass the ORM unit of work (bulk INSERTs through session.execute)
+    call bump_versions themselves.
+    """
+    tables = {obj.__table__.name for obj in chain(session.new, session.dirty, session.deleted)}
+    tables.discard(TableVersion.__tablename__)
+    bump_versions(session.connection(), tables)